@@ -1,16 +1,168 @@
-function initViewer(ref) {
-    var ws = new WebSocket("ws://localhost:8888/websocket/?ref="+ref);
-    ws.onopen = function(evt) {
-        console.log("Connected!");
+// Opcodes of the change types used by web.core.encoding.CompactEncoder
+var CHANGE_TYPES = ['update', 'added', 'moved', 'removed', 'batch',
+                    'refresh', 'trigger', null, null, 'reordered',
+                    'removed_many'];
+var RESET = 7;
+var SEQUENCE = 8;
+
+// Decode msgpack data into the compact form of a change
+function unpack(buffer) {
+    var view = new DataView(buffer);
+    var bytes = new Uint8Array(buffer);
+    var pos = 0;
+    var decoder = new TextDecoder();
+
+    function str(n) {
+        var s = decoder.decode(bytes.subarray(pos, pos+n));
+        pos += n;
+        return s;
+    }
+    function array(n) {
+        var a = [];
+        for (var i=0; i<n; i++) a.push(read());
+        return a;
+    }
+    function map(n) {
+        var m = {};
+        for (var i=0; i<n; i++) {
+            var k = read();
+            m[k] = read();
+        }
+        return m;
+    }
+    function read() {
+        var b = bytes[pos++], v;
+        if (b <= 0x7f) return b;
+        if (b >= 0xe0) return b - 0x100;
+        if ((b & 0xe0) === 0xa0) return str(b & 0x1f);
+        if ((b & 0xf0) === 0x90) return array(b & 0x0f);
+        if ((b & 0xf0) === 0x80) return map(b & 0x0f);
+        switch (b) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xca: v = view.getFloat32(pos); pos += 4; return v;
+            case 0xcb: v = view.getFloat64(pos); pos += 8; return v;
+            case 0xcc: return bytes[pos++];
+            case 0xcd: v = view.getUint16(pos); pos += 2; return v;
+            case 0xce: v = view.getUint32(pos); pos += 4; return v;
+            case 0xcf: v = Number(view.getBigUint64(pos)); pos += 8; return v;
+            case 0xd0: return view.getInt8(pos++);
+            case 0xd1: v = view.getInt16(pos); pos += 2; return v;
+            case 0xd2: v = view.getInt32(pos); pos += 4; return v;
+            case 0xd3: v = Number(view.getBigInt64(pos)); pos += 8; return v;
+            case 0xd9: return str(bytes[pos++]);
+            case 0xda: v = view.getUint16(pos); pos += 2; return str(v);
+            case 0xdb: v = view.getUint32(pos); pos += 4; return str(v);
+            case 0xdc: v = view.getUint16(pos); pos += 2; return array(v);
+            case 0xdd: v = view.getUint32(pos); pos += 4; return array(v);
+            case 0xde: v = view.getUint16(pos); pos += 2; return map(v);
+            case 0xdf: v = view.getUint32(pos); pos += 4; return map(v);
+        }
+        throw new Error("Unsupported msgpack type " + b);
+    }
+    return read();
+}
+
+// Decode changes sent by web.core.encoding.CompactEncoder. Ids and names
+// are sent as a string the first time and by index in the table after.
+function CompactDecoder() {
+    var self = this;
+    var strings = [];
+    this.sequence = 0;
+
+    function lookup(ref) {
+        if (typeof ref === 'number') return strings[ref];
+        strings.push(ref);
+        return ref;
+    }
+
+    function expand(record) {
+        var op = record[0];
+        if (op === RESET) {
+            strings = [];
+            return expand(record[1]);
+        }
+        if (op === SEQUENCE) {
+            self.sequence = record[1];
+            return expand(record[2]);
+        }
+        var change = {
+            id: lookup(record[1]),
+            type: CHANGE_TYPES[op] || op
+        };
+        if (op === 0) {
+            change.name = lookup(record[2]);
+            change.value = record[3];
+            if (record.length > 4) change.oldvalue = record[4];
+        } else if (op === 1) {
+            change.name = 'children';
+            change.value = record[2];
+            change.index = record[3];
+        } else if (op === 2) {
+            change.name = 'children';
+            change.value = lookup(record[2]);
+            change.index = record[3];
+        } else if (op === 3) {
+            change.name = 'children';
+            change.value = lookup(record[2]);
+        } else if (op === 4) {
+            change.name = 'changes';
+            change.value = record[2].map(expand);
+        } else if (op === 9 || op === 10) {
+            change.name = 'children';
+            change.value = record[2].map(lookup);
+        } else {
+            change.name = lookup(record[2]);
+            change.value = record[3];
+        }
+        return change;
+    }
+
+    this.decode = function(data) {
+        var record = (typeof data === 'string') ? JSON.parse(data) : unpack(data);
+        return expand(record);
     };
+}
 
-    ws.onmessage = function(evt) {
-        var change = JSON.parse(evt.data);
-        console.log(change);
+function initViewer(ref) {
+    // Sequence number of the last change received. It is sent when
+    // reconnecting to get the changes missed.
+    var seq = 0;
+    var ws;
+
+    function connect() {
+        ws = new WebSocket("ws://localhost:8888/websocket/?ref="+ref+"&seq="+seq);
+        var decoder = new CompactDecoder();
+        decoder.sequence = seq;
+        ws.binaryType = 'arraybuffer';
+        ws.onopen = function(evt) {
+            console.log("Connected!");
+        };
+        ws.onmessage = function(evt) {
+            var change = decoder.decode(evt.data);
+            seq = decoder.sequence;
+            console.log(change);
+            applyChange(change);
+        };
+        ws.onclose = function(evt) {
+            console.log("Disconnected!");
+            if (evt.code === 4000) {
+                // The changes missed are no longer kept
+                window.location.reload();
+            } else {
+                setTimeout(connect, 1000);
+            }
+        };
+    }
+
+    function applyChange(change) {
         var $tag = $('#'+change.id);
         change.object = $tag;
 
-        if (change.type === 'refresh') {
+        if (change.type === 'batch') {
+            change.value.forEach(applyChange);
+        } else if (change.type === 'refresh') {
             $tag.html(change.value);
         } else if (change.type === 'trigger') {
             $tag.trigger(change.value);
@@ -18,6 +170,17 @@ function initViewer(ref) {
             $tag.append($(change.value));
         } else if (change.type === 'removed') {
             $tag.find('#'+change.value).remove();
+        } else if (change.type === 'removed_many') {
+            change.value.forEach(function(id) {
+                var child = document.getElementById(id);
+                if (child) child.remove();
+            });
+        } else if (change.type === 'reordered') {
+            // Append each child in order to move them all in one pass
+            var node = $tag.get(0);
+            change.value.forEach(function(id) {
+                node.appendChild(document.getElementById(id));
+            });
         } else if (change.type === 'update') {
             if (change.name==="text") {
                 var node = $tag.contents().get(0);
@@ -39,11 +202,7 @@ function initViewer(ref) {
         } else {
             console.log("Unknown change type");
         }
-    };
-
-    ws.onclose = function(evt) {
-        console.log("Disconnected!");
-    };
+    }
 
     function sendEvent(change) {
         console.log(change);
@@ -59,6 +218,8 @@ function initViewer(ref) {
         });
     };
 
+    connect();
+
     $(document).on('click', '[clickable]',function(e){
         e.preventDefault();
         sendEvent({
@@ -6,6 +6,8 @@ import tornado.websocket
 import tornado.ioloop
 from tornado.log import enable_pretty_logging
 from web.core.app import WebApplication
+from web.core.encoding import CompactEncoder
+from web.core.outbox import ChangeQueue
 
 with enaml.imports():
     from viewer import Viewer
@@ -52,6 +54,9 @@ class ViewerHandler(tornado.web.RequestHandler):
 
 class ViewerWebSocket(tornado.websocket.WebSocketHandler):
     viewer = None
+    encoder = None
+    queue = None
+    sending = False
 
     def open(self):
         # Store the viewer in the cache
@@ -64,6 +69,28 @@ class ViewerWebSocket(tornado.websocket.WebSocketHandler):
         # Get a viewer reference
         self.viewer = CACHE[ref]
 
+        # Changes are sent in a compact form with ids interned so each
+        # connection needs it's own encoder
+        self.encoder = CompactEncoder()
+
+        # Changes wait in a queue until the last one was written so a slow
+        # client cannot use unbounded memory. If too many are waiting they
+        # are replaced with a refresh of the part of the page they changed.
+        self.queue = ChangeQueue(view=self.viewer, max_changes=500)
+
+        # A client which reconnects sends the sequence number of the last
+        # change it got so it can be sent the ones it missed. If they are no
+        # longer kept it must reload the page.
+        seq = self.get_argument("seq", None)
+        if seq is not None:
+            missed = self.viewer.changes_since(int(seq))
+            if missed is None:
+                self.close(4000, "Reload")
+                return
+            for i, change in enumerate(missed):
+                self.queue.put(change, int(seq) + i + 1)
+            self.send_queued()
+
         # Setup an observer to watch changes on the enaml view
         self.viewer.observe('modified', self.on_dom_modified)
 
@@ -75,25 +102,12 @@ class ViewerWebSocket(tornado.websocket.WebSocketHandler):
         change = json.loads(message)
         log.debug(f'Update from js: {change}')
 
-        # Lookup the node
-        ref = change.get('id')
-        if not ref:
-            return
-        nodes = self.viewer.xpath('//*[@id=$ref]', ref=ref)
-        if not nodes:
-            return  # Unknown node
-        node = nodes[0]
-
-        # Trigger the change on the enaml node
-        if change.get('type') and change.get('name'):
-            if change['type'] == 'event':
-                trigger = getattr(node, change['name'])
-                trigger()
-            elif change['type'] == 'update':
-                # Trigger the update
-                setattr(node, change['name'], change['value'])
-        else:
-            log.warning(f"Unhandled event {self} {node}: {change}")
+        # Lookup the node and trigger the change on it
+        try:
+            if self.viewer.dispatch(change) is None:
+                log.debug(f'Unknown node {change.get("id")}')
+        except ValueError as e:
+            log.warning(f'Unhandled event {self}: {e}')
 
     def on_dom_modified(self, change):
         """ When an event from enaml occurs, send it out the websocket
@@ -101,7 +115,28 @@ class ViewerWebSocket(tornado.websocket.WebSocketHandler):
 
         """
         log.debug(f'Update from enaml: {change}')
-        self.write_message(json.dumps(change['value']))
+        self.queue.put(change['value'], self.viewer.sequence)
+        self.send_queued()
+
+    def send_queued(self):
+        if not self.sending:
+            self.sending = True
+            tornado.ioloop.IOLoop.current().add_callback(self.write_queued)
+
+    async def write_queued(self):
+        """ Write the queued changes one at a time, waiting for each to be
+        sent before the next.
+
+        """
+        try:
+            while (item := self.queue.pop()) is not None:
+                seq, change = item
+                data = self.encoder.encode(change, sequence=seq)
+                await self.write_message(data, binary=isinstance(data, bytes))
+        except tornado.websocket.WebSocketClosedError:
+            pass
+        finally:
+            self.sending = False
 
     def on_close(self):
         log.debug(f'WebSocket {self} closed')
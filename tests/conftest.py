@@ -33,3 +33,10 @@ def compile_source(source, item, filename="<test>", namespace=None):
 def app():
     app = WebApplication.instance() or WebApplication()
     yield app
+
+
+@pytest.fixture(params=["lxml", "string"])
+def backend(app, request):
+    app.backend = request.param
+    yield request.param
+    app.backend = "lxml"
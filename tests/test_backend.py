@@ -0,0 +1,222 @@
+import io
+import gzip
+import asyncio
+import pytest
+from textwrap import dedent
+from lxml.html import fragment_fromstring
+from conftest import compile_source
+from web.components.html import Tag, gen_id
+from web.core.api import hoist_static
+from web.impl.str_toolkit_object import StrComponent
+
+SOURCE = dedent(
+    """
+from web.components.api import *
+from web.core.api import *
+
+enamldef Page(Html): view:
+    attr items: list = []
+    attr title: str = "Test"
+    attr raw = None
+    attrs = {"lang": "en"}
+    Head:
+        Title:
+            text << view.title
+        Meta:
+            attrs = {"charset": "utf-8"}
+        Script:
+            text = "if (a < b && c > d) {}"
+    Body:
+        Nav:
+            Ul:
+                cls = ["nav", "dark"]
+                style = {"color": "red"}
+                Li:
+                    A:
+                        href = "/ü/a b"
+                        text = "Home"
+                        tail = " & more"
+        Img:
+            src = "/img.png"
+            text = "Dropped"
+            tail = "after"
+        Form:
+            Input:
+                type = "checkbox"
+                name = "agree"
+                checked = True
+            Button:
+                text = "Submit"
+        Raw:
+            source << view.raw
+        Ul: items:
+            Looper:
+                iterable << view.items
+                Li:
+                    attrs = {"data-index": str(loop_index)}
+                    text = loop_item
+"""
+)
+
+
+#: Run a test with the string backend
+string_backend = pytest.mark.parametrize("backend", ["string"], indirect=True)
+
+
+def render(view):
+    """Render the view and remove the generated ids"""
+    html = view.render()
+    for d in view.traverse():
+        if isinstance(d, Tag) and d.id == gen_id(d):
+            html = html.replace(f' id="{d.id}"', "")
+            html = html.replace(f' name="{d.id}"', "")
+    return html
+
+
+def update(view):
+    view.title = "Changed <title>"
+    view.items = ["a", "b & c", "d"]
+    view.raw = [fragment_fromstring("<p>Raw <b>html</b></p>")]
+    view.items = ["b & c", "e"]
+
+
+@pytest.mark.parametrize("backend", ["lxml"], indirect=True)
+def test_str_backend(app, backend):
+    Page = compile_source(SOURCE, "Page")
+    view = Page(items=["x", "y"])
+    expected = render(view)
+    update(view)
+    expected_update = render(view)
+
+    # The fixture switches back to lxml afterwards
+    app.backend = "string"
+    view = Page(items=["x", "y"])
+    assert render(view) == expected
+    assert isinstance(view.proxy, StrComponent)
+    evts = []
+    view.observe("modified", evts.append)
+    update(view)
+    assert evts
+    assert render(view) == expected_update
+
+
+@string_backend
+def test_str_backend_render(backend):
+    Page = compile_source(SOURCE, "Page")
+    view = Page(items=["x", "y"])
+    html = view.render()
+    assert view.render_bytes() == html.encode()
+    assert (
+        b"".join(view.render_iter(render_options={"chunk_size": 10})) == html.encode()
+    )
+    buf = bytearray()
+    assert view.render_into(buf) == len(buf)
+    f = io.BytesIO()
+    view.render_into(f)
+    assert f.getvalue() == buf == html.encode()
+    assert asyncio.run(view.render_async()) == html
+
+    # Children render on their own
+    ul = view.xpath("//ul")[1]
+    assert ul.render() in html
+
+    # Changing a node only renders that node again
+    li = view.xpath("//li")[-1]
+    li.text = "z"
+    assert view.proxy.output is None
+    assert "z</li>" in view.render()
+    assert view.proxy.output is not None
+
+    with pytest.raises(ValueError):
+        view.render(render_options={"method": "xml"})
+
+
+@string_backend
+def test_str_backend_xpath(backend):
+    Page = compile_source(SOURCE, "Page")
+    view = Page(items=["x", "y"])
+    view.render()
+    items = view.xpath("//li[@data-index]")
+    assert [li.text for li in items] == ["x", "y"]
+    assert view.xpath("//a")[0].text == "Home"
+    assert view.xpath("//table") == []
+
+
+@string_backend
+def test_str_backend_hoisted(backend):
+    Page = compile_source(SOURCE, "Page")
+    Expected = compile_source(SOURCE, "Page")
+    assert hoist_static(Page) > 0
+    view = Page(items=["x"])
+    assert render(view) == render(Expected(items=["x"]))
+    view.items = ["a", "b"]
+    assert render(view) == render(Expected(items=["a", "b"]))
+
+
+@string_backend
+def test_str_backend_compressed(backend):
+    Page = compile_source(SOURCE, "Page")
+    view = Page(items=["x", "y"])
+    output = view.render(render_options={"compress": "gzip"})
+    assert gzip.decompress(output) == view.render_bytes()
+    assert view.render(render_options={"compress": "gzip"}) is output
+    view.items = ["z"]
+    changed = view.render(render_options={"compress": "gzip"})
+    assert changed is not output
+    assert gzip.decompress(changed) == view.render_bytes()
+
+
+@string_backend
+def test_str_backend_etag(backend):
+    Page = compile_source(SOURCE, "Page")
+    view = Page(items=["x", "y"])
+    etag = view.etag()
+    assert view.etag() == etag
+    li = view.xpath("//li[@data-index]")[0]
+    li.text = "z"
+    assert view.etag() != etag
+    li.text = "x"
+    assert view.etag() == etag
+    view.items = ["x", "y", "z"]
+    assert view.etag() != etag
+
+    # Hoisted subtrees
+    Page = compile_source(SOURCE, "Page")
+    assert hoist_static(Page) > 0
+    view = Page(items=["x"])
+    etag = view.etag()
+    view.title = "Changed"
+    assert view.etag() != etag
+
+
+@string_backend
+def test_str_backend_fragment(backend):
+    Page = compile_source(SOURCE, "Page")
+    view = Page(items=["x", "y"])
+    html = view.render()
+    ul = view.xpath("//ul")[1]
+    assert view.render_fragment(ul.id) == ul.render()
+    assert ul.render() in html
+    view.items = ["z"]
+    assert ">z<" in view.render_fragment(f"#{ul.id}")
+    assert view.render_fragment("//a") == view.xpath("//a")[0].render()
+    assert view.render_fragment([ul.id, view.id])[1] == view.render()
+    with pytest.raises(KeyError):
+        view.render_fragment("missing")
+
+
+@string_backend
+def test_str_backend_rebuild(backend):
+    Page = compile_source(SOURCE, "Page")
+    view = Page(items=["x", "y"])
+    view.render()
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    with view.xpath("//ul")[1].rebuild():
+        view.items = ["y", "z"]
+    changes = evts[-1]["value"]
+    assert changes and all(c["type"] != "refresh" for c in changes)
+    # The y node was kept
+    y = view.xpath("//li[@data-index]")[0]
+    assert y.text == "y"
+    assert not [c for c in changes if c["name"] == "id" and c["value"] == y.id]
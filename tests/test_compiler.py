@@ -0,0 +1,194 @@
+import pytest
+from textwrap import dedent
+from conftest import compile_source
+from web.components.html import Tag, gen_id
+from web.core.api import compile_view, hoist_static
+from web.core.markup import format_attr, quote_attr, escape_text
+
+SOURCE = dedent(
+    """
+from web.components.api import *
+from web.core.api import *
+
+enamldef Page(Html): view:
+    attr items: list = []
+    attr title: str = "Test"
+    attr logged_in: bool = False
+    alias heading: h1.text
+    attrs = {"lang": "en"}
+    Head:
+        Title:
+            text << view.title
+        Meta:
+            attrs = {"charset": "utf-8"}
+        Script:
+            text = "if (a < b && c > d) {}"
+        Style:
+            text = "a > b {color: red}"
+    Body:
+        Nav:
+            Ul:
+                id = "menu"
+                cls = ["nav", "dark"]
+                Li:
+                    A:
+                        href = "/ü/a b"
+                        text = "Home"
+                        tail = " & more"
+        H1: h1:
+            text = "Default"
+            tail = "<tail>"
+        P:
+            text = f"{h1.text} is {len(view.items)} {self.tag}s"
+            style = {"color": "red", "width": "10px"}
+            attrs = {"class": "replaced", "data-x": 'a"b'}
+            cls = "original"
+        Img:
+            src = "/img.png"
+            text = "Dropped"
+            tail = "after"
+        Form:
+            Input:
+                type = "checkbox"
+                name = "agree"
+                checked << view.logged_in
+            Select:
+                name = "choice"
+                disabled = True
+                Option:
+                    value = "1"
+                    selected = True
+            Button:
+                name = "submit"
+                text = "Submit"
+            Button:
+                text = "No name"
+        Conditional:
+            condition << view.logged_in
+            P:
+                text = "Welcome"
+        Ul: items:
+            Looper:
+                iterable << view.items
+                Li:
+                    attrs = {"data-index": str(loop_index)}
+                    clickable = loop_index % 2 == 0
+                    text = loop_item["name"]
+                    Looper:
+                        iterable = loop_item["tags"]
+                        Span:
+                            cls = ["tag", loop.item]
+                            text = f"{loop_index}: {loop_item} of {parent.parent.text}"
+                    Conditional:
+                        condition = bool(loop_item["tags"])
+                        A:
+                            href = f"/item/{loop_item}"
+                            text = "Link"
+"""
+)
+
+ITEMS = [
+    {"name": "a & b", "tags": ["x", "y"]},
+    {"name": "c", "tags": []},
+    {"name": "d", "tags": ["z"]},
+]
+
+
+def strip_ids(view):
+    """Render the view and remove the generated ids"""
+    html = view.render()
+    for d in view.traverse():
+        if isinstance(d, Tag) and d.id == gen_id(d):
+            html = html.replace(f' id="{d.id}"', "")
+            html = html.replace(f' name="{d.id}"', "")
+    return html
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    (
+        {},
+        {"items": ITEMS},
+        {"items": ITEMS, "logged_in": True, "title": "<Title>"},
+        {"heading": "Changed", "id": "page", "style": "margin:0"},
+    ),
+)
+def test_compile_view(app, kwargs):
+    Page = compile_source(SOURCE, "Page")
+    compiled = compile_view(Page)
+    assert compiled.func is not None, compiled.reason
+    expected = strip_ids(Page(**kwargs))
+    assert compiled(**kwargs) == expected
+    assert compiled.render(**kwargs) == expected
+
+
+def test_compile_view_inherited(app):
+    Base = compile_source(SOURCE, "Page")
+    ns = {"BasePage": Base}
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+
+    enamldef Page(BasePage): page:
+        title = "Inherited"
+        Footer:
+            P:
+                text = f"{page.title} {len(items)}"
+    """
+        ),
+        "Page",
+        namespace=ns,
+    )
+    # The children of the base enamldef are compiled
+    compiled = compile_view(Page)
+    assert compiled.func is not None, compiled.reason
+    assert compiled(items=ITEMS) == strip_ids(Page(items=ITEMS))
+
+
+def test_compile_view_hoisted(app):
+    Page = compile_source(SOURCE, "Page")
+    expected = strip_ids(Page(items=ITEMS))
+    assert hoist_static(Page) > 0
+    compiled = compile_view(Page)
+    assert compiled.func is not None, compiled.reason
+    assert compiled(items=ITEMS) == expected
+
+
+def test_compile_view_fallback(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Item(Li):
+        text = "Item"
+
+    enamldef Page(Html):
+        Body:
+            Ul:
+                Item:
+                    pass
+    """
+        ),
+        "Page",
+    )
+    compiled = compile_view(Page)
+    assert compiled.func is None
+    assert "Item" in compiled.reason
+    # The view is rendered the normal way
+    assert "<li" in compiled()
+
+    with pytest.raises(TypeError):
+        compile_view(Tag)
+
+
+def test_markup():
+    assert escape_text("a<b>&c\r") == "a&lt;b&gt;&amp;c&#13;"
+    assert quote_attr('a"b') == "'a\"b'"
+    assert quote_attr("a\"b'c") == '"a&quot;b\'c"'
+    assert format_attr("input", "checked", "false") == " checked"
+    assert format_attr("a", "href", " /ü b?x=1&y") == ' href="/%C3%BC%20b?x=1&amp;y"'
+    assert format_attr("a", "name", "a b") == ' name="a%20b"'
+    assert format_attr("div", "name", "a b") == ' name="a b"'
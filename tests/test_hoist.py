@@ -0,0 +1,123 @@
+import re
+from textwrap import dedent
+from conftest import compile_source
+from web.core.api import hoist_static
+from web.core.hoist import StaticNode, is_static
+from web.components.static import Static
+
+SOURCE = dedent(
+    """
+from web.components.api import *
+from web.core.api import *
+
+enamldef Page(Html): view:
+    attr items: list = []
+    attr title: str = "Test"
+    Head:
+        Title:
+            text = "Static"
+        Meta:
+            attrs = {"charset": "utf-8"}
+    Body:
+        Nav:
+            Ul:
+                id = "menu"
+                Li:
+                    A:
+                        href = "/ü/"
+                        text = "Home"
+                        tail = " & more"
+        H1:
+            text << view.title
+        Ul: items:
+            Looper:
+                iterable << view.items
+                Li:
+                    Span:
+                        text = loop_item
+                    Button:
+                        name = "remove"
+                        text = "Remove"
+                        cls = ["btn", "red"]
+        Div:
+            clicked :: print("clicked")
+            P:
+                text = "Inner"
+        Footer:
+            P:
+                text = "Footer"
+"""
+)
+
+
+def strip_ids(html):
+    return re.sub(r' id="[^"]+"', "", html)
+
+
+def test_hoist_static(app):
+    Page = compile_source(SOURCE, "Page")
+    Expected = compile_source(SOURCE, "Page")
+    items = ["a", "b"]
+    expected = strip_ids(Expected(items=items).render())
+
+    # Head, Nav, the Button in the looper, the P in the Div, and the Footer
+    assert hoist_static(Page) == 5
+    assert hoist_static(Page) == 0
+
+    view = Page(items=items)
+    html = view.render()
+    assert strip_ids(html) == expected
+    # Explicit ids are kept
+    assert 'id="menu"' in html
+    # The view still has it's own id
+    assert f'id="{view.id}"' in html
+
+    # Output is shared between instances
+    other = Page(items=["c"])
+    other.render()
+    a = [c for c in view.traverse() if isinstance(c, Static)]
+    b = [c for c in other.traverse() if isinstance(c, Static)]
+    assert a[0].proxy.output is b[0].proxy.output
+    assert a[0].proxy.widget is not b[0].proxy.widget
+    assert a[0].proxy.etag() == b[0].proxy.etag()
+
+    # Dynamic parts still work
+    evts = []
+    view.observe("modified", evts.append)
+    view.title = "Changed"
+    view.items = ["a", "b", "c"]
+    assert evts
+    html = view.render()
+    assert strip_ids(html) == strip_ids(
+        Expected(items=view.items, title="Changed").render()
+    )
+    view.destroy()
+
+
+def test_hoist_static_nodes(app):
+    Page = compile_source(SOURCE, "Page")
+    node = Page.__node__
+    head, body = node.children
+    assert is_static(head)
+    assert not is_static(body)
+    hoist_static(Page)
+    assert isinstance(node.children[0], StaticNode)
+    assert not isinstance(node.children[1], StaticNode)
+    copy = node.children[0].copy()
+    assert copy.node is head
+
+    # Form controls use the id as the default name
+    Form = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+
+    enamldef Form(Html):
+        Body:
+            Button:
+                text = "Edit"
+    """
+        ),
+        "Form",
+    )
+    assert hoist_static(Form) == 0
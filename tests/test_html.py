@@ -1,7 +1,11 @@
+import io
+import gzip
+import asyncio
 import inspect
 import pytest
 from textwrap import dedent
 from lxml import html
+from lxml.etree import tostring
 from conftest import compile_source
 
 try:
@@ -190,6 +194,14 @@ def test_tag_proxy(app):
         proxy.xpath("")
     with pytest.raises(NotImplementedError):
         proxy.render()
+    with pytest.raises(NotImplementedError):
+        proxy.render_iter()
+    with pytest.raises(NotImplementedError):
+        asyncio.run(proxy.render_async())
+    with pytest.raises(NotImplementedError):
+        proxy.render_bytes()
+    with pytest.raises(NotImplementedError):
+        proxy.render_into(bytearray())
 
 
 def test_looper(app):
@@ -486,6 +498,57 @@ def test_node_added(app):
     assert v["id"] == parent_ref  # value is also the dom inserted
 
 
+def test_nodes_added_together(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr menu: list = []
+        Body:
+            Ul:
+                Li:
+                    text = '1'
+                Looper:
+                    iterable << view.menu
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    view.render()
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+
+    # Children inserted next to each other are sent in one event
+    before = html.fromstring(view.render())
+    view.menu = ["2", "3", "4"]
+    assert len(evts) == 1
+    e = evts[0]
+    assert e["type"] == "added" and e["index"] == 1
+    assert e["value"].count("<li") == 3
+    apply_changes(before, evts)
+    assert tostring(before) == tostring(html.fromstring(view.render()))
+
+    # Each run is a separate event
+    evts.clear()
+    view.menu = ["a", "2", "3", "b", "c", "4", "d"]
+    assert [(e["type"], e["index"]) for e in evts] == [
+        ("added", 1),
+        ("added", 4),
+        ("added", 7),
+    ]
+    before = html.fromstring(view.render())
+    evts.clear()
+    view.menu = ["e", "f", "a", "g", "2"]
+    apply_changes(before, evts)
+    assert tostring(before) == tostring(html.fromstring(view.render()))
+
+
 def test_note_insert_before(app):
     Page = compile_source(
         dedent(
@@ -750,3 +813,1669 @@ def test_node_destroy(app):
     assert len(view.xpath("//p")) == 1
     view.children[1].children[0].destroy()
     assert len(view.xpath("//p")) == 0
+
+
+def test_render_cache(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr items: list = []
+        attr selected = ""
+        Head:
+            Title:
+                text = "Test"
+        Body:
+            Ul:
+                Looper:
+                    iterable << view.items
+                    Li:
+                        cls << "active" if loop_item == view.selected else ""
+                        text = loop_item
+            P:
+                text = "Done"
+                tail = "é"
+    """
+        ),
+        "Page",
+    )
+    view = Page(items=[str(i) for i in range(100)])
+    r = view.render()
+    assert r == tostring(view.proxy.widget, method="html", encoding="unicode")
+
+    # Change a single node
+    view.selected = "50"
+    proxy = view.proxy
+    assert proxy.dirty
+    ul = view.xpath("//ul")[0]
+    li = ul.children[1].proxy
+    assert ul.proxy.dirty and not li.dirty
+
+    r = view.render()
+    assert r == tostring(view.proxy.widget, method="html", encoding="unicode")
+    assert 'class="active"' in r
+    assert not proxy.dirty and not ul.proxy.dirty
+
+    # Clean siblings are reused as is
+    output = li.output
+    view.selected = "51"
+    r = view.render()
+    assert li.output is output
+    assert r == tostring(view.proxy.widget, method="html", encoding="unicode")
+    assert view.render(render_options={"encoding": "utf-8"}) == r.encode()
+
+    # Children added and removed
+    view.items = ["a", "b"]
+    r = view.render()
+    assert r == tostring(view.proxy.widget, method="html", encoding="unicode")
+    assert len(view.xpath("//li")) == 2
+
+
+def test_render_iter(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        Head:
+            Title:
+                text = "Test"
+        Body:
+            Table:
+                TBody:
+                    Looper:
+                        iterable << view.rows
+                        Tr:
+                            Td:
+                                text = loop_item
+                            Td:
+                                A:
+                                    href = "/ü/"
+                                    text = loop_item
+                                    tail = " é"
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    evts = []
+    view.observe("modified", evts.append)
+    chunks = list(view.render_iter(rows=[str(i) for i in range(1000)]))
+    assert len(chunks) > 1
+    expected = tostring(view.proxy.widget, method="html", encoding="utf-8")
+    assert b"".join(chunks) == expected
+
+    # Rendering marks the view as rendered
+    view.rows = ["a"]
+    assert evts
+
+    # Small chunks
+    chunks = list(view.render_iter(render_options={"chunk_size": 1}))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == view.render().encode()
+
+
+def test_render_async(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        Body:
+            Table:
+                TBody:
+                    Looper:
+                        iterable << view.rows
+                        Tr:
+                            Td:
+                                text = loop_item
+                            Td:
+                                A:
+                                    href = "/ü/"
+                                    text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    evts = []
+    view.observe("modified", evts.append)
+
+    async def main():
+        rows = [str(i) for i in range(1000)]
+        html = await view.render_async(rows=rows)
+        assert html == tostring(view.proxy.widget, method="html", encoding="unicode")
+
+        # Rendering marks the view as rendered
+        view.rows = ["a", "b"]
+        assert evts
+
+        # Changes made during the render wait until it is complete
+        task = asyncio.ensure_future(view.render_async())
+        await asyncio.sleep(0)
+        assert view.proxy.render_task is not None
+        view.rows = ["c"]
+        html = await task
+        assert ">a<" in html and ">b<" in html and ">c<" not in html
+        assert view.proxy.render_task is None
+
+        # Cached output is returned directly
+        html = await view.render_async(render_options={"encoding": "utf-8"})
+        assert html == view.render().encode()
+        assert ">c<" in view.render()
+
+        # Other options
+        xml = await view.render_async(render_options={"method": "xml"})
+        assert xml.startswith("<html")
+
+    asyncio.run(main())
+
+
+def test_render_into(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        Body:
+            Ul:
+                Looper:
+                    iterable << view.rows
+                    Li:
+                        text = loop_item
+                        tail = "ü"
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    evts = []
+    view.observe("modified", evts.append)
+    buf = bytearray()
+    n = view.render_into(buf, rows=["a", "b", "c"])
+    assert n == len(buf)
+    expected = tostring(view.proxy.widget, method="html", encoding="utf-8")
+    assert bytes(buf) == expected
+    assert view.render_bytes() is view.render_bytes()
+
+    # Rendering marks the view as rendered
+    view.rows = ["a", "b", "c", "d"]
+    assert evts
+
+    # Only the changed parts are written
+    li = view.xpath("//li")[1]
+    li.text = "e"
+    f = io.BytesIO()
+    n = view.render_into(f)
+    expected = tostring(view.proxy.widget, method="html", encoding="utf-8")
+    assert f.getvalue() == expected
+    assert n == len(expected)
+
+    li.text = "f"
+    f = io.BytesIO()
+    n = view.render_into(f)
+    expected = tostring(view.proxy.widget, method="html", encoding="utf-8")
+    assert f.getvalue() == expected
+    assert n == len(expected)
+    assert view.proxy.output is None
+    assert list(view.render_iter()) == [expected]
+    assert view.render_bytes() == expected
+    assert view.render() == expected.decode()
+
+    # Unchanged
+    buf = bytearray()
+    assert view.render_into(buf) == len(expected)
+    assert buf == expected
+
+
+def test_render_compressed(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        Body:
+            Ul:
+                Looper:
+                    iterable << view.rows
+                    Li:
+                        text = loop_item
+                        tail = "ü"
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    evts = []
+    view.observe("modified", evts.append)
+    output = view.render(render_options={"compress": "gzip"}, rows=["a", "b"])
+    assert gzip.decompress(output) == view.render_bytes()
+
+    # Rendering marks the view as rendered
+    view.rows = ["a", "b", "c"]
+    assert evts
+
+    # The compressed output is reused until the view changes
+    output = view.render(render_options={"compress": "gzip"})
+    version = view.proxy.version
+    assert view.render(render_options={"compress": "gzip"}) is output
+    li = view.xpath("//li")[1]
+    li.text = "d"
+    assert view.proxy.version > version
+    changed = view.render(render_options={"compress": "gzip", "encoding": "utf-8"})
+    assert changed is not output
+    assert gzip.decompress(changed) == view.render_bytes()
+    assert b">d<" in gzip.decompress(changed)
+
+    # Children and other options are not cached
+    output = li.render(render_options={"compress": "gzip"})
+    assert gzip.decompress(output) == li.render().encode()
+    output = view.render(render_options={"compress": "gzip", "method": "xml"})
+    assert gzip.decompress(output).startswith(b"<html")
+    output = asyncio.run(view.render_async(render_options={"compress": "gzip"}))
+    assert gzip.decompress(output) == view.render_bytes()
+
+    with pytest.raises(ValueError):
+        view.render(render_options={"compress": "unknown"})
+
+
+def test_etag(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        attr raw = "<b>Raw</b>"
+        Body:
+            Ul:
+                Looper:
+                    iterable << view.rows
+                    Li:
+                        text = loop_item
+            Raw:
+                source << view.raw
+    """
+        ),
+        "Page",
+    )
+    view = Page(rows=["a", "b"])
+    etag = view.etag()
+    assert etag.startswith('"') and etag.endswith('"')
+    assert view.etag() == etag
+
+    # Nothing is rendered
+    assert view.proxy.output is None
+
+    # Changing a node changes the etag and changing it back restores it
+    li = view.xpath("//li")[1]
+    li.text = "c"
+    changed = view.etag()
+    assert changed != etag
+    li.text = "b"
+    assert view.etag() == etag
+
+    # Attributes
+    li.cls = "active"
+    assert view.etag() not in (etag, changed)
+    view.render()
+
+    # Children added and removed
+    view.rows = ["a", "b", "c"]
+    assert view.etag() != etag
+    view.raw = "<i>Raw</i>"
+    assert li.parent.etag() != view.etag()
+    etag = view.etag()
+    view.raw = "<b>Raw</b>"
+    assert view.etag() != etag
+
+
+def test_render_fragment(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        attr count: int = 0
+        Body:
+            Span:
+                id = "count"
+                text << str(view.count)
+            Ul:
+                id = "rows"
+                Looper:
+                    iterable << view.rows
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    html = view.render(rows=["a", "b"])
+    ul = view.find_by_id("rows")
+    span = view.find_by_id("count")
+    assert view.render_fragment("rows") == ul.render()
+    assert view.render_fragment("#rows") in html
+
+    # Cached output is reused
+    output = view.render_fragment("rows", render_options={"encoding": "utf-8"})
+    assert output is ul.proxy.output
+
+    # Only the changed fragment is rendered
+    view.count = 2
+    assert view.render_fragment("count") == '<span id="count">2</span>'
+    assert ul.proxy.output is output
+
+    # Multiple fragments
+    assert view.render_fragment(["count", "rows"], rows=["c"]) == [
+        span.render(),
+        ul.render(),
+    ]
+    assert ">c<" in view.render_fragment("rows")
+
+    # Selectors
+    assert view.render_fragment("//span") == span.render()
+    view.rows = ["d", "e"]
+    assert view.render_fragment("//li") == "".join(
+        li.render() for li in view.xpath("//li")
+    )
+
+    with pytest.raises(KeyError):
+        view.render_fragment("missing")
+    with pytest.raises(KeyError):
+        view.render_fragment("//table")
+
+
+def test_batch(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        attr title: str = ""
+        Body:
+            H1:
+                text << view.title
+            Ul:
+                Looper:
+                    iterable << view.rows
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page(rows=["a"])
+    view.render()
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+
+    with view.batch() as changes:
+        view.title = "Loading"
+        view.rows = ["b", "c"]
+        # Nested batches are part of the outer one
+        with view.batch() as inner:
+            view.title = "Done"
+        assert inner is changes
+        assert not evts
+
+    assert len(evts) == 1
+    e = evts[0]
+    assert e["type"] == "batch" and e["id"] == view.id
+    types = [c["type"] for c in e["value"]]
+    assert types.count("update") == 1
+    assert "added" in types and "removed" in types
+    assert e["value"][-1]["value"] == "Done"
+    assert e["value"][-1]["oldvalue"] == ""
+
+    # Nothing changed
+    with view.batch():
+        pass
+    assert len(evts) == 1
+
+    # Changes are emitted even if the block fails
+    with pytest.raises(ValueError):
+        with view.batch():
+            view.title = "Error"
+            raise ValueError()
+    assert len(evts) == 2 and evts[-1]["value"][0]["value"] == "Error"
+
+    # Outside of a batch each change is emitted
+    view.title = "Single"
+    assert evts[-1]["type"] == "update"
+
+
+def apply_changes(root, changes):
+    """Apply modified events to the parsed html like a client would"""
+    for change in changes:
+        node = root.get_element_by_id(change["id"])
+        kind = change["type"]
+        if kind == "update":
+            name = change["name"]
+            if name in ("text", "tail"):
+                setattr(node, name, change["value"] or None)
+            elif change["value"] is None:
+                del node.attrib[name]
+            else:
+                node.set("class" if name == "cls" else name, change["value"])
+        elif kind == "refresh":
+            node.text = None
+            node[:] = []
+            for child in html.fragments_fromstring(change["value"]):
+                if isinstance(child, str):
+                    node.text = child
+                else:
+                    node.append(child)
+        elif kind == "added":
+            for i, child in enumerate(html.fragments_fromstring(change["value"])):
+                node.insert(change["index"] + i, child)
+        elif kind == "removed":
+            node.remove(root.get_element_by_id(change["value"]))
+        elif kind == "moved":
+            child = root.get_element_by_id(change["value"])
+            node.remove(child)
+            node.insert(change["index"], child)
+        elif kind == "removed_many":
+            for child_id in change["value"]:
+                node.remove(root.get_element_by_id(child_id))
+        elif kind == "reordered":
+            for child_id in change["value"]:
+                node.append(root.get_element_by_id(child_id))
+
+
+def unique_ids(root):
+    """Check that no two nodes have the same id"""
+    ids = [e.get("id") for e in root.iter() if e.get("id") is not None]
+    return len(ids) == len(set(ids))
+
+
+def test_batch_coalesce(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        attr title: str = ""
+        Body:
+            H1:
+                text << view.title
+            Ul:
+                Looper:
+                    iterable << view.rows
+                    Li:
+                        text = loop_item
+                        Span:
+                            text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page(rows=["a", "b"])
+    view.render()
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    stats = view.batch_stats
+
+    # Last write wins
+    with view.batch():
+        for i in range(5):
+            view.title = f"Title {i}"
+    changes = evts[-1]["value"]
+    assert changes == [
+        {
+            "id": changes[0]["id"],
+            "type": "update",
+            "name": "text",
+            "value": "Title 4",
+            "oldvalue": "",
+        }
+    ]
+    assert stats.merged == 4
+
+    # Changing it back is not sent
+    with view.batch():
+        view.title = "Other"
+        view.title = "Title 4"
+    assert len(evts) == 1
+
+    # Nodes added then removed are never rendered
+    rendered = []
+    with view.batch():
+        view.rows = ["a", "b", "c"]
+        li = view.xpath("//li")[-1]
+        li.observe("text", rendered.append)
+        li.text = "C"
+        view.rows = ["a", "b"]
+    assert len(evts) == 1
+    assert stats.cancelled == 2 and stats.dropped == 1
+
+    # Changes to added nodes are part of the added html
+    with view.batch():
+        view.rows = ["a", "b", "c"]
+        span = view.xpath("//span")[-1]
+        span.text = "Changed"
+    changes = evts[-1]["value"]
+    assert [c["type"] for c in changes] == ["added"]
+    assert "Changed" in changes[0]["value"] and changes[0]["index"] == 2
+
+    # Changes to removed nodes are dropped
+    with view.batch():
+        view.xpath("//span")[0].text = "Removed"
+        view.rows = ["b", "c"]
+    changes = evts[-1]["value"]
+    assert [c["type"] for c in changes] == ["removed"]
+    assert stats.eliminated == stats.merged + stats.dropped + stats.cancelled
+    assert stats.received - stats.eliminated <= stats.emitted
+
+    # Applying the coalesced changes gives the same result as a render
+    for rows in (
+        ["c", "a", "d"],
+        ["e", "d", "c", "b", "a"],
+        ["a"],
+        ["z", "a", "y"],
+        [],
+        ["a", "b"],
+    ):
+        before = html.fromstring(view.render())
+        with view.batch():
+            view.rows = list(reversed(rows))
+            view.rows = rows[1:]
+            view.title = "".join(rows)
+            view.rows = rows
+        apply_changes(before, evts[-1]["value"])
+        after = tostring(before, encoding="unicode")
+        assert after == tostring(html.fromstring(view.render()), encoding="unicode")
+
+
+def test_diff_trees():
+    import random
+    from copy import deepcopy
+    from web.core.diff import diff_trees
+
+    def tree(items):
+        ul = html.fragment_fromstring('<ul id="list"></ul>')
+        for item in items:
+            li = html.fragment_fromstring(
+                f'<li id="item-{item}" class="c{item % 3}">{item}<b>{item}</b></li>'
+            )
+            ul.append(li)
+        return ul
+
+    rng = random.Random(0)
+    for n in range(20):
+        items = list(range(n))
+        old = tree(items)
+        rng.shuffle(items)
+        items = items[: rng.randint(0, n)] + list(range(n, n + rng.randint(0, 3)))
+        rng.shuffle(items)
+        new = tree(items)
+        for li in new:
+            if rng.random() < 0.2:
+                li.text = "changed"
+                li.set("class", "x")
+        changes = diff_trees(deepcopy(old), new)
+        apply_changes(old, changes)
+        assert tostring(old) == tostring(new)
+
+    # Moving one item is a single move
+    old, new = tree(range(10)), tree([9, *range(9)])
+    assert diff_trees(old, new) == [
+        {
+            "id": "list",
+            "type": "moved",
+            "name": "children",
+            "value": "item-9",
+            "index": 0,
+        }
+    ]
+
+    # Nodes are never renamed to an id that is in use
+    old = html.fragment_fromstring('<ul id="a"><li id="x"></li><li id="y"></li></ul>')
+    new = html.fragment_fromstring('<ul id="a"><li id="y"></li><li id="z"></li></ul>')
+    changes = diff_trees(deepcopy(old), new, key=lambda id: False)
+    assert not [c for c in changes if c["name"] == "id" and c["value"] == "y"]
+    apply_changes(old, changes)
+    assert tostring(old) == tostring(new)
+
+    # Nodes renamed in a cycle are moved out of the way first
+    old = html.fragment_fromstring('<ul id="a"><li id="x"><b id="y"></b></li></ul>')
+    new = html.fragment_fromstring('<ul id="a"><li id="y"><b id="x"></b></li></ul>')
+    changes = diff_trees(deepcopy(old), new, key=lambda id: False)
+    assert [c["name"] for c in changes] == ["id", "id", "id"]
+    for change in changes:
+        apply_changes(old, [change])
+        assert unique_ids(old)
+    assert tostring(old) == tostring(new)
+
+    # A refreshed node holding an id needed elsewhere is emptied first
+    old = html.fragment_fromstring(
+        '<div id="r"><p id="a"><b>x</b><i id="k"></i></p><p id="m"></p></div>'
+    )
+    new = html.fragment_fromstring(
+        '<div id="r"><p id="a"><b>y</b></p><p id="k"></p></div>'
+    )
+    changes = diff_trees(deepcopy(old), new, key=lambda id: False)
+    assert [c["type"] for c in changes] == ["refresh", "update", "refresh"]
+    assert changes[0]["value"] == ""
+    for change in changes:
+        apply_changes(old, [change])
+        assert unique_ids(old)
+    assert tostring(old) == tostring(new)
+
+    # If generated ids collide the root is refreshed
+    old = html.fragment_fromstring('<div id="r"><p id="a"></p><p id="b"></p></div>')
+    new = html.fragment_fromstring('<div id="r"><p id="c"></p><p id="c"></p></div>')
+    changes = diff_trees(deepcopy(old), new, key=lambda id: False)
+    assert [c["type"] for c in changes] == ["refresh"]
+    assert changes[0]["id"] == "r"
+    apply_changes(old, changes)
+    assert tostring(old) == tostring(new)
+
+    # Nodes without ids are refreshed by the parent
+    old = html.fragment_fromstring('<div id="a"><p>Text <b>bold</b></p></div>')
+    new = html.fragment_fromstring('<div id="a"><p>Text <i>it</i></p></div>')
+    changes = diff_trees(deepcopy(old), new)
+    assert [c["type"] for c in changes] == ["refresh"]
+    apply_changes(old, changes)
+    assert tostring(old) == tostring(new)
+    assert diff_trees(new, deepcopy(new)) == []
+
+    with pytest.raises(ValueError):
+        diff_trees(old, html.fragment_fromstring('<p id="a"></p>'))
+
+
+def test_rebuild(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        attr title: str = ""
+        Body:
+            H1:
+                text << view.title
+            Ul:
+                Looper:
+                    # New objects each time so the nodes are created again
+                    iterable << [(row, object()) for row in view.rows]
+                    Li:
+                        id = f"row-{loop_item[0]}"
+                        text = loop_item[0]
+                        Span:
+                            text = "Edit"
+    """
+        ),
+        "Page",
+    )
+    view = Page(rows=["a", "b", "c"])
+    before = html.fromstring(view.render())
+    ul = view.xpath("//ul")[0]
+    h1 = view.xpath("//h1")[0]
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+
+    with ul.rebuild():
+        view.rows = ["c", "b", "a", "d"]
+        view.title = "Changed"
+    assert len(evts) == 1
+    changes = evts[0]["value"]
+    types = [c["type"] for c in changes]
+    assert types.count("added") == 1 and types.count("removed") == 0
+    assert types.count("moved") == 2
+    # The spans were created again so only their generated id changed
+    updates = [c for c in changes if c["type"] == "update" and c["id"] != h1.id]
+    assert updates and all(c["name"] == "id" for c in updates)
+    apply_changes(before, changes)
+    assert tostring(before) == tostring(html.fromstring(view.render()))
+
+    # Outside of a render the changes are made as usual
+    evts.clear()
+    view = Page(rows=["a"])
+    view.prepare()
+    with view.xpath("//ul")[0].rebuild():
+        view.rows = ["b"]
+    assert not evts
+    assert "row-b" in view.render()
+
+
+def test_rebuild_html_markup(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        Body:
+            Div:
+                Looper:
+                    iterable << view.rows
+                    Span:
+                        id = f"row-{loop_item}"
+                    Script:
+                        id = f"script-{loop_item}"
+                        text = "if (a < b) {}"
+    """
+        ),
+        "Page",
+    )
+    view = Page(rows=["a"])
+    before = html.fromstring(view.render())
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    with view.xpath("//div")[0].rebuild():
+        view.rows = ["a", "b"]
+    changes = evts[0]["value"]
+    added = "".join(c["value"] for c in changes if c["type"] == "added")
+    # Empty elements are not self closing and scripts are not escaped
+    assert '<span id="row-b"></span>' in added
+    assert '<script id="script-b">if (a < b) {}</script>' in added
+    apply_changes(before, changes)
+    assert tostring(before) == tostring(html.fromstring(view.render()))
+
+
+def test_rebuild_reused_ids(app, monkeypatch):
+    import web.components.html
+    from web.components.html import Li, Span
+
+    # New nodes often get the generated id of a destroyed one. Choose which.
+    reused = {}
+    gen_id = web.components.html.gen_id
+    monkeypatch.setattr(
+        web.components.html, "gen_id", lambda tag: reused.get(tag) or gen_id(tag)
+    )
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        Body:
+            Ul:
+                pass
+    """
+        ),
+        "Page",
+    )
+
+    def item(text, id=None, span_id=None):
+        li, span = Li(text=text), Span(text=text)
+        if id is not None:
+            reused[li] = id
+        if span_id is not None:
+            reused[span] = span_id
+        span.set_parent(li)
+        return li
+
+    view = Page()
+    view.prepare()
+    ul = view.xpath("//ul")[0]
+    ul.insert_children(None, [item(text) for text in "abc"])
+    client = html.fromstring(view.render())
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+
+    def check():
+        for change in evts[-1]["value"]:
+            apply_changes(client, [change])
+            assert unique_ids(client), change
+        assert tostring(client) == tostring(html.fromstring(view.render()))
+
+    # The items swap ids, a span gets the id of an item that is still there,
+    # and a new item has the id of a span that is kept
+    lis = list(ul.children)
+    spans = [li.children[0] for li in lis]
+    with ul.rebuild():
+        for li in lis:
+            li.destroy()
+        items = [
+            item("a", lis[1].id),
+            item("b", lis[0].id, lis[2].id),
+            item("c"),
+            item("d", spans[0].id),
+        ]
+        ul.insert_children(None, items)
+    types = [c["type"] for c in evts[-1]["value"]]
+    assert types.count("added") == 1 and "refresh" not in types
+    check()
+
+
+def test_modified_policy(app):
+    from web.core.delivery import Debounce, Throttle
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr progress: int = 0
+        attr rows: list = []
+        Body:
+            Span:
+                text << str(view.progress)
+            Ul:
+                Looper:
+                    iterable << view.rows
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page(modified_policy=Throttle(hz=20))
+    view.render()
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+
+    # Without a running loop changes are delivered as usual
+    view.progress = 1
+    assert len(evts) == 1 and evts[0]["type"] == "update"
+
+    async def main():
+        evts.clear()
+        for i in range(100):
+            view.progress = i
+        view.rows = ["a", "b"]
+        assert not evts
+        await asyncio.sleep(0.01)
+        assert len(evts) == 1
+        changes = evts[0]["value"]
+        assert [c["type"] for c in changes] == ["added", "update"]
+        assert changes[-1]["value"] == "99"
+
+        # The next delivery waits for the interval
+        view.progress = 100
+        await asyncio.sleep(0.01)
+        assert len(evts) == 1
+        await asyncio.sleep(0.06)
+        assert len(evts) == 2
+
+        # Unless flushed
+        view.progress = 101
+        view.flush()
+        assert len(evts) == 3 and evts[-1]["value"][0]["value"] == "101"
+        await asyncio.sleep(0.06)
+        assert len(evts) == 3
+
+        # Explicit batches are delivered by the policy
+        with view.batch():
+            view.rows = ["c"]
+        assert len(evts) == 3
+        view.flush()
+        assert len(evts) == 4
+
+        # Debounce waits for the changes to stop
+        view.modified_policy = Debounce(wait=0.02, max_wait=1)
+        for i in range(3):
+            view.progress = i
+            await asyncio.sleep(0.01)
+        assert len(evts) == 4
+        await asyncio.sleep(0.03)
+        assert len(evts) == 5 and evts[-1]["value"][0]["value"] == "2"
+
+        # Pushing the delivery back keeps the scheduled handle
+        view.progress = 10
+        handle = view._flush_handle
+        for i in range(3):
+            view.progress = 11 + i
+            assert view._flush_handle is handle
+        await asyncio.sleep(0.01)
+        assert len(evts) == 5
+        await asyncio.sleep(0.04)
+        assert len(evts) == 6 and evts[-1]["value"][0]["value"] == "13"
+
+    asyncio.run(main())
+
+
+def test_observe_modified(app):
+    from web.components.html import Span
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr left: list = []
+        attr right: list = []
+        attr title: str = ""
+        Body:
+            H1:
+                text << view.title
+            Ul:
+                Looper:
+                    iterable << view.left
+                    Li:
+                        text = loop_item
+            Ul:
+                Looper:
+                    iterable << view.right
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    view.render()
+    body = view.children[0]
+    left, right = body.children[1:3]
+    all_evts, left_evts, right_evts, body_evts = [], [], [], []
+    view.observe("modified", lambda change: all_evts.append(change["value"]))
+    left.observe_modified(left_evts.append)
+    right.observe_modified(right_evts.append)
+    body.observe_modified(body_evts.append, subtree=False)
+
+    view.left = ["a", "b"]
+    assert len(all_evts) == 1
+    assert left_evts == all_evts and not right_evts and not body_evts
+
+    # Changes to children are included
+    li = left.children[1]
+    li.text = "c"
+    assert left_evts[-1] == {
+        "id": li.id,
+        "type": "update",
+        "name": "text",
+        "value": "c",
+        "oldvalue": "b",
+    }
+    assert not right_evts
+    view.title = "Title"
+    assert len(all_evts) == 3 and len(left_evts) == 2
+    assert not right_evts and not body_evts
+
+    # Batches are filtered
+    with view.batch():
+        view.right = ["x"]
+        view.left = ["a"]
+        view.title = "Changed"
+    assert len(all_evts) == 4
+    changes = all_evts[-1]["value"]
+    assert len(changes) == 3
+    assert [c["id"] for c in left_evts[-1]["value"]] == [left.id]
+    assert [c["id"] for c in right_evts[-1]["value"]] == [right.id]
+    assert left_evts[-1]["type"] == right_evts[-1]["type"] == "batch"
+    assert not body_evts
+
+    # Without the subtree only changes to the node itself are sent
+    body.cls = "dark"
+    assert body_evts == [all_evts[-1]]
+
+    right.unobserve_modified(right_evts.append)
+    view.right = ["y"]
+    assert len(right_evts) == 1
+
+    # Destroyed nodes are no longer observed
+    li = left.children[0]
+    li.observe_modified(right_evts.append)
+    view.left = []
+    assert li not in view._subscribers
+    left.unobserve_modified(left_evts.append)
+    body.unobserve_modified(body_evts.append)
+    assert view._subscribers is None
+
+    # Nodes must be within an Html node
+    with pytest.raises(ValueError):
+        Span().observe_modified(all_evts.append)
+
+
+def test_changes_since(app):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr items: list = []
+        history = 3
+        Body:
+            Ul:
+                Looper:
+                    iterable << view.items
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    view.render()
+    client = html.fromstring(view.render())
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    assert view.sequence == 0
+    assert view.changes_since(0) == []
+
+    view.items = ["a"]
+    view.items = ["a", "b"]
+    assert view.sequence == 2
+    assert view.changes_since(2) == []
+    assert view.changes_since(0) == evts
+
+    # A client which reconnects gets the changes it missed
+    missed = view.changes_since(0)
+    apply_changes(client, missed)
+    assert tostring(client) == tostring(html.fromstring(view.render()))
+    assert view.changes_since(1) == evts[1:]
+
+    # Once they are no longer kept the client must refresh
+    with view.batch():
+        view.items = ["c"]
+    with view.batch():
+        view.items = ["d"]
+    assert view.sequence == 4
+    assert view.changes_since(1) == evts[1:]
+    assert view.changes_since(0) is None
+    assert view.changes_since(5) is None
+
+    # Without a history only the sequence is kept
+    view.history = 0
+    view.items = []
+    assert view.sequence == 5
+    assert view.changes_since(4) is None
+
+
+def test_change_queue(app):
+    from web.core.outbox import ChangeQueue
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        attr title: str = ""
+        Body:
+            H1:
+                text << view.title
+            Ul:
+                Looper:
+                    iterable << view.rows
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page(rows=["a", "b", "c"])
+    client = html.fromstring(view.render())
+    queue = ChangeQueue(view=view, max_changes=5)
+    view.observe("modified", lambda change: queue.put(change["value"], view.sequence))
+
+    def send():
+        while (item := queue.pop()) is not None:
+            apply_changes(client, [item[1]])
+        assert tostring(client) == tostring(html.fromstring(view.render()))
+
+    # Changes are sent as is while under the limit
+    view.title = "Title"
+    assert len(queue) == 1
+    send()
+    assert queue.size == 0 and not queue.collapsed
+
+    # Once over the limit they are replaced with a refresh of the list
+    ul = view.xpath("//ul")[0]
+    for li in ul.children[:3]:
+        li.text += "1"
+        li.text += "2"
+    assert queue.collapsed == 1
+    assert len(queue) == 1
+    sequence, change = queue.changes[0]
+    assert sequence == view.sequence
+    assert change["type"] == "refresh" and change["id"] == ul.id
+
+    # Later changes are queued after it
+    view.rows = ["d", "a"]
+    assert len(queue) > 1
+    send()
+
+    # Changes to removed nodes are ignored and changes in different parts
+    # of the page collapse to their common parent
+    view.rows = ["e", "f", "g"]
+    view.title = "Changed"
+    view.rows = ["h"]
+    assert queue.collapsed == 2
+    assert queue.changes[0][1]["id"] == view.children[0].id
+    send()
+
+    # A byte limit can be used instead
+    queue.max_bytes = 100
+    view.rows = ["x" * 50, "y" * 50]
+    assert queue.collapsed == 3
+    send()
+
+    # Triggered JS events are kept in order after the refresh
+    queue.max_changes = 3
+    lis = view.xpath("//li")
+    for node, event in ((lis[1], "focus"), (view, "ready"), (lis[0], "blur")):
+        view.modified(
+            {"id": node.id, "type": "trigger", "name": "event", "value": event}
+        )
+    lis[0].text = "z"
+    assert queue.collapsed == 4
+    changes = [change for sequence, change in queue.changes]
+    assert [c["type"] for c in changes] == ["refresh"] + ["trigger"] * 3
+    assert [c["value"] for c in changes[1:]] == ["focus", "ready", "blur"]
+    assert changes[0]["id"] == ul.id
+
+
+def test_change_queue_html_markup(app):
+    from web.core.outbox import ChangeQueue
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr rows: list = []
+        Body:
+            Div:
+                Looper:
+                    iterable << view.rows
+                    Span:
+                        id = f"row-{loop_item}"
+                    Script:
+                        id = f"script-{loop_item}"
+                        text = "if (a < b) {}"
+    """
+        ),
+        "Page",
+    )
+    view = Page(rows=["a"])
+    client = html.fromstring(view.render())
+    queue = ChangeQueue(view=view, max_changes=1)
+    view.observe("modified", lambda change: queue.put(change["value"], view.sequence))
+
+    # Empty elements and scripts in the refresh must be serialized as html
+    view.rows = ["a", "b"]
+    view.rows = ["a", "b", "c"]
+    assert queue.collapsed
+    changes = [change for sequence, change in queue.changes]
+    refresh = [c for c in changes if c["type"] == "refresh"]
+    assert refresh
+    value = refresh[-1]["value"]
+    assert '<span id="row-b"></span>' in value
+    assert '<script id="script-c">if (a < b) {}</script>' in value
+    assert "/>" not in value
+    while (item := queue.pop()) is not None:
+        apply_changes(client, [item[1]])
+    assert tostring(client) == tostring(html.fromstring(view.render()))
+
+
+def test_broadcast(app):
+    from web.core.broadcast import Broadcast
+    from web.core.encoding import CompactDecoder, CompactEncoder
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr title: str = ""
+        Body:
+            H1:
+                text << view.title
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    view.render()
+    broadcast = Broadcast(view=view, encoder=CompactEncoder(format="json"))
+    first, second = [], []
+    broadcast.subscribe(first.append)
+    view.title = "a"
+    broadcast.subscribe(second.append)
+    view.title = "b"
+    assert broadcast.subscriber_count == 2
+    assert broadcast.messages == 2
+    assert broadcast.encode_time > 0
+    assert broadcast.average_encode_time > 0
+
+    # The same message is sent to each subscriber
+    assert len(first) == 2 and second == first[1:]
+    assert first[1] is second[0]
+
+    # The table is reset when a subscriber joins so both can decode it
+    for messages in (first, second):
+        decoder = CompactDecoder(format="json")
+        changes = [decoder.decode(m) for m in messages]
+        assert changes[-1]["value"] == "b"
+
+    broadcast.unsubscribe(first.append)
+    broadcast.unsubscribe(second.append)
+    assert broadcast.subscriber_count == 0
+    view.title = "c"
+    assert broadcast.messages == 2
+
+
+def test_child_index_cache(app):
+    from web.components.html import Li, Tag
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr items: list = []
+        Body:
+            Ul:
+                Li:
+                    text = "first"
+                Looper:
+                    iterable << view.items
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page(items=["a", "b"])
+    client = html.fromstring(view.render())
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    ul = view.xpath("//ul")[0]
+
+    def check():
+        tags = [c for c in ul.children if isinstance(c, Tag)]
+        for i, c in enumerate(tags):
+            assert ul._child_index(c) == i
+            assert ul._child_before(c) is (tags[i - 1] if i else None)
+        apply_changes(client, evts)
+        evts.clear()
+        assert tostring(client) == tostring(html.fromstring(view.render()))
+
+    check()
+
+    # Appended with set_parent
+    li = Li(text="last")
+    li.set_parent(ul)
+    check()
+
+    # Removed and moved
+    view.items = ["b", "c", "a"]
+    check()
+    li.destroy()
+    check()
+    ul.insert_children(ul.children[0], [ul.children[2]])
+    check()
+    with pytest.raises(KeyError):
+        ul._child_index(Li())
+
+
+def test_children_added(backend):
+    from web.components.html import Li
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr items: list = []
+        Body:
+            Ul:
+                Li:
+                    text = "first"
+                Looper:
+                    iterable << view.items
+                    Li:
+                        text = loop_item
+                Li:
+                    text = "last"
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    client = html.fromstring(view.render())
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    ul = view.xpath("//ul")[0]
+
+    def check(expected):
+        assert [li.text for li in client.xpath("//li")] == expected
+        assert tostring(client) == tostring(html.fromstring(view.render()))
+
+    view.items = ["a", "b", "c"]
+    assert len(evts) == 1
+    apply_changes(client, evts)
+    check(["first", "a", "b", "c", "last"])
+
+    # Inserted at the front
+    evts.clear()
+    ul.insert_children(ul.children[0], [Li(text="x"), Li(text="y")])
+    apply_changes(client, evts)
+    check(["x", "y", "first", "a", "b", "c", "last"])
+
+    # Appended
+    evts.clear()
+    view.items = ["a", "b", "c", "d", "e"]
+    apply_changes(client, evts)
+    check(["x", "y", "first", "a", "b", "c", "d", "e", "last"])
+
+
+def test_destroy_subtree(backend):
+    from web.components.html import Tag
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr items: list = []
+        Body:
+            Ul:
+                Looper:
+                    iterable << view.items
+                    Li:
+                        A:
+                            text = loop_item
+            P:
+                text = "end"
+    """
+        ),
+        "Page",
+    )
+    view = Page(items=["a", "b", "c"])
+    client = html.fromstring(view.render())
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    cache = view.proxy.cache
+
+    # Only the link is removed from a destroyed item
+    li = view.xpath("//li")[1]
+    a = li.children[0]
+    view.items = ["a", "c"]
+    assert li.is_destroyed and a.is_destroyed
+    assert li.id not in cache and a.id not in cache
+    apply_changes(client, evts)
+    assert tostring(client) == tostring(html.fromstring(view.render()))
+
+    # Every node of the subtree is removed from the cache
+    ul = view.xpath("//ul")[0]
+    ids = [d.id for d in ul.traverse() if isinstance(d, Tag)]
+    evts.clear()
+    ul.destroy()
+    assert not any(id in cache for id in ids)
+    assert len(evts) == 1
+    apply_changes(client, evts)
+    assert tostring(client) == tostring(html.fromstring(view.render()))
+    assert "<ul" not in view.render()
+
+    # The whole view
+    view.destroy()
+
+
+def test_reorder_and_remove_children(backend):
+    from web.components.html import Li
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr items: list = []
+        Body:
+            Ul:
+                Li:
+                    text = "first"
+                Looper:
+                    iterable << view.items
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page(items=["c", "a", "d", "b"])
+    client = html.fromstring(view.render())
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    ul = view.xpath("//ul")[0]
+
+    def check(expected):
+        apply_changes(client, evts)
+        evts.clear()
+        assert [li.text for li in client.xpath("//li")] == expected
+        assert tostring(client) == tostring(html.fromstring(view.render()))
+
+    # Sorting the iterable sends one event
+    view.items = ["a", "b", "c", "d"]
+    assert [e["type"] for e in evts] == ["reordered"]
+    check(["first", "a", "b", "c", "d"])
+
+    # By key or permutation. The Looper stays where it is.
+    ul.reorder_children(lambda c: c.text)
+    assert [e["type"] for e in evts] == ["reordered"]
+    check(["a", "b", "c", "d", "first"])
+    ul.reorder_children([4, 0, 1, 2, 3])
+    check(["first", "a", "b", "c", "d"])
+    with pytest.raises(ValueError):
+        ul.reorder_children([0, 0, 1, 2, 3])
+
+    # Few moves are sent as moved events
+    tags = [c for c in ul.children if isinstance(c, Li)]
+    ul.insert_children(tags[0], tags[-1:])
+    assert [e["type"] for e in evts] == ["moved"]
+    check(["d", "first", "a", "b", "c"])
+
+    # Removed at once
+    tags = [c for c in ul.children if isinstance(c, Li)]
+    ul.remove_children(tags[1:3])
+    assert [e["type"] for e in evts] == ["removed_many"]
+    assert tags[1].is_destroyed and tags[2].is_destroyed
+    check(["d", "b", "c"])
+    with pytest.raises(ValueError):
+        ul.remove_children(tags[1:2])
+
+    # Without destroying them
+    ul.remove_children(tags[3:], destroy=False)
+    assert tags[3].parent is None and not tags[3].is_destroyed
+    check(["d"])
+
+    # In a batch
+    with view.batch():
+        extra = [Li(text="z"), Li(text="y"), Li(text="x")]
+        ul.insert_children(None, extra)
+        ul.reorder_children(lambda c: c.text)
+        ul.remove_children([extra[0], tags[0]])
+    changes = evts[0]["value"]
+    assert [c["type"] for c in changes] == ["removed_many", "added", "reordered"]
+    assert changes[0]["value"] == [tags[0].id]
+    evts[:] = changes
+    check(["x", "y"])
+
+
+def test_lookup_and_dispatch(backend):
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr clicks: int = 0
+        Body:
+            Div:
+                id = "left"
+                Button:
+                    id = "button"
+                    clicked :: view.clicks += 1
+            Div:
+                id = "right"
+                Input:
+                    id = "input"
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    view.render()
+    button = view.lookup("button")
+    left, right = view.lookup("left"), view.lookup("right")
+    assert button is view.find_by_id("button") is left.find_by_id("button")
+    assert view.lookup("missing") is None
+
+    # Only nodes within the subtree are found
+    assert right.find_by_id("button") is None
+    assert right.find_by_id("input") is view.lookup("input")
+
+    # Changing the id updates the cache
+    button.id = "renamed"
+    assert view.lookup("button") is None
+    assert view.lookup("renamed") is button
+
+    # Events and updates from a client
+    assert view.dispatch({"id": "renamed", "type": "event", "name": "clicked"})
+    assert view.clicks == 1
+    change = {"id": "input", "type": "update", "name": "value", "value": "x"}
+    assert view.dispatch(change).value == "x"
+    assert view.dispatch({**change, "id": "missing"}) is None
+    for name in ("_children", "proxy", "clicked", "missing"):
+        with pytest.raises(ValueError):
+            view.dispatch({**change, "name": name})
+    with pytest.raises(ValueError):
+        view.dispatch({"id": "input", "type": "event", "name": "value"})
+
+
+def test_insert_added_and_moved(app):
+    from web.components.html import Li
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        Body:
+            Ul:
+                Li:
+                    text = "a"
+                Li:
+                    text = "b"
+    """
+        ),
+        "Page",
+    )
+    view = Page()
+    client = html.fromstring(view.render())
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    ul = view.xpath("//ul")[0]
+
+    def check(expected):
+        apply_changes(client, evts)
+        evts.clear()
+        assert [li.text for li in client.xpath("//li")] == expected
+        assert tostring(client) == tostring(html.fromstring(view.render()))
+
+    # A new child and an existing one
+    a, b = ul.children
+    ul.insert_children(a, [Li(text="c"), b])
+    check(["c", "b", "a"])
+
+    # Several existing children among many
+    ul.insert_children(None, [Li(text=str(i)) for i in range(10)])
+    tags = list(ul.children)
+    ul.insert_children(tags[5], [tags[1], Li(text="d"), tags[0]])
+    check(["a", "0", "1", "b", "d", "c", "2", "3", "4", "5", "6", "7", "8", "9"])
+    tags = list(ul.children)
+    ul.insert_children(None, [tags[2], tags[0]])
+    check(["0", "b", "d", "c", "2", "3", "4", "5", "6", "7", "8", "9", "1", "a"])
+
+
+def test_reorder_before_render(backend):
+    from web.components.html import Li
+
+    Page = compile_source(
+        dedent(
+            """
+    from web.components.api import *
+    from web.core.api import *
+
+    enamldef Page(Html): view:
+        attr items: list = []
+        Body:
+            Ul:
+                Looper:
+                    iterable << view.items
+                    Li:
+                        text = loop_item
+    """
+        ),
+        "Page",
+    )
+    view = Page(items=["c", "a", "b"])
+    view.prepare()
+    evts = []
+    view.observe("modified", lambda change: evts.append(change["value"]))
+    ul = view.xpath("//ul")[0]
+
+    # The nodes are moved without sending an event
+    ul.reorder_children(lambda c: c.text)
+    tags = [c for c in ul.children if isinstance(c, Li)]
+    assert [c.text for c in tags] == ["a", "b", "c"]
+    ul.insert_children(tags[0], tags[1:2])
+    assert not evts
+    client = html.fromstring(view.render())
+    assert [li.text for li in client.xpath("//li")] == ["b", "a", "c"]
+
+    # And sent once rendered
+    ul.reorder_children(lambda c: c.text)
+    assert evts
+    apply_changes(client, evts)
+    assert [li.text for li in client.xpath("//li")] == ["a", "b", "c"]
+    assert tostring(client) == tostring(html.fromstring(view.render()))
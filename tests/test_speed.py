@@ -1,12 +1,25 @@
 import os
+import gzip
+import json
+import asyncio
+import tracemalloc
 import pytest
 import enaml
 from jinja2 import Template
+from web.core.api import compile_view, hoist_static
+from web.core.broadcast import Broadcast
+from web.core.diff import diff_trees, inner_html
+from web.core.encoding import CompactEncoder, JsonEncoder
 
 TEMPLATE_DIR = os.path.dirname(__file__)
 
 with enaml.imports():
-    from pages import HelloWorld, Simple, ListView
+    from pages import HelloWorld, HelloWorldHoisted, Simple, ListView
+
+hoist_static(HelloWorldHoisted)
+HelloWorldCompiled = compile_view(HelloWorld)
+SimpleCompiled = compile_view(Simple)
+ListViewCompiled = compile_view(ListView)
 
 
 @pytest.mark.benchmark(group="hello")
@@ -37,6 +50,20 @@ def test_hello_world(app, benchmark):
         HelloWorld().render()
 
 
+@pytest.mark.benchmark(group="hello")
+def test_hello_world_hoisted(app, benchmark):
+    @benchmark
+    def render():
+        HelloWorldHoisted().render()
+
+
+@pytest.mark.benchmark(group="hello")
+def test_hello_world_compiled(app, benchmark):
+    @benchmark
+    def render():
+        HelloWorldCompiled()
+
+
 @pytest.mark.benchmark(group="hello")
 def test_hello_world_prebuilt(app, benchmark):
     view = HelloWorld()
@@ -83,6 +110,13 @@ def test_simple(app, benchmark):
         Simple().render(navigation=NAVIGATION, content="This is the content")
 
 
+@pytest.mark.benchmark(group="simple")
+def test_simple_compiled(app, benchmark):
+    @benchmark
+    def render():
+        SimpleCompiled(navigation=NAVIGATION, content="This is the content")
+
+
 @pytest.mark.benchmark(group="simple")
 def test_simple_prebuilt(app, benchmark):
     view = Simple()
@@ -100,6 +134,13 @@ def test_list_init(app, benchmark):
         view.render()
 
 
+@pytest.mark.benchmark(group="list-add")
+def test_list_init_compiled(app, benchmark):
+    @benchmark
+    def render():
+        ListViewCompiled(iterable=range(1000))
+
+
 @pytest.mark.benchmark(group="list-add")
 def test_list_update(app, benchmark):
     @benchmark
@@ -107,3 +148,513 @@ def test_list_update(app, benchmark):
         view = ListView(iterable=[])
         view.render()
         view.render(iterable=range(1000))
+
+
+@pytest.mark.benchmark(group="list-change")
+def test_list_change_one(app, benchmark):
+    view = ListView(iterable=range(1000))
+    view.render()
+    items = view.xpath("//li")
+    item = items[500]
+
+    @benchmark
+    def render():
+        item.text = "a" if item.text == "b" else "b"
+        view.render()
+
+
+@pytest.mark.benchmark(group="list-change")
+def test_list_change_one_full(app, benchmark):
+    view = ListView(iterable=range(1000))
+    view.render()
+    items = view.xpath("//li")
+    item = items[500]
+
+    @benchmark
+    def render():
+        item.text = "a" if item.text == "b" else "b"
+        view.render(render_options={"method": "html", "with_tail": True})
+
+
+def measure_loop_stall(benchmark, render):
+    """Benchmark rendering a large list from a coroutine while another
+    coroutine ticks and record the longest time the event loop was blocked.
+
+    """
+    stalls = []
+
+    def setup():
+        view = ListView(iterable=range(20000))
+        view.prepare()
+        return (view,), {}
+
+    async def run(view):
+        stall = 0
+        done = False
+
+        async def ticker():
+            nonlocal stall
+            loop = asyncio.get_running_loop()
+            last = loop.time()
+            while not done:
+                await asyncio.sleep(0.001)
+                now = loop.time()
+                stall = max(stall, now - last)
+                last = now
+
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        await render(view)
+        done = True
+        await task
+        stalls.append(stall)
+
+    benchmark.pedantic(lambda view: asyncio.run(run(view)), setup=setup, rounds=3)
+    benchmark.extra_info["max_loop_stall"] = max(stalls)
+    return max(stalls)
+
+
+@pytest.mark.benchmark(group="loop-stall")
+def test_loop_stall_render(app, benchmark):
+    async def render(view):
+        view.render()
+
+    measure_loop_stall(benchmark, render)
+
+
+@pytest.mark.benchmark(group="loop-stall")
+def test_loop_stall_render_async(app, benchmark):
+    async def render(view):
+        await view.render_async()
+
+    measure_loop_stall(benchmark, render)
+
+
+def record_allocations(benchmark, render):
+    """Record the peak memory allocated during a single render"""
+    render()
+    tracemalloc.start()
+    try:
+        render()
+        benchmark.extra_info["peak_allocated"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def change_one_item():
+    view = ListView(iterable=range(1000))
+    view.render()
+    item = view.xpath("//li")[500]
+
+    def change():
+        item.text = "a" if item.text == "b" else "b"
+
+    return view, change
+
+
+@pytest.mark.benchmark(group="render-bytes")
+def test_render_str_encode(app, benchmark):
+    view, change = change_one_item()
+
+    def render():
+        change()
+        return view.render().encode()
+
+    record_allocations(benchmark, render)
+    benchmark(render)
+
+
+@pytest.mark.benchmark(group="render-bytes")
+def test_render_bytes(app, benchmark):
+    view, change = change_one_item()
+
+    def render():
+        change()
+        return view.render_bytes()
+
+    record_allocations(benchmark, render)
+    benchmark(render)
+
+
+@pytest.mark.benchmark(group="render-bytes")
+def test_render_into(app, benchmark):
+    view, change = change_one_item()
+
+    with open(os.devnull, "wb") as f:
+
+        def render():
+            change()
+            return view.render_into(f)
+
+        record_allocations(benchmark, render)
+        benchmark(render)
+
+
+@pytest.mark.benchmark(group="compress")
+def test_render_gzip_each_time(app, benchmark):
+    view = ListView(iterable=range(1000))
+    view.render()
+
+    @benchmark
+    def render():
+        gzip.compress(view.render_bytes())
+
+
+@pytest.mark.benchmark(group="compress")
+def test_render_gzip_cached(app, benchmark):
+    view = ListView(iterable=range(1000))
+    view.render()
+
+    @benchmark
+    def render():
+        view.render(render_options={"compress": "gzip"})
+
+
+@pytest.mark.benchmark(group="etag")
+def test_etag_change_one(app, benchmark):
+    view, change = change_one_item()
+    view.etag()
+
+    @benchmark
+    def etag():
+        change()
+        view.etag()
+
+
+@pytest.mark.benchmark(group="etag")
+def test_etag_unchanged(app, benchmark):
+    view, change = change_one_item()
+    view.etag()
+
+    @benchmark
+    def etag():
+        view.etag()
+
+
+@pytest.mark.benchmark(group="fragment")
+def test_fragment_full_page(app, benchmark):
+    view, change = change_one_item()
+    item = view.xpath("//li")[500]
+
+    @benchmark
+    def render():
+        change()
+        view.render()
+
+    assert item.render() in view.render()
+
+
+@pytest.mark.benchmark(group="fragment")
+def test_fragment_by_id(app, benchmark):
+    view, change = change_one_item()
+    item = view.xpath("//li")[500]
+
+    @benchmark
+    def render():
+        change()
+        view.render_fragment(item.id)
+
+    assert view.render_fragment(item.id) == item.render()
+
+
+def send_modified(view):
+    """Serialize each modified event as a websocket handler would"""
+    messages = []
+    view.observe(
+        "modified", lambda change: messages.append(json.dumps(change["value"]))
+    )
+    return messages
+
+
+@pytest.mark.benchmark(group="modified")
+def test_modified_each(app, benchmark):
+    view = ListView(iterable=range(1000))
+    view.render()
+    messages = send_modified(view)
+    items = view.xpath("//li")
+
+    @benchmark
+    def update():
+        for item in items:
+            item.text = "a" if item.text == "b" else "b"
+
+    assert len(messages) >= 1000
+
+
+@pytest.mark.benchmark(group="modified")
+def test_modified_batch(app, benchmark):
+    view = ListView(iterable=range(1000))
+    view.render()
+    messages = send_modified(view)
+    items = view.xpath("//li")
+
+    @benchmark
+    def update():
+        with view.batch():
+            for item in items:
+                item.text = "a" if item.text == "b" else "b"
+
+    assert len(messages) >= 1
+
+
+@pytest.mark.benchmark(group="modified")
+def test_modified_batch_repeated(app, benchmark):
+    view = ListView(iterable=range(1000))
+    view.render()
+    messages = send_modified(view)
+    items = view.xpath("//li")
+
+    @benchmark
+    def update():
+        with view.batch():
+            for i in range(3):
+                for item in items:
+                    item.text = f"{i}"
+
+    assert len(messages) >= 1
+    assert view.batch_stats.merged >= 2000
+
+
+@pytest.mark.benchmark(group="subscribe")
+def test_observe_modified_each_item(app, benchmark):
+    view = ListView(iterable=range(1000))
+    view.render()
+    items = view.xpath("//li")
+    received = [0]
+
+    def on_modified(change):
+        received[0] += len(change["value"])
+
+    for item in items:
+        item.observe_modified(on_modified)
+
+    @benchmark
+    def update():
+        with view.batch():
+            for item in items:
+                item.text = "a" if item.text == "b" else "b"
+
+    # Each subscriber only gets the change to its own item
+    assert received[0] % 1000 == 0
+
+
+def batch_of_updates():
+    view = ListView(iterable=range(1000))
+    view.render()
+    changes = []
+    view.observe("modified", lambda change: changes.append(change["value"]))
+    with view.batch():
+        for item in view.xpath("//li"):
+            item.text = "changed"
+    return changes[0]
+
+
+@pytest.mark.benchmark(group="encode")
+def test_encode_json(app, benchmark):
+    encoder = JsonEncoder()
+    change = batch_of_updates()
+    data = benchmark(encoder.encode, change)
+    assert json.loads(data) == change
+
+
+@pytest.mark.benchmark(group="encode")
+def test_encode_compact(app, benchmark):
+    encoder = CompactEncoder()
+    change = batch_of_updates()
+    data = benchmark(encoder.encode, change)
+    assert len(data) < len(JsonEncoder().encode(change)) / 2
+
+
+@pytest.mark.benchmark(group="child-index")
+@pytest.mark.parametrize("n", [1000, 10000, 100000])
+def test_insert_children(app, benchmark, n):
+    from web.components.html import Li
+
+    def setup():
+        view = ListView(iterable=[])
+        view.render()
+        ul = view.xpath("//ul")[0]
+        return (ul, [Li(text=str(i)) for i in range(n)]), {}
+
+    def insert(ul, items):
+        ul.insert_children(None, items)
+        # Move the last to the front
+        ul.insert_children(items[0], items[-1:])
+
+    benchmark.pedantic(insert, setup=setup, rounds=3)
+
+
+@pytest.mark.benchmark(group="reorder")
+def test_reorder_rows(app, benchmark):
+    view = ListView(iterable=range(5000))
+    view.render()
+    ul = view.xpath("//ul")[0]
+    evts = []
+    view.observe("modified", evts.append)
+    benchmark(ul.reorder_children, range(4999, -1, -1))
+    assert all(e["value"]["type"] == "reordered" for e in evts)
+
+
+def lookup_view():
+    view = ListView(iterable=range(10000))
+    view.render()
+    li = view.xpath("//li")[-1]
+    return view, {"id": li.id, "type": "update", "name": "text", "value": "x"}
+
+
+@pytest.mark.benchmark(group="lookup")
+def test_lookup_xpath(app, benchmark):
+    view, change = lookup_view()
+
+    def dispatch():
+        node = view.xpath("//*[@id=$ref]", ref=change["id"])[0]
+        setattr(node, change["name"], change["value"])
+
+    benchmark(dispatch)
+
+
+@pytest.mark.benchmark(group="lookup")
+def test_lookup_dispatch(app, benchmark):
+    view, change = lookup_view()
+    benchmark(view.dispatch, change)
+
+
+def shared_view(n):
+    """A view with n clients and a function that changes 100 items"""
+    view = ListView(iterable=range(1000))
+    view.render()
+    items = view.xpath("//li")[:100]
+    sockets = [[] for i in range(n)]
+
+    def update():
+        with view.batch():
+            for item in items:
+                item.text = "a" if item.text == "b" else "b"
+
+    return view, sockets, update
+
+
+@pytest.mark.benchmark(group="broadcast")
+def test_broadcast_each_observer(app, benchmark):
+    view, sockets, update = shared_view(200)
+    for socket in sockets:
+        view.observe(
+            "modified",
+            lambda change, socket=socket: socket.append(json.dumps(change["value"])),
+        )
+    benchmark(update)
+    assert sockets[0] and sockets[0] == sockets[-1]
+
+
+@pytest.mark.benchmark(group="broadcast")
+def test_broadcast_encode_once(app, benchmark):
+    view, sockets, update = shared_view(200)
+    broadcast = Broadcast(view=view)
+    for socket in sockets:
+        broadcast.subscribe(socket.append)
+    benchmark(update)
+    assert sockets[0] and sockets[0] == sockets[-1]
+    assert broadcast.messages == len(sockets[0])
+
+
+def diff_trees_10k():
+    """Two versions of a tree with 10k nodes with a few items changed"""
+    from lxml.etree import fromstring
+
+    def tree(items):
+        ul = fromstring('<ul id="list"></ul>')
+        for i in items:
+            ul.append(fromstring(f'<li id="item-{i}">{i}<b>{i}</b></li>'))
+        return ul
+
+    items = list(range(5000))
+    old = tree(items)
+    items.insert(10, items.pop(4000))
+    del items[100:105]
+    items[2000:2000] = range(5000, 5005)
+    new = tree(items)
+    for li in new[::500]:
+        li.text = "changed"
+    return old, new
+
+
+@pytest.mark.benchmark(group="diff")
+def test_diff_10k(app, benchmark):
+    old, new = diff_trees_10k()
+    changes = benchmark(diff_trees, old, new)
+    types = [c["type"] for c in changes]
+    assert types.count("moved") == 1 and types.count("added") == 5
+    assert len(changes) < 30
+
+
+@pytest.mark.benchmark(group="diff")
+def test_diff_10k_refresh(app, benchmark):
+    old, new = diff_trees_10k()
+    benchmark(inner_html, new)
+
+
+@pytest.mark.benchmark(group="backend-hello")
+def test_backend_hello_world(backend, benchmark):
+    def render():
+        return HelloWorld().render()
+
+    record_allocations(benchmark, render)
+    benchmark(render)
+
+
+@pytest.mark.benchmark(group="backend-simple")
+def test_backend_simple(backend, benchmark):
+    def render():
+        return Simple().render(navigation=NAVIGATION, content="This is the content")
+
+    record_allocations(benchmark, render)
+    benchmark(render)
+
+
+@pytest.mark.benchmark(group="backend-list-add")
+def test_backend_list_init(backend, benchmark):
+    def render():
+        return ListView(iterable=range(1000)).render()
+
+    record_allocations(benchmark, render)
+    benchmark(render)
+
+
+@pytest.mark.benchmark(group="backend-list-change")
+def test_backend_list_change_one(backend, benchmark):
+    view, change = change_one_item()
+
+    def render():
+        change()
+        return view.render()
+
+    record_allocations(benchmark, render)
+    benchmark(render)
+
+
+@pytest.mark.benchmark(group="backend-destroy-wide")
+def test_backend_destroy_wide(backend, benchmark):
+    def setup():
+        view = ListView(iterable=range(10000))
+        view.render()
+        return (view.xpath("//ul")[0],), {}
+
+    benchmark.pedantic(lambda ul: ul.destroy(), setup=setup, rounds=3)
+
+
+@pytest.mark.benchmark(group="backend-destroy-deep")
+def test_backend_destroy_deep(backend, benchmark):
+    from web.components.html import Div
+
+    def setup():
+        view = ListView(iterable=[])
+        view.render()
+        top = parent = Div()
+        for i in range(100):
+            child = Div(text=str(i))
+            child.set_parent(parent)
+            parent = child
+        top.set_parent(view.xpath("//body")[0])
+        return (top,), {}
+
+    benchmark.pedantic(lambda top: top.destroy(), setup=setup, rounds=3)
@@ -1,37 +1,140 @@
 import pytest
-from web.core.speedups import gen_id, lookup_child_index
+from web.core.speedups import gen_id
 from web.components.html import Tag
 
 
-def test_child_index():
-    with pytest.raises(ValueError):
-        lookup_child_index(None)
-    with pytest.raises(TypeError):
-        lookup_child_index("a", None)
+def test_gen_id():
+    c = Tag()
+    assert isinstance(gen_id(c), str)
+    assert len(gen_id(c)) == 8
+    assert gen_id(c) == gen_id(c) != gen_id(Tag())
 
-    class Foo:
-        _children = True
 
-    with pytest.raises(TypeError):
-        lookup_child_index(Foo(), None)
-    with pytest.raises(TypeError):
-        lookup_child_index(Foo(), Foo())
+def test_child_digests():
+    from web.core.digest import ChildDigests, hash_digest
 
-    class Bar:
-        def __init__(self, children=None):
-            self._children = children or []
+    class Node:
+        def __init__(self, value):
+            self.value = value
 
-    with pytest.raises(TypeError):
-        lookup_child_index(Bar(), Bar())
+        def get_digest(self):
+            return hash_digest(self.value)
 
-    c = Tag()
-    p = Tag()
-    assert isinstance(gen_id(c), str)
+    a, b, c = Node(b"a"), Node(b"b"), Node(b"c")
+    digests = ChildDigests([a, b, c])
+    digest = digests.digest()
+    assert len(digest) == 16
+    assert ChildDigests([b, a, c]).digest() != digest
+
+    # Updating one child matches computing it again
+    b.value = b"d"
+    digests.changed.add(b)
+    assert digests.digest() == ChildDigests([a, b, c]).digest() != digest
+    b.value = b"b"
+    digests.changed.add(b)
+    assert digests.digest() == digest
+
+
+def test_compact_encoding():
+    from web.core.encoding import (
+        CompactDecoder,
+        CompactEncoder,
+        JsonEncoder,
+        get_serializer,
+    )
+
+    encoder = CompactEncoder(format="json", oldvalue=True)
+    decoder = CompactDecoder(format="json")
+    changes = [
+        {"id": "a", "type": "update", "name": "text", "value": "x", "oldvalue": ""},
+        {"id": "a", "type": "update", "name": "text", "value": "y", "oldvalue": "x"},
+        {
+            "id": "a",
+            "type": "added",
+            "name": "children",
+            "value": "<b></b>",
+            "index": 0,
+        },
+        {"id": "a", "type": "moved", "name": "children", "value": "b", "index": 1},
+        {"id": "a", "type": "removed", "name": "children", "value": "b"},
+        {"id": "a", "type": "removed_many", "name": "children", "value": ["b", "c"]},
+        {"id": "a", "type": "reordered", "name": "children", "value": ["c", "b"]},
+        {"id": "a", "type": "trigger", "name": "event", "value": "click"},
+        {"id": "a", "type": "custom", "name": "text", "value": [1, 2]},
+        {
+            "id": "root",
+            "type": "batch",
+            "name": "changes",
+            "value": [
+                {
+                    "id": "c",
+                    "type": "update",
+                    "name": "cls",
+                    "value": ["x"],
+                    "oldvalue": None,
+                },
+                {
+                    "id": "a",
+                    "type": "update",
+                    "name": "cls",
+                    "value": ["y"],
+                    "oldvalue": None,
+                },
+            ],
+        },
+    ]
+    for change in changes:
+        data = encoder.encode(change)
+        assert decoder.decode(data) == change
 
-    p._children = [Tag(), c]
-    assert lookup_child_index(p, c) == 1
-    p._children = [c, Tag()]
-    assert lookup_child_index(p, c) == 0
+    # Ids and names are only sent once
+    data = encoder.encode(changes[0])
+    assert data == '[0,0,1,"x",""]'
+    assert len(data) < len(JsonEncoder().encode(changes[0])) / 2
 
-    with pytest.raises(KeyError):
-        assert lookup_child_index(p, Tag())
+    # The oldvalue is omitted by default
+    encoder = CompactEncoder(format="json")
+    decoder = CompactDecoder(format="json")
+    assert "oldvalue" not in decoder.decode(encoder.encode(changes[0]))
+
+    # The table starts over when full
+    encoder.max_strings = 2
+    for change in changes:
+        assert decoder.decode(encoder.encode(change))["id"] == change["id"]
+        assert len(encoder.strings) == len(decoder.strings) <= 4
+
+    # The sequence number is sent with the change
+    data = encoder.encode(changes[2], sequence=5)
+    assert decoder.decode(data) == changes[2]
+    assert decoder.sequence == 5
+    assert JsonEncoder().encode(changes[2], sequence=5).endswith('"sequence": 5}')
+
+    with pytest.raises(ValueError):
+        get_serializer("xml")
+    with pytest.raises(ValueError):
+        CompactEncoder(format="xml")
+
+
+def test_compact_encoding_error():
+    from web.core.encoding import CompactDecoder, CompactEncoder
+
+    encoder = CompactEncoder(format="json")
+    decoder = CompactDecoder(format="json")
+    change = {"id": "a", "type": "update", "name": "text", "value": "x"}
+    decoder.decode(encoder.encode(change))
+
+    # Strings interned by a change that cannot be serialized are discarded
+    bad = {"id": "b", "type": "update", "name": "data", "value": object()}
+    with pytest.raises(TypeError):
+        encoder.encode(bad)
+    assert list(encoder.strings) == ["a", "text"]
+    ok = {**bad, "value": "y"}
+    assert decoder.decode(encoder.encode(ok)) == ok
+
+    # Including a reset
+    encoder.reset()
+    with pytest.raises(TypeError):
+        encoder.encode(bad)
+    assert list(encoder.strings) == ["a", "text", "b", "data"]
+    assert decoder.decode(encoder.encode(change)) == change
+    assert list(encoder.strings) == decoder.strings == ["a", "text"]
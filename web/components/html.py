@@ -12,10 +12,27 @@ Created on Apr 2, 2017
 
 from __future__ import annotations
 
-from typing import Any, Generator, Optional, Union
+import asyncio
+from collections import deque
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from itertools import islice
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Generator,
+    Iterable,
+    Optional,
+    Sequence,
+    Union,
+)
 from atom.api import (
+    Bool,
     Event,
     Enum,
+    Float,
+    Int,
     Value,
     Str,
     Instance,
@@ -27,21 +44,15 @@ from atom.api import (
 )
 from enaml.core.declarative import d_, Declarative, observe
 from enaml.widgets.toolkit_object import ToolkitObject, ProxyToolkitObject
+from lxml.etree import _Element
+from web.core.coalesce import CoalesceStats, coalesce
+from web.core.delivery import DeliveryPolicy
+from web.core.diff import diff_trees
 
 try:
-    from web.core.speedups import gen_id, lookup_child_index
+    from web.core.speedups import gen_id
 except ImportError:
 
-    def lookup_child_index(parent: "Tag", child: "Tag") -> int:
-        """Find the index of the child ignoring any pattern nodes"""
-        i = 0
-        for c in parent.children:
-            if c is child:
-                return i
-            elif isinstance(c, Tag):
-                i += 1
-        raise KeyError("Child not found")
-
     def gen_id(tag, id=id, mod=divmod):
         """Generate a short id for the tag"""
         number = id(tag)
@@ -61,19 +72,95 @@ class ProxyTag(ProxyToolkitObject):
     #: WARNING: If the root is changed this becomes invalid
     root = ForwardTyped(lambda: ProxyTag)
 
+    #: Children added while children are inserted. They are placed together
+    #: by children_added once all are inserted.
+    pending_children = Typed(list)
+
+    #: Children removed while children are removed at once. They are taken
+    #: out together by children_removed once all are removed.
+    pending_removed = Typed(list)
+
+    #: Set when the node is destroyed along with its parent. Only the top
+    #: node of a destroyed subtree needs to be unlinked from the tree.
+    detached = Bool()
+
+    def children_added(self, children: list[ProxyTag]):
+        """Place children added by an insert at once. The children are in
+        order of the insert and are not moved otherwise.
+
+        """
+        raise NotImplementedError
+
+    def children_removed(self, children: list[ProxyTag]):
+        """Take out children removed at once. The children may have been
+        destroyed already.
+
+        """
+        raise NotImplementedError
+
     def xpath(self, query: str, **kwargs) -> Generator[ProxyToolkitObject, None, None]:
         """Perform an xpath lookup on the node"""
         raise NotImplementedError
 
+    def find_by_id(self, id: str) -> Optional[ProxyTag]:
+        """Find the node in the tree with the given id"""
+        raise NotImplementedError
+
     def render(
         self, method: str = "html", encoding: str = "unicode", **kwargs
     ) -> Union[str, bytes]:
         """Render the node and all children"""
         raise NotImplementedError
 
+    def render_iter(self, chunk_size: int = 65536) -> Generator[bytes, None, None]:
+        """Render the node and all children in chunks"""
+        raise NotImplementedError
+
+    def render_bytes(self) -> bytes:
+        """Render the node and all children to utf-8 encoded html"""
+        raise NotImplementedError
+
+    def render_into(self, writable: Union[bytearray, BinaryIO]) -> int:
+        """Write the node and all children into a buffer or file"""
+        raise NotImplementedError
+
+    def render_compressed(
+        self, compress: str, method: str = "html", encoding: str = "utf-8", **kwargs
+    ) -> bytes:
+        """Render the node and all children and compress the output"""
+        raise NotImplementedError
+
+    async def render_async(
+        self,
+        method: str = "html",
+        encoding: str = "unicode",
+        executor: Optional[Executor] = None,
+        **kwargs,
+    ) -> Union[str, bytes]:
+        """Render the node and all children without blocking the event loop"""
+        raise NotImplementedError
+
+    def etag(self) -> str:
+        """Get an entity tag for the content of the node and all children"""
+        raise NotImplementedError
+
+    def snapshot(self) -> _Element:
+        """Get a copy of the node and all children as an lxml element"""
+        raise NotImplementedError
+
+    def set_id(self, id: str, oldid: str):
+        """Set the id of the node and update the lookup by id"""
+        raise NotImplementedError
+
     def set_attribute(self, name: str, value: Any):
         raise NotImplementedError
 
+    def invalidate(self):
+        """Notify the proxy that the node is about to change. Proxies which
+        cache rendered output should reimplement this. The default is a no-op.
+        """
+        pass
+
 
 class Tag(ToolkitObject):
     #: Reference to the proxy object
@@ -149,6 +236,12 @@ class Tag(ToolkitObject):
     #: Event triggered when a drop occurs
     dropped = d_(Event(ToolkitObject))
 
+    #: The children list, its length, the index of each Tag in it, and the
+    #: Tags in order. This is rebuilt when the children are replaced and
+    #: updated as they are appended so the index of a child can be found
+    #: without a scan.
+    _child_indexes = Value()
+
     def _default_id(self):
         return gen_id(self)
 
@@ -182,8 +275,11 @@ class Tag(ToolkitObject):
             value = change["value"]
             proxy = self.proxy
             assert proxy is not None
+            proxy.invalidate()
             if name == "attrs":
                 proxy.set_attrs(value, change["oldvalue"])
+            elif name == "id":
+                proxy.set_id(value, change["oldvalue"])
             elif handler := getattr(proxy, f"set_{name}", None):
                 handler(value)
             else:
@@ -213,13 +309,28 @@ class Tag(ToolkitObject):
             root = proxy.root
             assert root is not None
             if root.rendered:
+                declaration = root.declaration
+                if isinstance(declaration, Html):
+                    # Children inserted together are rendered as a group
+                    inserting = declaration._inserting
+                    pending = declaration._pending() is not None
+                    if inserting is not None and inserting[0] is self and not pending:
+                        inserting[1].append((True, child))
+                        return
+                    # In a batch the child is rendered when the batch exits
+                    if pending:
+                        value: Any = child
+                    else:
+                        value = child.render()
+                else:
+                    value = child.render()
                 self._notify_modified(
-                    root.declaration,
+                    declaration,
                     {
                         "id": self.id,
                         "type": "added",
                         "name": "children",
-                        "value": child.render(),
+                        "value": value,
                         "index": self._child_index(child),
                     },
                 )
@@ -231,9 +342,18 @@ class Tag(ToolkitObject):
             assert proxy is not None
             root = proxy.root
             assert root is not None
-            if root.rendered and proxy.child_moved(child.proxy):
+            # The proxy is always moved but the event is only sent once the
+            # root has been rendered
+            if proxy.child_moved(child.proxy) and root.rendered:
+                declaration = root.declaration
+                # Children moved by an insert are sent when it is done
+                if isinstance(declaration, Html):
+                    inserting = declaration._inserting
+                    if inserting is not None and inserting[0] is self:
+                        inserting[1].append((False, child))
+                        return
                 self._notify_modified(
-                    root.declaration,
+                    declaration,
                     {
                         "id": self.id,
                         "type": "moved",
@@ -243,6 +363,25 @@ class Tag(ToolkitObject):
                     },
                 )
 
+    def destroy(self):
+        """Remove any callbacks observing the modified events of this node
+        before it is destroyed. When a subtree is destroyed only the top node
+        is unlinked from the tree.
+
+        """
+        if self.proxy_is_active:
+            proxy = self.proxy
+            assert proxy is not None
+            root = proxy.root
+            html = root.declaration if root is not None else None
+            if isinstance(html, Html) and self in (html._subscribers or ()):
+                for callback, subtree in html._subscribers[self]:
+                    self.unobserve_modified(callback)
+            # The element of the parent is dropped with everything in it
+            parent = self.parent
+            proxy.detached = isinstance(parent, Tag) and parent.is_destroyed
+        super().destroy()
+
     def child_removed(self, child: Declarative):
         """Handles the child removed event.
 
@@ -250,12 +389,15 @@ class Tag(ToolkitObject):
 
         """
         super().child_removed(child)
+        if isinstance(child, Tag):
+            del self._child_indexes
         if self.proxy_is_active and isinstance(child, Tag):
             proxy = self.proxy
             assert proxy is not None
             root = proxy.root
             assert root is not None
-            if root.rendered:
+            # Children removed at once are sent by remove_children
+            if root.rendered and proxy.pending_removed is None:
                 self._notify_modified(
                     root.declaration,
                     {
@@ -266,17 +408,402 @@ class Tag(ToolkitObject):
                     },
                 )
 
+    def insert_children(self, before: Any, insert: Iterable[Declarative]):
+        """Insert children into this node. If the view was rendered each run
+        of children which end up next to each other is rendered together and
+        sent as a single added event with the index of the first child.
+
+        A single child that is moved is sent as a "moved" event. If more than
+        one child and at least a quarter of the children were moved (eg when
+        a Looper is sorted) a single "reordered" event with the ids of all the
+        children in order is sent. Otherwise the moved children are removed
+        and added again with any new children.
+
+        """
+        proxy = self.proxy if self.proxy_is_active else None
+        if proxy is None or proxy.pending_children is not None:
+            return super().insert_children(before, insert)
+        insert = list(insert)
+
+        # If none are moved the proxy places all the new children at once
+        pending = None
+        if len(insert) > 1 and not any(c.parent is self for c in insert):
+            pending = proxy.pending_children = []
+
+        # Changes are only collected by the outermost insert of a rendered
+        # root
+        root = proxy.root
+        html = root.declaration if root is not None and root.rendered else None
+        declaration: Optional[Html] = None
+        if isinstance(html, Html) and html._inserting is None:
+            declaration = html
+        # Whether each child was added or moved
+        inserted: list[tuple[bool, Tag]] = []
+        if declaration is not None:
+            declaration._inserting = (self, inserted)
+        try:
+            super().insert_children(before, insert)
+        finally:
+            if declaration is not None:
+                del declaration._inserting
+            if pending is not None:
+                del proxy.pending_children
+                if pending:
+                    proxy.children_added(pending)
+        if declaration is None or not inserted:
+            return
+
+        added = [c for a, c in inserted if a]
+        moved = [c for a, c in inserted if not a]
+        tags = self._child_positions(inserted[0][1])[1]
+        reordered = len(moved) > 1 and len(moved) * 4 >= len(tags)
+        if moved and not reordered and (added or len(moved) > 1):
+            # The final index of a moved child is only valid once every other
+            # moved child left its old place so they are removed and added
+            # again like when coalescing
+            for child in moved:
+                self._notify_modified(
+                    declaration,
+                    {
+                        "id": self.id,
+                        "type": "removed",
+                        "name": "children",
+                        "value": child.id,
+                    },
+                )
+            added.extend(moved)
+        elif moved and not reordered:
+            child = moved[0]
+            self._notify_modified(
+                declaration,
+                {
+                    "id": self.id,
+                    "type": "moved",
+                    "name": "children",
+                    "value": child.id,
+                    "index": self._child_index(child),
+                },
+            )
+
+        if declaration._pending() is not None:
+            # In a batch the children are rendered when the batch exits
+            for child in added:
+                self._notify_modified(
+                    declaration,
+                    {
+                        "id": self.id,
+                        "type": "added",
+                        "name": "children",
+                        "value": child,
+                        "index": self._child_index(child),
+                    },
+                )
+        else:
+            for index, run in self._child_runs(added):
+                self._notify_modified(
+                    declaration,
+                    {
+                        "id": self.id,
+                        "type": "added",
+                        "name": "children",
+                        "value": b"".join(c.render_bytes() for c in run).decode(),
+                        "index": index,
+                    },
+                )
+
+        # This is after any adds as it includes the ids of the added children
+        if reordered:
+            self._notify_modified(
+                declaration,
+                {
+                    "id": self.id,
+                    "type": "reordered",
+                    "name": "children",
+                    "value": [c.id for c in tags],
+                },
+            )
+
+    def reorder_children(self, order: Union[Callable[[Tag], Any], Sequence[int]]):
+        """Reorder the Tag children of this node. Any other children (eg a
+        Looper) stay where they are. If the view was rendered the change is
+        sent as a single "reordered" event when enough children are moved.
+
+        Parameters
+        ----------
+        order: Union[Callable[[Tag], Any], Sequence[int]]
+            Either a key function to sort the children by or the old index
+            of the child to put at each position.
+
+        """
+        tags = [c for c in self._children if isinstance(c, Tag)]
+        if callable(order):
+            ordered = sorted(tags, key=order)
+        else:
+            order = list(order)
+            if sorted(order) != list(range(len(tags))):
+                raise ValueError("The order must be a permutation of the children")
+            ordered = [tags[i] for i in order]
+        if ordered == tags:
+            return
+        slots = iter(ordered)
+        self.insert_children(
+            None, [next(slots) if isinstance(c, Tag) else c for c in self._children]
+        )
+
+    def remove_children(self, children: Iterable[Declarative], destroy: bool = True):
+        """Remove children from this node at once. The children are taken out
+        of the children list and the proxy in one pass instead of one at a
+        time. If the view was rendered a single "removed_many" event with the
+        ids of the children is sent instead of a "removed" event for each.
+
+        Parameters
+        ----------
+        children: Iterable[Declarative]
+            The children of this node to remove.
+        destroy: bool
+            Whether to destroy the children once they are removed.
+
+        """
+        children = list(children)
+        removing = set(children)
+        if len(removing) != len(children) or any(
+            c.parent is not self for c in children
+        ):
+            raise ValueError("The children must be unique children of this node")
+        if not children:
+            return
+        proxy = self.proxy if self.proxy_is_active else None
+        pending = None
+        if proxy is not None and proxy.pending_removed is None:
+            pending = proxy.pending_removed = []
+        remaining = [c for c in self.children if c not in removing]
+        self._children = remaining
+        try:
+            for child in children:
+                child._parent = None
+                child.parent_changed(self, None)
+                self.child_removed(child)
+        finally:
+            if pending is not None:
+                assert proxy is not None
+                del proxy.pending_removed
+                if pending:
+                    proxy.children_removed(pending)
+
+        ids = [c.id for c in children if isinstance(c, Tag)]
+        root = proxy.root if proxy is not None else None
+        if pending is not None and ids and root is not None and root.rendered:
+            change: dict[str, Any] = {
+                "id": self.id,
+                "type": "removed_many",
+                "name": "children",
+                "value": ids,
+            }
+            if len(ids) == 1:
+                change.update(type="removed", value=ids[0])
+            self._notify_modified(root.declaration, change)
+        if destroy:
+            for child in children:
+                child.destroy()
+
+    @contextmanager
+    def rebuild(self) -> Generator[None, None, None]:
+        """Replace the contents of this node in the block and send the
+        difference as a patch instead of the changes made.
+
+        This is for views which are easier to build again than to change.
+        The tree is copied before the block and compared to the tree after
+        it. The nodes are matched by any ids that were not generated, then
+        by tag in order. The result is emitted as a single "batch" event
+        with any other changes made in the block.
+
+        If the view was not rendered or is in a batch the changes are sent
+        as usual.
+
+        """
+        proxy = self.proxy
+        root = proxy.root if proxy is not None and self.proxy_is_active else None
+        declaration = root.declaration if root is not None and root.rendered else None
+        if not isinstance(declaration, Html) or declaration._batch is not None:
+            yield
+            return
+        assert proxy is not None
+        generated = self._generated_ids()
+        old = proxy.snapshot()
+        entries = declaration._batch = []
+        try:
+            yield
+        finally:
+            del declaration._batch
+
+            def outside(node: Any) -> bool:
+                while node is not None:
+                    if node is self:
+                        return False
+                    node = node.parent
+                return True
+
+            entries = [(n, c) for (n, c) in entries if outside(n)]
+            changes = coalesce(declaration, entries, declaration.batch_stats)
+            node: Any = self
+            while node is not None and node is not declaration:
+                node = node.parent
+            if node is not None and self.proxy_is_active:
+                new = proxy.snapshot()
+                generated.update(self._generated_ids())
+                # A new node may reuse the generated id of a removed one so
+                # the patch is after the nodes removed elsewhere and before
+                # any added
+                i = 0
+                for change in changes:
+                    if change["type"] not in ("removed", "removed_many"):
+                        break
+                    i += 1
+                changes[i:i] = diff_trees(old, new, lambda id: id not in generated)
+            if changes:
+                declaration.modified(
+                    {
+                        "id": declaration.id,
+                        "type": "batch",
+                        "name": "changes",
+                        "value": changes,
+                    }
+                )
+
+    def observe_modified(
+        self, callback: Callable[[dict[str, Any]], None], subtree: bool = True
+    ):
+        """Observe the modified events of this node (and all children if
+        subtree is True). The events are filtered before the callback is
+        invoked so it is only called with changes it is interested in.
+
+        The callback is called with the change (the value of the root's
+        modified event). Batch events only contain the changes within this
+        node and are not sent if none are.
+
+        Parameters
+        ----------
+        callback: Callable[[dict], None]
+            The function to call with each change.
+        subtree: bool
+            Whether to include changes to children of this node.
+
+        """
+        root = self._root_html()
+        subscribers = root._subscribers
+        if subscribers is None:
+            subscribers = root._subscribers = {}
+            root.observe("modified", root._route_modified)
+        subscribers.setdefault(self, []).append((callback, subtree))
+
+    def unobserve_modified(self, callback: Callable[[dict[str, Any]], None]):
+        """Stop observing the modified events of this node.
+
+        Parameters
+        ----------
+        callback: Callable[[dict], None]
+            The function passed to observe_modified.
+
+        """
+        root = self._root_html()
+        subscribers = root._subscribers
+        if subscribers is None or self not in subscribers:
+            return
+        subs = [s for s in subscribers[self] if s[0] != callback]
+        if subs:
+            subscribers[self] = subs
+        else:
+            del subscribers[self]
+        if not subscribers:
+            del root._subscribers
+            root.unobserve("modified", root._route_modified)
+
+    def _root_html(self) -> Html:
+        """Get the Html node this node is in."""
+        node: Any = self
+        while (parent := node.parent) is not None:
+            node = parent
+        if not isinstance(node, Html):
+            raise ValueError("The node must be within an Html node")
+        return node
+
+    def _generated_ids(self) -> set[str]:
+        """Get the ids of this node and all children that were generated."""
+        return {
+            d.id for d in self.traverse() if isinstance(d, Tag) and d.id == gen_id(d)
+        }
+
     def _notify_modified(self, root: Optional[Tag], change: dict[str, Any]):
         """Trigger a modified event on the root node. Subclasses may override
         this to update change parameters if needed.
 
         """
         if root is not None:
-            root.modified(change)
+            if isinstance(root, Html) and (changes := root._pending()) is not None:
+                changes.append((self, change))
+            else:
+                root.modified(change)
 
     def _child_index(self, child: Tag) -> int:
         """Find the index of the child ignoring any pattern nodes"""
-        return lookup_child_index(self, child)
+        return self._child_positions(child)[0][child]
+
+    def _child_before(self, child: Tag) -> Optional[Tag]:
+        """Find the Tag before the child ignoring any pattern nodes"""
+        indexes, tags = self._child_positions(child)
+        i = indexes[child]
+        return tags[i - 1] if i else None
+
+    def _child_positions(self, child: Tag) -> tuple[dict[Tag, int], list[Tag]]:
+        """Get the index of each Tag child and the Tag children in order.
+        They are only rebuilt if the child is not found.
+
+        """
+        children = self._children
+        cache = self._child_indexes
+        if cache is not None and cache[0] is children:
+            indexes, tags = cache[2], cache[3]
+            if child in indexes:
+                return indexes, tags
+            # Children appended with set_parent are added to the cache
+            size = len(children)
+            if size == cache[1] + 1 and children[-1] is child:
+                indexes[child] = len(tags)
+                tags.append(child)
+                self._child_indexes = (children, size, indexes, tags)
+                return indexes, tags
+        tags = [c for c in children if isinstance(c, Tag)]
+        indexes = {c: i for i, c in enumerate(tags)}
+        self._child_indexes = (children, len(children), indexes, tags)
+        if child not in indexes:
+            raise KeyError("Child not found")
+        return indexes, tags
+
+    def _child_runs(self, children: list[Tag]) -> list[tuple[int, list[Tag]]]:
+        """Sort children by their index ignoring any pattern nodes and group
+        them into runs of children that are next to each other.
+
+        Parameters
+        ----------
+        children: list[Tag]
+            Children of this node.
+
+        Returns
+        -------
+        runs: list[tuple[int, list[Tag]]]
+            The index of the first child of each run and the children in it.
+
+        """
+        index = self._child_index
+        runs: list[tuple[int, list[Tag]]] = []
+        last = -2
+        for i, c in sorted((index(c), c) for c in children):
+            if i == last + 1:
+                runs[-1][1].append(c)
+            else:
+                runs.append((i, [c]))
+            last = i
+        return runs
 
     # =========================================================================
     # Tag API
@@ -292,9 +819,20 @@ class Tag(ToolkitObject):
         Returns
         -------
         results: Optional[Tag]
-            The first node with the given id or None.
+            The first node with the given id or None. Once the view is
+            initialized the node is found in the cache of the tree.
 
         """
+        if self.proxy_is_active:
+            proxy = self.proxy
+            assert proxy is not None
+            # Look it up in the cache of the tree and check it is in this node
+            node_proxy = proxy.find_by_id(id)
+            node = node_proxy.declaration if node_proxy is not None else None
+            parent = node
+            while parent is not None and parent is not self:
+                parent = parent.parent
+            return node if parent is not None else None
         for child in self.traverse():
             if isinstance(child, Tag) and child.id == id:
                 return child
@@ -359,6 +897,131 @@ class Tag(ToolkitObject):
             return proxy.render(**render_options)
         return proxy.render()
 
+    def render_iter(
+        self, render_options: Optional[dict] = None, **kwargs: dict[str, Any]
+    ) -> Generator[bytes, None, None]:
+        """Render this tag and all children in chunks so the output can be
+        streamed without holding the whole document in memory.
+
+        Parameters
+        -------
+        render_options: dict
+            Options to pass to render_iter
+        kwargs: dict
+            Attributes to set on the view
+
+        Returns
+        -------
+        chunks: Generator[bytes]
+            A generator yielding chunks of the utf-8 encoded html content
+            of the node.
+
+        """
+        self.prepare(**kwargs)
+        proxy = self.proxy
+        assert proxy is not None
+        if render_options:
+            return proxy.render_iter(**render_options)
+        return proxy.render_iter()
+
+    def render_bytes(self, **kwargs: dict[str, Any]) -> bytes:
+        """Render this tag and all children to utf-8 encoded html.
+
+        Parameters
+        -------
+        kwargs: dict
+            Attributes to set on the view
+
+        Returns
+        -------
+        html: bytes
+            The rendered html content of the node.
+
+        """
+        self.prepare(**kwargs)
+        proxy = self.proxy
+        assert proxy is not None
+        return proxy.render_bytes()
+
+    def render_into(
+        self, writable: Union[bytearray, BinaryIO], **kwargs: dict[str, Any]
+    ) -> int:
+        """Render this tag and all children as utf-8 encoded html directly
+        into a buffer or file without creating a str.
+
+        Parameters
+        -------
+        writable: bytearray or BinaryIO
+            A bytearray to extend or an object with a `write` method that
+            accepts bytes, such as a file or a tornado RequestHandler.
+        kwargs: dict
+            Attributes to set on the view
+
+        Returns
+        -------
+        size: int
+            The number of bytes written.
+
+        """
+        self.prepare(**kwargs)
+        proxy = self.proxy
+        assert proxy is not None
+        return proxy.render_into(writable)
+
+    def etag(self, **kwargs: dict[str, Any]) -> str:
+        """Get an entity tag for the content of this tag and all children.
+
+        The digest of each node is kept until it or any descendant changes so
+        this can be used to check `If-None-Match` without rendering.
+
+        Parameters
+        -------
+        kwargs: dict
+            Attributes to set on the view
+
+        Returns
+        -------
+        etag: str
+            The quoted etag of the content.
+
+        """
+        self.prepare(**kwargs)
+        proxy = self.proxy
+        assert proxy is not None
+        return proxy.etag()
+
+    async def render_async(
+        self,
+        render_options: Optional[dict] = None,
+        executor: Optional[Executor] = None,
+        **kwargs: dict[str, Any],
+    ) -> Union[str, bytes]:
+        """Render this tag and all children to a string in a worker thread
+        so the event loop is not blocked while large trees are serialized.
+
+        Parameters
+        -------
+        render_options: dict
+            Options to pass to render_async
+        executor: Executor
+            The executor used to render. A shared thread pool is used if not
+            given.
+        kwargs: dict
+            Attributes to set on the view
+
+        Returns
+        -------
+        html: str
+            The rendered html content of the node.
+
+        """
+        self.prepare(**kwargs)
+        proxy = self.proxy
+        assert proxy is not None
+        if render_options:
+            return await proxy.render_async(executor=executor, **render_options)
+        return await proxy.render_async(executor=executor)
+
 
 class Html(Tag):
     __slots__ = "__weakref__"
@@ -370,6 +1033,360 @@ class Html(Tag):
     #: or removed. Observe this event to handle updating websockets.
     modified = d_(Event(dict), writable=False).tag(attr=False)
 
+    #: Counters of the changes eliminated by coalescing batches
+    batch_stats = Typed(CoalesceStats, ())
+
+    #: Policy which decides when modified events are delivered (eg Throttle)
+    modified_policy = d_(Typed(DeliveryPolicy)).tag(attr=False)
+
+    #: Number of modified events kept so a client which reconnects can get
+    #: the ones it missed with `changes_since`
+    history = d_(Int()).tag(attr=False)
+
+    #: Sequence number of the last modified event
+    sequence = Int()
+
+    #: Nodes and changes buffered while in a batch
+    _batch = Typed(list)
+
+    #: Parent and whether each child was added or moved while inserting
+    #: children
+    _inserting = Typed(tuple)
+
+    #: Handle of the scheduled delivery of the buffered changes
+    _flush_handle = Typed(asyncio.TimerHandle)
+
+    #: Loop time the buffered changes are delivered at. It may be later than
+    #: the handle which then schedules the delivery again
+    _flush_at = Float()
+
+    #: Loop time of the first buffered change
+    _first_change = Float()
+
+    #: Loop time the buffered changes were last delivered
+    _last_flush = Float()
+
+    #: Callbacks observing the modified events of a node
+    _subscribers = Typed(dict)
+
+    #: Sequence numbers and values of the last modified events
+    _history = Typed(deque)
+
+    @contextmanager
+    def batch(self) -> Generator[list[tuple[Tag, dict[str, Any]]], None, None]:
+        """Buffer the modified events of any changes made in the block and
+        emit them as a single event when it exits.
+
+        The changes are coalesced so only the last update of each attribute
+        is sent, changes to nodes removed within the block are dropped, and
+        nodes added then removed are never rendered. Added nodes are
+        rendered when the block exits. See `batch_stats` for the number of
+        changes eliminated.
+
+        The event has the type "batch" and the changes are in the value.
+        No event is emitted if nothing changed. Nested batches are part of
+        the outermost one. If a `modified_policy` scheduled a delivery the
+        changes are left for it.
+
+        Yields
+        ------
+        changes: list[tuple[Tag, dict]]
+            The node and change of each change buffered so far.
+
+        """
+        if (entries := self._batch) is not None:
+            yield entries
+            return
+        entries = self._batch = []
+        try:
+            yield entries
+        finally:
+            if self._batch is entries and self._flush_handle is None:
+                del self._batch
+                self._emit_changes(entries)
+
+    @observe("modified")
+    def _log_modified(self, change: ChangeDict):
+        """Number each modified event and keep the last ones."""
+        self.sequence = seq = self.sequence + 1
+        if size := self.history:
+            log = self._history
+            if log is None or log.maxlen != size:
+                log = self._history = deque(log or (), maxlen=size)
+            log.append((seq, change["value"]))
+        elif self._history is not None:
+            del self._history
+
+    def changes_since(self, sequence: int) -> Optional[list[dict[str, Any]]]:
+        """Get the modified events after the given sequence number. This is
+        intended for clients which reconnect so they can be sent the changes
+        they missed instead of rendering the page again.
+
+        Parameters
+        ----------
+        sequence: int
+            The sequence number of the last event the client received.
+
+        Returns
+        -------
+        changes: Optional[list[dict]]
+            The values of the modified events in order or None if some are
+            no longer kept (or the sequence is invalid) and the client must
+            be refreshed.
+
+        """
+        missed = self.sequence - sequence
+        if missed == 0:
+            return []
+        log = self._history
+        if missed < 0 or not log or missed > len(log):
+            return None
+        return [value for seq, value in islice(log, len(log) - missed, None)]
+
+    def lookup(self, id: str) -> Optional[Tag]:
+        """Get the node with the given id from the cache of the tree. This
+        does not depend on the number of nodes.
+
+        Parameters
+        ----------
+        id: str
+            The id of the node.
+
+        Returns
+        -------
+        node: Optional[Tag]
+            The node or None if no node has the id.
+
+        """
+        if not self.proxy_is_active:
+            return self.find_by_id(id)
+        proxy = self.proxy
+        assert proxy is not None
+        node_proxy = proxy.find_by_id(id)
+        return node_proxy.declaration if node_proxy is not None else None
+
+    def dispatch(self, change: dict[str, Any]) -> Optional[Tag]:
+        """Apply a message sent by a client to the node it refers to. The
+        node is found with `lookup`. The types of messages are:
+
+        - event: {"id": id, "type": "event", "name": "clicked"} triggers the
+          event with the "value" if given
+        - update: {"id": id, "type": "update", "name": "value", "value": v}
+          sets the attribute
+
+        Only attributes declared with `d_` can be changed and only events
+        can be triggered.
+
+        Parameters
+        ----------
+        change: dict
+            The message from the client.
+
+        Returns
+        -------
+        node: Optional[Tag]
+            The node the message was applied to or None if no node has the
+            id (eg it was removed before the message was received).
+
+        """
+        node = self.lookup(change.get("id", ""))
+        if node is None:
+            return None
+        kind = change.get("type")
+        name = change.get("name", "")
+        public = isinstance(name, str) and not name.startswith("_")
+        member = node.get_member(name) if public else None
+        metadata = member.metadata if member is not None else None
+        if not metadata or not metadata.get("d_member"):
+            raise ValueError(f"Cannot change {name!r} of {node}")
+        if kind == "event" and isinstance(member, Event):
+            if "value" in change:
+                setattr(node, name, change["value"])
+            else:
+                getattr(node, name)()
+        elif kind == "update" and not isinstance(member, Event):
+            if not metadata.get("d_writable"):
+                raise ValueError(f"Cannot change {name!r} of {node}")
+            setattr(node, name, change.get("value"))
+        else:
+            raise ValueError(f"Cannot apply {kind!r} to {name!r} of {node}")
+        return node
+
+    def flush(self):
+        """Deliver any changes buffered by the `modified_policy` now. Use this
+        to acknowledge user input without waiting for the policy.
+
+        """
+        if (handle := self._flush_handle) is not None:
+            handle.cancel()
+            del self._flush_handle
+        try:
+            self._last_flush = asyncio.get_running_loop().time()
+        except RuntimeError:
+            pass
+        if (entries := self._batch) is not None:
+            del self._batch
+            self._emit_changes(entries)
+
+    def _pending(self) -> Optional[list[tuple[Tag, dict[str, Any]]]]:
+        """Get the list changes are buffered in if they are not emitted right
+        away. If there is a `modified_policy` this starts buffering and
+        schedules the delivery.
+
+        """
+        entries = self._batch
+        policy = self.modified_policy
+        if policy is None:
+            return entries
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return entries
+        now = loop.time()
+        if entries is None:
+            entries = self._batch = []
+            self._first_change = now
+        # Pushing the delivery back only moves the deadline so the handle is
+        # not replaced on every change
+        self._flush_at = when = policy.next_flush(
+            now, self._first_change, self._last_flush
+        )
+        handle = self._flush_handle
+        if handle is None or when < handle.when():
+            if handle is not None:
+                handle.cancel()
+            self._flush_handle = loop.call_at(when, self._flush_due)
+        return entries
+
+    def _flush_due(self):
+        """Deliver the buffered changes unless the deadline was pushed back
+        since the handle was scheduled.
+
+        """
+        handle = self._flush_handle
+        if handle is not None and (when := self._flush_at) > handle.when():
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_at(when, self._flush_due)
+            return
+        self.flush()
+
+    def _route_modified(self, change: dict[str, Any]):
+        """Send a modified event to the callbacks observing the node it is
+        from or any parent of it.
+
+        """
+        value = change["value"]
+        routes: dict[Tag, list[Callable]] = {}
+        if value["type"] != "batch":
+            for callback in self._routes(value["id"], routes):
+                callback(value)
+            return
+        delivered: dict[Callable, list[dict[str, Any]]] = {}
+        for c in value["value"]:
+            for callback in self._routes(c["id"], routes):
+                delivered.setdefault(callback, []).append(c)
+        for callback, changes in delivered.items():
+            callback({**value, "value": changes})
+
+    def _routes(self, id: str, routes: dict[Tag, list[Callable]]) -> list[Callable]:
+        """Get the callbacks which observe the node with the given id. The
+        callbacks observing each subtree are kept in routes so the parents
+        of a node are only looked at once per event.
+
+        """
+        proxy = self.proxy
+        assert proxy is not None
+        node_proxy = proxy.find_by_id(id)
+        if node_proxy is None or (node := node_proxy.declaration) is None:
+            return []
+        subscribers = self._subscribers or {}
+        exact = [cb for cb, subtree in subscribers.get(node, ()) if not subtree]
+
+        # Find the callbacks observing the subtrees the node is in
+        path = []
+        parent: Any = node
+        callbacks: list[Callable] = []
+        while parent is not None:
+            if (found := routes.get(parent)) is not None:
+                callbacks = found
+                break
+            path.append(parent)
+            parent = parent.parent
+        for n in reversed(path):
+            if subs := subscribers.get(n):
+                callbacks = callbacks + [cb for cb, subtree in subs if subtree]
+            routes[n] = callbacks
+        if exact:
+            return list(dict.fromkeys(exact + callbacks))
+        return callbacks
+
+    def _emit_changes(self, entries: list[tuple[Tag, dict[str, Any]]]):
+        """Coalesce the buffered changes and emit them as a batch event."""
+        changes = coalesce(self, entries, self.batch_stats) if entries else []
+        if changes:
+            self.modified(
+                {
+                    "id": self.id,
+                    "type": "batch",
+                    "name": "changes",
+                    "value": changes,
+                }
+            )
+
+    def render_fragment(
+        self,
+        query: Union[str, Iterable[str]],
+        render_options: Optional[dict] = None,
+        **kwargs: dict[str, Any],
+    ) -> Union[str, bytes, list[Union[str, bytes]]]:
+        """Render only the node(s) matching the query. This is intended for
+        partial responses where the cost should depend on the size of the
+        fragment and not the page.
+
+        Nodes are looked up by id from the cache of the root so the tree is
+        not searched. The cached output of any unchanged subtrees is reused.
+
+        Parameters
+        -------
+        query: str or Iterable[str]
+            The id of a node (optionally prefixed with #) or an xpath query
+            starting with a "/". If an iterable of queries is given a list of
+            fragments is returned.
+        render_options: dict
+            Options to pass to render
+        kwargs: dict
+            Attributes to set on the view
+
+        Returns
+        -------
+        html: str, bytes, or list
+            The rendered html of the fragment or list of fragments. If an
+            xpath query matches multiple nodes their output is joined.
+
+        """
+        self.prepare(**kwargs)
+        options = render_options or {}
+        if isinstance(query, str):
+            return self._render_fragment(query, options)
+        return [self._render_fragment(q, options) for q in query]
+
+    def _render_fragment(self, query: str, options: dict) -> Union[str, bytes]:
+        """Render the nodes matching a single query."""
+        proxy = self.proxy
+        assert proxy is not None
+        if query.startswith("/"):
+            nodes = list(proxy.xpath(query))
+        elif node := proxy.find_by_id(query.lstrip("#")):
+            nodes = [node]
+        else:
+            nodes = []
+        if not nodes:
+            raise KeyError(f"No nodes match {query!r}")
+        if len(nodes) == 1:
+            return nodes[0].render(**options)
+        outputs = [n.render(**options) for n in nodes]
+        return outputs[0][:0].join(outputs)
+
 
 class Head(Tag):
     #: Set the tag name
@@ -0,0 +1,46 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from atom.api import ForwardTyped, Typed
+from lxml.etree import _Element as Element
+from .html import Tag, ProxyTag
+
+
+class ProxyStatic(ProxyTag):
+    #: Reference to the declaration
+    declaration = ForwardTyped(lambda: Static)
+
+
+class Static(Tag):
+    """A node which renders a pre-built subtree that has no dynamic bindings.
+
+    These are created by `web.core.api.hoist_static` in place of the subtree
+    so it is only built and rendered once per enamldef. The nodes within the
+    subtree do not have an id.
+
+    """
+
+    #: Reference to the proxy
+    proxy = Typed(ProxyStatic)
+
+    #: The element which is copied for each instance. This is shared and must
+    #: not be modified.
+    source = Typed(Element)
+
+    #: The utf-8 encoded html of the source shared by each instance.
+    output = Typed(bytes)
+
+    def _default_tag(self):
+        source = self.source
+        return source.tag if source is not None else ""
@@ -12,3 +12,5 @@ Created on Apr 16, 2017
 
 from enaml.core.api import *  # noqa: F401,F403
 from .block import Block  # noqa: F401
+from .compiler import compile_view  # noqa: F401
+from .hoist import hoist_static  # noqa: F401
@@ -11,8 +11,15 @@ Created on Apr 17, 2017
 """
 
 from functools import lru_cache
+from atom.api import Enum, ChangeDict, observe
 from enaml.application import Application, ProxyResolver
-from web.impl import lxml_components
+from web.impl import lxml_components, str_components
+
+#: Factories of each toolkit backend
+BACKENDS = {
+    "lxml": lxml_components.FACTORIES,
+    "string": str_components.FACTORIES,
+}
 
 
 class WebApplication(Application):
@@ -21,8 +28,20 @@ class WebApplication(Application):
 
     """
 
+    #: The toolkit backend used by views created after it is set. The "lxml"
+    #: backend keeps an lxml tree of each view. The "string" backend renders
+    #: directly from the declarations which uses less memory but xpath
+    #: queries must parse the rendered output.
+    backend = Enum(*BACKENDS)
+
     def _default_resolver(self):
-        return ProxyResolver(factories=lxml_components.FACTORIES)
+        return ProxyResolver(factories=BACKENDS[self.backend])
+
+    @observe("backend")
+    def _refresh_resolver(self, change: ChangeDict):
+        if change["type"] == "update":
+            self.resolver = self._default_resolver()
+            self.resolve_proxy_class.cache_clear()
 
     @lru_cache(1024)
     def resolve_proxy_class(self, declaration_class):
@@ -0,0 +1,111 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from time import perf_counter
+from typing import Any, Callable, Union
+from atom.api import Atom, Bool, Float, ForwardTyped, Int, Typed
+from web.core.encoding import ChangeEncoder, JsonEncoder
+from web.core.outbox import html_factory
+
+
+class Broadcast(Atom):
+    """Sends the modified events of a view shared by many clients. Each event
+    is encoded once and the same message is passed to every subscriber.
+
+    If the encoder keeps state between changes (eg a `CompactEncoder`) it is
+    reset when a subscriber is added so the next message can be decoded by
+    every client.
+
+    """
+
+    #: The view the changes are from
+    view = ForwardTyped(html_factory)
+
+    #: Encoder shared by all subscribers
+    encoder = Typed(ChangeEncoder, factory=JsonEncoder)
+
+    #: Include the sequence number of each event in the message
+    sequence = Bool()
+
+    #: Callbacks which are passed each message (eg websocket.write_message)
+    subscribers = Typed(list, ())
+
+    #: Number of messages encoded
+    messages = Int()
+
+    #: Seconds spent encoding the last message
+    encode_time = Float()
+
+    #: Seconds spent encoding all messages
+    total_encode_time = Float()
+
+    @property
+    def subscriber_count(self) -> int:
+        """The number of subscribers."""
+        return len(self.subscribers)
+
+    @property
+    def average_encode_time(self) -> float:
+        """The average seconds spent encoding each message."""
+        return self.total_encode_time / self.messages if self.messages else 0.0
+
+    def subscribe(self, callback: Callable[[Union[str, bytes]], Any]):
+        """Send each message to the callback. The view is only observed while
+        there are subscribers.
+
+        Parameters
+        ----------
+        callback: Callable[[Union[str, bytes]], Any]
+            The function to call with each encoded message.
+
+        """
+        view = self.view
+        assert view is not None
+        if not self.subscribers:
+            view.observe("modified", self._on_modified)
+        self.subscribers.append(callback)
+        self.encoder.reset()
+
+    def unsubscribe(self, callback: Callable[[Union[str, bytes]], Any]):
+        """Stop sending messages to the callback.
+
+        Parameters
+        ----------
+        callback: Callable[[Union[str, bytes]], Any]
+            The function passed to subscribe.
+
+        """
+        try:
+            self.subscribers.remove(callback)
+        except ValueError:
+            return
+        if not self.subscribers:
+            view = self.view
+            assert view is not None
+            view.unobserve("modified", self._on_modified)
+
+    def _on_modified(self, change: dict[str, Any]):
+        start = perf_counter()
+        if self.sequence:
+            view = self.view
+            assert view is not None
+            data = self.encoder.encode(change["value"], sequence=view.sequence)
+        else:
+            data = self.encoder.encode(change["value"])
+        self.encode_time = elapsed = perf_counter() - start
+        self.total_encode_time += elapsed
+        self.messages += 1
+        # Subscribers may unsubscribe while being sent the message
+        for callback in tuple(self.subscribers):
+            callback(data)
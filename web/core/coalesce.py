@@ -0,0 +1,255 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from typing import Any
+from atom.api import Atom, Int
+
+#: Status of a node when the changes are coalesced
+DETACHED, LIVE, FRESH = range(3)
+
+
+class CoalesceStats(Atom):
+    """Counters of the changes eliminated when coalescing batches."""
+
+    #: Number of changes buffered
+    received = Int()
+
+    #: Number of changes emitted
+    emitted = Int()
+
+    #: Updates replaced by a later update of the same attribute or which set
+    #: the attribute back to the value it had before the batch
+    merged = Int()
+
+    #: Changes to nodes which were removed or which are within a node added
+    #: in the same batch
+    dropped = Int()
+
+    #: Adds and removes of the same node which cancel each other out
+    cancelled = Int()
+
+    @property
+    def eliminated(self) -> int:
+        """The total number of changes which were not emitted."""
+        return self.merged + self.dropped + self.cancelled
+
+
+def unchanged(value: Any, oldvalue: Any) -> bool:
+    """Check if an update set the value back to the old value. Values which
+    cannot be compared (eg arrays) are treated as changed.
+
+    """
+    try:
+        return bool(value == oldvalue)
+    except Exception:
+        return False
+
+
+def coalesce(
+    root: Any, entries: list[tuple[Any, dict[str, Any]]], stats: CoalesceStats
+) -> list[dict[str, Any]]:
+    """Reduce the changes buffered by a batch to the fewest that bring the
+    client from the state before the batch to the current state.
+
+    - Only the last update of each `(id, name)` is kept
+    - Changes to nodes which were removed in the batch are dropped
+    - A node added and then removed is never rendered
+    - Added nodes are rendered in their final state so changes within them
+      are dropped
+
+    Removes are emitted first, followed by the adds of each parent in order
+    of their final index with children next to each other joined into one
+    add, then moves and updates. If a parent had children
+    moved as well as added or removed the moved children are removed and
+    added again so the indexes are valid. If a parent was reordered its
+    moves are replaced by one "reordered" event with the final order.
+
+    Parameters
+    ----------
+    root: Html
+        The root node of the batch.
+    entries: list[tuple[Tag, dict]]
+        The node each change originated from and the change. The value of
+        an added change is the child node which is rendered here.
+    stats: CoalesceStats
+        Counters to update.
+
+    Returns
+    -------
+    changes: list[dict]
+        The changes to emit.
+
+    """
+    n = len(entries)
+    keep = [True] * n
+    cancelled = dropped = merged = 0
+
+    # Cancel each add with a later remove of the same node and find which
+    # parents had children moved as well as added or removed
+    pending: dict[str, int] = {}
+    structure: dict[Any, set[str]] = {}
+    for i, (node, change) in enumerate(entries):
+        kind = change["type"]
+        if kind == "update":
+            continue
+        structure.setdefault(node, set()).add(kind)
+        if kind == "added":
+            pending[change["value"].id] = i
+        elif kind == "removed":
+            j = pending.pop(change["value"], None)
+            if j is not None:
+                keep[i] = keep[j] = False
+                cancelled += 2
+        elif kind == "removed_many":
+            ids = []
+            for child_id in change["value"]:
+                j = pending.pop(child_id, None)
+                if j is None:
+                    ids.append(child_id)
+                else:
+                    keep[j] = False
+                    cancelled += 1
+            if not ids:
+                keep[i] = False
+                cancelled += 1
+            elif len(ids) < len(change["value"]):
+                entries[i] = (node, {**change, "value": ids})
+
+    # Nodes that will be rendered in their final state
+    fresh = {entries[j][1]["value"] for j in pending.values()}
+    adds: dict[Any, set[Any]] = {}
+    for j in pending.values():
+        node, change = entries[j]
+        adds.setdefault(node, set()).add(change["value"])
+
+    # Moves which must be replaced with a remove and add
+    for i, (node, change) in enumerate(entries):
+        if change["type"] != "moved":
+            continue
+        kinds = structure[node]
+        if len(kinds) == 1 or "reordered" in kinds:
+            continue
+        child_id = change["value"]
+        for child in node.children:
+            if getattr(child, "id", None) == child_id:
+                if child not in fresh:
+                    fresh.add(child)
+                    adds.setdefault(node, set()).add(child)
+                    entries[i] = (
+                        node,
+                        {
+                            "id": change["id"],
+                            "type": "removed",
+                            "name": "children",
+                            "value": child_id,
+                        },
+                    )
+                break
+
+    state: dict[Any, int] = {root: LIVE}
+
+    def status(node: Any) -> int:
+        path = []
+        while (s := state.get(node)) is None:
+            path.append(node)
+            node = node.parent
+            if node is None:
+                s = DETACHED
+                break
+        for p in reversed(path):
+            if s == LIVE and p in fresh:
+                s = FRESH
+            state[p] = s
+        return s
+
+    removes: list[dict[str, Any]] = []
+    moves: list[dict[str, Any]] = []
+    reorders: dict[Any, dict[str, Any]] = {}
+    updates: dict[tuple[str, str], dict[str, Any]] = {}
+    for i, (node, change) in enumerate(entries):
+        if not keep[i]:
+            continue
+        kind = change["type"]
+        if status(node) != LIVE:
+            dropped += 1
+        elif kind == "update":
+            key = (change["id"], change["name"])
+            if (last := updates.pop(key, None)) is not None:
+                change = {**change, "oldvalue": last["oldvalue"]}
+                merged += 1
+            updates[key] = change
+        elif kind == "added":
+            child = change["value"]
+            if status(child) == DETACHED:
+                dropped += 1
+                adds[node].discard(child)
+        elif kind in ("removed", "removed_many"):
+            removes.append(change)
+        elif kind == "reordered":
+            if reorders.pop(node, None) is not None:
+                merged += 1
+            reorders[node] = change
+        elif kind == "moved" and "reordered" in structure[node]:
+            dropped += 1  # The child is in the final order of the reorder
+        elif kind == "moved":
+            child_id = change["value"]
+            for child in node.children:
+                if getattr(child, "id", None) == child_id:
+                    if status(child) == LIVE:
+                        moves.append(change)
+                    else:
+                        dropped += 1
+                    break
+            else:
+                dropped += 1
+
+    changes = removes
+    for node, children in adds.items():
+        if not children or status(node) != LIVE:
+            continue
+        # Children next to each other are sent as one add
+        runs = node._child_runs(list(children))
+        for index, run in runs:
+            changes.append(
+                {
+                    "id": node.id,
+                    "type": "added",
+                    "name": "children",
+                    "value": "".join(c.render() for c in run),
+                    "index": index,
+                }
+            )
+    changes.extend(moves)
+    for node in reorders:
+        # The ids of the children after the adds in their final order
+        changes.append(
+            {
+                "id": node.id,
+                "type": "reordered",
+                "name": "children",
+                "value": [c.id for c in node.children if getattr(c, "id", None)],
+            }
+        )
+    for change in updates.values():
+        if unchanged(change["value"], change["oldvalue"]):
+            merged += 1
+        else:
+            changes.append(change)
+
+    stats.received += n
+    stats.emitted += len(changes)
+    stats.merged += merged
+    stats.dropped += dropped
+    stats.cancelled += cancelled
+    return changes
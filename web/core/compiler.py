@@ -0,0 +1,708 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from typing import Any, Type
+from atom.api import Atom, Callable, Event, Str, Typed
+from enaml.core.alias import Alias
+from enaml.core.code_tracing import CodeTracer
+from enaml.core.compiler_nodes import CompilerNode, DeclarativeNode, new_scope
+from enaml.core.conditional import Conditional
+from enaml.core.declarative import Declarative
+from enaml.core.dynamicscope import DynamicScope
+from enaml.core.funchelper import call_func
+from enaml.core.looper import Iteration, Looper
+from enaml.core.standard_handlers import (
+    StandardReadHandler,
+    StandardTracedReadHandler,
+)
+from web.components.html import Html, Tag
+from web.impl.lxml_toolkit_object import get_fields
+from .hoist import StaticNode
+from .markup import (
+    BOOLEAN_ATTRIBUTES,
+    RAW_TEXT_ELEMENTS,
+    VOID_ELEMENTS,
+    escape_text,
+    escape_uri,
+    format_attr,
+    format_attrs,
+    format_cls,
+    format_style,
+    is_uri_attr,
+    quote_attr,
+)
+
+#: Tracer passed to `<<` expressions. Nothing is observed since the view is
+#: discarded after rendering.
+TRACER = CodeTracer()
+
+#: Attributes set from members of every tag in the order used by the
+#: WebComponent and how the value is converted
+TAG_ATTRS = (
+    ("alt", "alt", None),
+    ("style", "style", format_style),
+    ("cls", "class", format_cls),
+    ("clickable", "clickable", "true"),
+    ("draggable", "draggable", "true"),
+    ("onclick", "onclick", None),
+    ("ondragstart", "ondragstart", None),
+    ("ondragover", "ondragover", None),
+    ("ondragend", "ondragend", None),
+    ("ondragenter", "ondragenter", None),
+    ("ondragleave", "ondragleave", None),
+    ("ondrop", "ondrop", None),
+)
+
+#: Name of each conversion function in the generated code
+CONVERTERS = {format_style: "style_str", format_cls: "cls_str"}
+
+
+class Unsupported(Exception):
+    """Raised when a node cannot be compiled"""
+
+
+class Owner:
+    """Stands in for a declaration while evaluating the bindings of a node.
+
+    Subclasses are generated for each node with the default value of each
+    member and a cached property for each binding. Names are resolved
+    through the parent chain the same way as a declaration.
+
+    """
+
+    def __init__(self, parent: Any, f_locals: dict):
+        self._parent = parent
+        self._f_locals = f_locals
+
+    @property
+    def parent(self) -> Any:
+        return self._parent
+
+
+class Binding:
+    """A descriptor which evaluates the expression of a binding on an Owner
+    and stores the result on the owner.
+
+    """
+
+    __slots__ = ("name", "func", "args", "f_globals", "f_builtins")
+
+    def __init__(self, name: str, reader: StandardReadHandler):
+        self.name = name
+        self.func = func = reader.func
+        self.f_globals = func.__globals__
+        self.f_builtins = self.f_globals["__builtins__"]
+        traced = isinstance(reader, StandardTracedReadHandler)
+        self.args = (TRACER,) if traced else ()
+
+    def __get__(self, owner: Any, cls: type) -> Any:
+        if owner is None:
+            return self
+        f_locals = owner._f_locals
+        scope = DynamicScope(owner, f_locals, self.f_globals, self.f_builtins)
+        value = owner.__dict__[self.name] = call_func(self.func, self.args, {}, scope)
+        return value
+
+
+def get_readers(node: DeclarativeNode) -> dict[str, StandardReadHandler]:
+    """Get the read handler of each binding of the node. Writers such as
+    `::` and `>>` are ignored since nothing is changed while rendering.
+
+    """
+    engine = node.engine
+    readers: dict[str, StandardReadHandler] = {}
+    if engine is None:
+        return readers
+    for name, handlers in engine._handlers.items():
+        pair = handlers.read_pair
+        if pair is None:
+            continue
+        reader = pair.reader
+        if type(reader) not in (StandardReadHandler, StandardTracedReadHandler):
+            raise Unsupported(f"{name} of {node.klass.__name__} uses an operator")
+        readers[name] = reader
+    return readers
+
+
+def is_constant(reader: StandardReadHandler) -> bool:
+    """Check if the expression of a binding does not use any names."""
+    if type(reader) is not StandardReadHandler:
+        return False
+    code = reader.func.__code__
+    return not (code.co_names or code.co_freevars)
+
+
+class ViewCompiler:
+    """Generates the source of a function which renders an enamldef by
+    concatenating strings.
+
+    Constant parts of the markup are joined together when compiling. Each
+    node with a binding is replaced by an Owner which is created while
+    rendering.
+
+    """
+
+    def __init__(self, cls: Any):
+        self.cls = cls
+        self.lines: list[str] = []
+        self.pending: list[str] = []
+        self.level = 1
+        self.count = 0
+        self.namespace: dict[str, Any] = {
+            "Iteration": Iteration,
+            "attrs": format_attrs,
+            "cls_str": format_cls,
+            "esc": escape_text,
+            "q": quote_attr,
+            "style_str": format_style,
+            "uri": escape_uri,
+        }
+        #: Variable name of the owner of each node
+        self.owners: dict[int, str] = {}
+        #: Variable name of the parent and scope of each pattern
+        self.patterns: dict[int, tuple[str, str]] = {}
+        self.dynamic: dict[int, bool] = {}
+        self.defaults: dict[type, dict[str, Any]] = {}
+        #: Members of the root with a binding and a root without any children
+        self.root_bindings: set[str] = set()
+        self.root_default = cls.__new__(cls)
+        #: Identifiers of nodes which may be changed with an alias
+        self.aliased = {
+            v.target
+            for c in cls.__mro__
+            for v in c.__dict__.values()
+            if isinstance(v, Alias)
+        }
+
+    # -------------------------------------------------------------------------
+    # Code generation
+    # -------------------------------------------------------------------------
+    def name(self, prefix: str) -> str:
+        self.count += 1
+        return f"{prefix}{self.count}"
+
+    def constant(self, value: Any) -> str:
+        name = self.name("c")
+        self.namespace[name] = value
+        return name
+
+    def write(self, text: str):
+        """Write constant markup"""
+        self.pending.append(text)
+
+    def flush(self):
+        if self.pending:
+            text = "".join(self.pending)
+            self.pending = []
+            self.lines.append(f"{'    ' * self.level}w({text!r})")
+
+    def emit(self, line: str):
+        self.flush()
+        self.lines.append(f"{'    ' * self.level}{line}")
+
+    def indent(self):
+        self.flush()
+        self.level += 1
+
+    def dedent(self):
+        self.flush()
+        self.level -= 1
+
+    # -------------------------------------------------------------------------
+    # Analysis
+    # -------------------------------------------------------------------------
+    def check(self, node: CompilerNode):
+        if isinstance(node, StaticNode):
+            return
+        if type(node) is not DeclarativeNode:
+            raise Unsupported(f"{type(node).__name__} cannot be compiled")
+        klass = node.klass
+        if node.super_node is not None:
+            raise Unsupported(f"{klass.__name__} is an enamldef")
+        if node.closure_keys:
+            raise Unsupported(f"{klass.__name__} uses a closure")
+        if issubclass(klass, (Looper, Conditional)):
+            return
+        if not issubclass(klass, Tag) or issubclass(klass, Html):
+            raise Unsupported(f"{klass.__name__} cannot be compiled")
+        if klass.__module__ != "web.components.html":
+            raise Unsupported(f"{klass.__name__} has a custom widget")
+        if node.child_intercept:
+            raise Unsupported(f"{klass.__name__} intercepts it's children")
+        readers = get_readers(node)
+        if "tag" in readers and not is_constant(readers["tag"]):
+            raise Unsupported(f"The tag of {klass.__name__} is not constant")
+
+    def is_dynamic(self, node: CompilerNode) -> bool:
+        """Check if the node or any node within it needs an owner."""
+        key = id(node)
+        result = self.dynamic.get(key)
+        if result is None:
+            self.check(node)
+            if isinstance(node, StaticNode):
+                result = False
+            else:
+                readers = get_readers(node)
+                result = bool(
+                    node.identifier
+                    or node.child_intercept
+                    or any(not is_constant(r) for r in readers.values())
+                )
+                # Check every child so any unsupported nodes are found
+                for child in node.children:
+                    result = self.is_dynamic(child) or result
+            self.dynamic[key] = result
+        return result
+
+    def get_defaults(self, klass: Type[Declarative]) -> dict[str, Any]:
+        """Get the default value of each member of the declaration type."""
+        defaults = self.defaults.get(klass)
+        if defaults is None and issubclass(klass, Looper):
+            defaults = self.defaults[klass] = {"iterable": None}
+        elif defaults is None and issubclass(klass, Conditional):
+            defaults = self.defaults[klass] = {"condition": True}
+        elif defaults is None:
+            defaults = {}
+            instance = klass()
+            for name, member in klass.members().items():
+                meta = member.metadata
+                if not meta or not meta.get("d_member"):
+                    continue
+                elif isinstance(member, Event):
+                    continue
+                elif name == "id" or name == "name" and hasattr(klass, "_default_name"):
+                    # These default to a generated id
+                    defaults[name] = ""
+                else:
+                    defaults[name] = getattr(instance, name)
+            self.defaults[klass] = defaults
+        return defaults
+
+    def owner_class(self, node: DeclarativeNode) -> type:
+        klass = node.klass
+        namespace = dict(self.get_defaults(klass))
+        for name, reader in get_readers(node).items():
+            if is_constant(reader):
+                namespace[name] = call_func(reader.func, (), {}, {})
+            else:
+                namespace[name] = Binding(name, reader)
+        return type(f"{klass.__name__}Owner", (Owner,), namespace)
+
+    def get_value(self, node: DeclarativeNode, name: str) -> tuple[bool, Any]:
+        """Get the value of a member of a node.
+
+        Returns
+        -------
+        result: tuple[bool, Any]
+            Whether the value is constant and either the value or the
+            expression which reads it.
+
+        """
+        if node.identifier in self.aliased and name != "tag":
+            return (False, f"{self.owners[id(node)]}.{name}")
+        readers = get_readers(node)
+        reader = readers.get(name)
+        if reader is None:
+            return (True, self.get_defaults(node.klass)[name])
+        if is_constant(reader):
+            return (True, call_func(reader.func, (), {}, {}))
+        return (False, f"{self.owners[id(node)]}.{name}")
+
+    # -------------------------------------------------------------------------
+    # Compilation
+    # -------------------------------------------------------------------------
+    def compile(self) -> str:
+        """Generate the source of the render function for the enamldef."""
+        cls = self.cls
+        chain: list[DeclarativeNode] = []
+        node = cls.__node__
+        while node is not None:
+            if node.closure_keys or node.child_intercept:
+                raise Unsupported(f"{cls.__name__} cannot be compiled")
+            chain.insert(0, node)
+            node = node.super_node
+
+        self.lines.append("def render(kwargs):")
+        self.emit("parts = []")
+        self.emit("w = parts.append")
+        view = self.constant(cls)
+        self.emit(f"view = {view}.__new__({view})")
+
+        # Mirror EnamlDefNode.populate without creating the children
+        scopes = []
+        engine = None
+        for node in chain:
+            scope = self.name("s")
+            scopes.append(scope)
+            self.emit(f"{scope} = {{}}")
+            if node.identifier:
+                self.emit(f"{scope}[{node.identifier!r}] = view")
+            if node.store_locals:
+                key = self.constant(node.scope_key)
+                self.emit(f"view._d_storage[{key}] = {scope}")
+            if node.engine is not None:
+                engine = node.engine
+        if engine is not None:
+            self.emit(f"view._d_engine = {self.constant(engine)}")
+            self.root_bindings = set(engine._handlers)
+
+        # Create the owners before init so aliases can be set
+        for node, scope in zip(chain, scopes):
+            for child in node.children:
+                self.create_owners(child, "view", scope)
+        self.emit("view.__init__(None, **kwargs)")
+
+        self.compile_root(chain)
+        self.emit("return ''.join(parts)")
+        return "\n".join(self.lines)
+
+    def compile_root(self, chain: list[DeclarativeNode]):
+        """Generate the code which renders the root. Any member may be set
+        when rendering so those without a binding are read from the view
+        only if they are given.
+
+        """
+        self.emit("t = view.tag")
+        self.emit('w("<" + t)')
+        self.emit("a = {}")
+        if "id" in self.root_bindings:
+            self.compile_attr("html", "id", "always", True, (False, "view.id"))
+        else:
+            self.emit("if 'id' in kwargs:")
+            self.indent()
+            self.compile_attr("html", "id", "always", True, (False, "view.id"))
+            self.dedent()
+        items = [*TAG_ATTRS, ("attrs", "", "attrs")]
+        items.extend((m.name, m.name, "field") for m in get_fields(self.cls))
+        for member, name, convert in items:
+            self.compile_root_member(
+                member,
+                lambda value: self.compile_attr("html", name, convert, True, value),
+            )
+        self.emit("w(attrs(t, a))")
+        self.write(">")
+        self.compile_root_member("text", lambda value: self.compile_text(value, False))
+        for node in chain:
+            for child in node.children:
+                self.compile_node(child)
+        self.emit('w("</" + t + ">")')
+        self.compile_root_member("tail", lambda value: self.compile_text(value, False))
+
+    def compile_root_member(self, member: str, compile: Any):
+        if member in self.root_bindings:
+            compile((False, f"view.{member}"))
+            return
+        self.emit(f"if {member!r} in kwargs:")
+        self.indent()
+        compile((False, f"view.{member}"))
+        self.dedent()
+        if default := getattr(self.root_default, member):
+            self.emit("else:")
+            self.indent()
+            compile((True, default))
+            self.dedent()
+
+    def create_owners(self, node: CompilerNode, parent: str, scope: str):
+        """Generate the code which creates the owners of the node and it's
+        children within a scope. The children of patterns are created when
+        the pattern is rendered.
+
+        """
+        if not self.is_dynamic(node):
+            return
+        assert isinstance(node, DeclarativeNode)
+        owner = self.name("n")
+        self.owners[id(node)] = owner
+        self.emit(
+            f"{owner} = {self.constant(self.owner_class(node))}({parent}, {scope})"
+        )
+        if node.identifier:
+            self.emit(f"{scope}[{node.identifier!r}] = {owner}")
+        if issubclass(node.klass, (Looper, Conditional)):
+            self.patterns[id(node)] = (parent, scope)
+            return
+        for child in node.children:
+            self.create_owners(child, owner, scope)
+
+    def compile_nodes(self, nodes: list[CompilerNode], parent: str, scope: str):
+        for node in nodes:
+            self.create_owners(node, parent, scope)
+        for node in nodes:
+            self.compile_node(node)
+
+    def compile_node(self, node: CompilerNode):
+        if isinstance(node, StaticNode):
+            if node.output is None:
+                with new_scope(node.scope_key):
+                    node.build()
+            assert node.output is not None
+            self.write(node.output.decode())
+            return
+        assert isinstance(node, DeclarativeNode)
+        klass = node.klass
+        if issubclass(klass, Looper):
+            self.compile_looper(node)
+        elif issubclass(klass, Conditional):
+            self.compile_conditional(node)
+        else:
+            self.compile_tag(node)
+
+    def compile_looper(self, node: DeclarativeNode):
+        if not node.children:
+            return
+        owner = self.owners[id(node)]
+        parent, scope = self.patterns[id(node)]
+        items, index, item = self.name("it"), self.name("i"), self.name("x")
+        loop_scope = self.name("s")
+        self.emit(f"{items} = {owner}.iterable")
+        self.emit(f"if {items} is not None:")
+        self.indent()
+        self.emit(f"for {index}, {item} in enumerate({items}):")
+        self.indent()
+        self.emit(f"{loop_scope} = {scope}.copy()")
+        self.emit(f"{loop_scope}['loop_index'] = {index}")
+        self.emit(f"{loop_scope}['loop_item'] = {item}")
+        self.emit(f"{loop_scope}['loop'] = Iteration(index={index}, item={item})")
+        self.compile_nodes(node.children, parent, loop_scope)
+        self.dedent()
+        self.dedent()
+
+    def compile_conditional(self, node: DeclarativeNode):
+        if not node.children:
+            return
+        owner = self.owners[id(node)]
+        parent, scope = self.patterns[id(node)]
+        cond_scope = self.name("s")
+        self.emit(f"if {owner}.condition:")
+        self.indent()
+        self.emit(f"{cond_scope} = {scope}.copy()")
+        self.compile_nodes(node.children, parent, cond_scope)
+        self.dedent()
+
+    def compile_tag(self, node: DeclarativeNode):
+        klass = node.klass
+        readers = get_readers(node)
+        tag = self.get_value(node, "tag")[1]
+        self.write(f"<{tag}")
+
+        # Set the attributes in the same order as the WebComponent. If attrs
+        # is set a dict is used since it may replace others.
+        items: list[tuple[str, str, Any]] = []
+        if "id" in readers:
+            items.append(("id", "id", "always"))
+        items.extend(TAG_ATTRS)
+        use_dict = "attrs" in readers
+        if use_dict:
+            items.append(("attrs", "", "attrs"))
+        for m in get_fields(klass):
+            if m.name == "name" and "name" not in readers:
+                if hasattr(klass, "_default_name"):
+                    continue  # Defaults to the id
+            items.append((m.name, m.name, "field"))
+
+        if use_dict:
+            self.emit("a = {}")
+        for member, name, convert in items:
+            value = self.get_value(node, member)
+            self.compile_attr(tag, name, convert, use_dict, value)
+        if use_dict:
+            self.emit(f"w(attrs({tag!r}, a))")
+        self.write(">")
+
+        if tag.lower() in VOID_ELEMENTS:
+            self.compile_text(self.get_value(node, "tail"), False)
+            return
+        raw = tag.lower() in RAW_TEXT_ELEMENTS
+        self.compile_text(self.get_value(node, "text"), raw)
+        for child in node.children:
+            self.compile_node(child)
+        self.write(f"</{tag}>")
+        self.compile_text(self.get_value(node, "tail"), False)
+
+    def compile_attr(
+        self,
+        tag: str,
+        name: str,
+        convert: Any,
+        use_dict: bool,
+        result: tuple[bool, Any],
+    ):
+        """Generate the code which writes an attribute of a tag.
+
+        Parameters
+        ----------
+        tag: str
+            The tag of the element
+        name: str
+            The name of the attribute
+        convert: Any
+            How the value is converted to a str
+        use_dict: bool
+            Whether the attribute is added to a dict instead of being written
+        result: tuple[bool, Any]
+            The result of `get_value` for the member
+
+        """
+        is_constant, value = result
+        if is_constant:
+            if convert == "attrs":
+                for k, v in (value or {}).items():
+                    self.emit(f"a[{k!r}] = {v!r}")
+                return
+            if convert == "field":
+                if value is True:
+                    value = name
+                elif value:
+                    value = f"{value}"
+            elif convert == "true":
+                value = "true" if value else None
+            elif convert != "always" and convert is not None and value:
+                value = convert(value)
+            if not value and convert != "always":
+                return
+            if use_dict:
+                self.emit(f"a[{name!r}] = {value!r}")
+            else:
+                self.write(format_attr(tag, name, value))
+            return
+
+        # Read the value when rendering
+        self.emit(f"v = {value}")
+        if convert == "attrs":
+            self.emit("if v:")
+            self.indent()
+            self.emit("a.update(v)")
+            self.dedent()
+            return
+        if convert == "field":
+            self.emit("if v is True:")
+            self.indent()
+            self.write_attr(tag, name, repr(name), use_dict)
+            self.dedent()
+            self.emit("elif v:")
+            self.indent()
+            self.write_attr(tag, name, "f'{v}'", use_dict)
+            self.dedent()
+            return
+        if convert != "always":
+            self.emit("if v:")
+            self.indent()
+        if convert == "true":
+            self.write_attr(tag, name, "'true'", use_dict)
+        elif convert is not None and convert != "always":
+            self.write_attr(tag, name, f"{CONVERTERS[convert]}(v)", use_dict)
+        else:
+            self.write_attr(tag, name, "v", use_dict)
+        if convert != "always":
+            self.dedent()
+
+    def write_attr(self, tag: str, name: str, expr: str, use_dict: bool):
+        if use_dict:
+            self.emit(f"a[{name!r}] = {expr}")
+        elif name.lower() in BOOLEAN_ATTRIBUTES:
+            self.write(f" {name}")
+        elif is_uri_attr(tag, name):
+            self.emit(f"w({f' {name}='!r} + q(uri({expr})))")
+        else:
+            self.emit(f"w({f' {name}='!r} + q({expr}))")
+
+    def compile_text(self, result: tuple[bool, Any], raw: bool):
+        is_constant, value = result
+        if is_constant:
+            if value:
+                self.write(value if raw else escape_text(value))
+            return
+        self.emit(f"if v := {value}:")
+        self.indent()
+        self.emit("w(v)" if raw else "w(esc(v))")
+        self.dedent()
+
+
+class CompiledView(Atom):
+    """A render function generated from an enamldef. See `compile_view`."""
+
+    #: The enamldef which was compiled
+    view = Typed(type)
+
+    #: The generated function. This is None if the view cannot be compiled.
+    func = Callable()
+
+    #: The source of the generated function
+    source = Str()
+
+    #: Why the view cannot be compiled
+    reason = Str()
+
+    def render(self, **kwargs: Any) -> str:
+        """Render the view.
+
+        Parameters
+        ----------
+        kwargs: dict
+            Attributes to set on the view
+
+        Returns
+        -------
+        html: str
+            The rendered html content of the view.
+
+        """
+        func = self.func
+        if func is None:
+            view = self.view
+            assert view is not None
+            return view(**kwargs).render()
+        return func(kwargs)
+
+    def __call__(self, **kwargs: Any) -> str:
+        return self.render(**kwargs)
+
+
+def compile_view(cls: type) -> CompiledView:
+    """Compile an enamldef of Html into a function which renders it by
+    concatenating strings without creating the declarations, proxies, or
+    lxml elements.
+
+    Bindings and Looper items are evaluated while rendering but nothing is
+    observed so the result can only be used to render once for the given
+    attributes. Use the enamldef itself when the view is used interactively
+    (modified events, xpath, etc). Generated ids are not included since
+    nothing can reference them.
+
+    If the view contains any nodes which cannot be compiled (enamldefs,
+    templates, Blocks, Raw, Markdown, Code, etc) the view is rendered the
+    normal way and the reason is set on the result.
+
+    Parameters
+    ----------
+    cls: type
+        The enamldef to compile.
+
+    Returns
+    -------
+    result: CompiledView
+        The compiled render function.
+
+    """
+    if not issubclass(cls, Html):
+        raise TypeError(f"Only an Html enamldef can be compiled, got {cls}")
+    try:
+        compiler = ViewCompiler(cls)
+        source = compiler.compile()
+    except Unsupported as e:
+        return CompiledView(view=cls, reason=f"{e}")
+    namespace = compiler.namespace
+    filename = f"<compiled {cls.__name__}>"
+    exec(compile(source, filename, "exec"), namespace)
+    return CompiledView(view=cls, func=namespace["render"], source=source)
@@ -0,0 +1,75 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+import gzip
+from typing import Callable
+
+
+def gzip_compress(data: bytes) -> bytes:
+    """Compress with gzip. The mtime is fixed so the same output always
+    compresses to the same bytes.
+
+    """
+    return gzip.compress(data, mtime=0)
+
+
+#: Functions to compress rendered output by content encoding. Brotli and
+#: zstd are only available if the brotli or zstandard packages are installed.
+COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {"gzip": gzip_compress}
+
+try:
+    import brotli
+
+    COMPRESSORS["br"] = brotli.compress
+except ImportError:
+    pass
+
+try:
+    from compression import zstd  # type: ignore
+
+    COMPRESSORS["zstd"] = zstd.compress
+except ImportError:
+    try:
+        import zstandard
+
+        def zstd_compress(data: bytes) -> bytes:
+            # Compressors are not thread safe so one is created each time
+            return zstandard.ZstdCompressor().compress(data)
+
+        COMPRESSORS["zstd"] = zstd_compress
+    except ImportError:
+        pass
+
+
+def get_compressor(name: str) -> Callable[[bytes], bytes]:
+    """Get the function to compress with the given content encoding.
+
+    Parameters
+    ----------
+    name: str
+        The content encoding (eg gzip, br, or zstd).
+
+    Returns
+    -------
+    compressor: Callable[[bytes], bytes]
+        The compression function.
+
+    """
+    try:
+        return COMPRESSORS[name]
+    except KeyError:
+        options = ", ".join(COMPRESSORS)
+        raise ValueError(
+            f"Unsupported compression {name!r}. Available options are: {options}"
+        )
@@ -0,0 +1,72 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from atom.api import Atom, Float
+
+
+class DeliveryPolicy(Atom):
+    """Decides when the changes of a view are delivered. Changes are buffered
+    and coalesced as if in a batch until the time returned by `next_flush`.
+
+    Policies only apply when changes are made with an asyncio event loop
+    running (eg in a tornado handler). Otherwise they are delivered as usual.
+
+    """
+
+    def next_flush(self, now: float, first_change: float, last_flush: float) -> float:
+        """Get the loop time the buffered changes should be delivered at.
+        This is called for each change.
+
+        Parameters
+        ----------
+        now: float
+            The loop time of the change.
+        first_change: float
+            The loop time of the first change that is buffered.
+        last_flush: float
+            The loop time changes were last delivered.
+
+        Returns
+        -------
+        when: float
+            The loop time to deliver the buffered changes at.
+
+        """
+        raise NotImplementedError
+
+
+class Throttle(DeliveryPolicy):
+    """Deliver changes at most `hz` times per second."""
+
+    #: Maximum number of deliveries per second
+    hz = Float(30)
+
+    def next_flush(self, now: float, first_change: float, last_flush: float) -> float:
+        return max(first_change, last_flush + 1 / self.hz)
+
+
+class Debounce(DeliveryPolicy):
+    """Deliver changes once there have been none for `wait` seconds or at
+    most `max_wait` seconds after the first one.
+
+    """
+
+    #: Seconds without a change before delivering
+    wait = Float(0.05)
+
+    #: Maximum seconds a change is delayed
+    max_wait = Float(0.5)
+
+    def next_flush(self, now: float, first_change: float, last_flush: float) -> float:
+        return min(now + self.wait, first_change + self.max_wait)
@@ -0,0 +1,532 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from html import escape
+from typing import Any, Callable, Optional
+from lxml.etree import XPath, _Element, tostring
+
+#: Names of attributes in modified events which differ from the html
+ATTRIBUTE_NAMES = {"class": "cls"}
+
+
+def is_key(id: str) -> bool:
+    """By default every id is used to match nodes."""
+    return True
+
+
+def longest_increasing(values: list[int]) -> set[int]:
+    """Find the positions of a longest strictly increasing subsequence.
+
+    Parameters
+    ----------
+    values: list[int]
+        The values.
+
+    Returns
+    -------
+    positions: set[int]
+        The positions of the values in the subsequence.
+
+    """
+    tails: list[int] = []  # Smallest last value of each length
+    tail_positions: list[int] = []
+    previous = [-1] * len(values)
+    for i, v in enumerate(values):
+        k = bisect_left(tails, v)
+        if k == len(tails):
+            tails.append(v)
+            tail_positions.append(i)
+        else:
+            tails[k] = v
+            tail_positions[k] = i
+        previous[i] = tail_positions[k - 1] if k else -1
+    positions = set()
+    i = tail_positions[-1] if tail_positions else -1
+    while i >= 0:
+        positions.add(i)
+        i = previous[i]
+    return positions
+
+
+class Positions:
+    """A binary indexed tree of which slots are filled so the index of a
+    slot among the filled ones can be found in log time.
+
+    """
+
+    __slots__ = ("tree",)
+
+    def __init__(self, size: int):
+        self.tree = [0] * (size + 1)
+
+    def add(self, slot: int, delta: int):
+        tree = self.tree
+        i = slot + 1
+        n = len(tree)
+        while i < n:
+            tree[i] += delta
+            i += i & -i
+
+    def index(self, slot: int) -> int:
+        """Count the filled slots before the slot."""
+        tree = self.tree
+        i = slot
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+
+def inner_html(node: _Element) -> str:
+    """Render the text and children of a node as html."""
+    text = escape(node.text, quote=False) if node.text else ""
+    return text + "".join(tostring(c, method="html", encoding="unicode") for c in node)
+
+
+def diff_trees(
+    old: _Element, new: _Element, key: Callable[[str], bool] = is_key
+) -> list[dict[str, Any]]:
+    """Compare two versions of a tree and generate the modified events
+    which change the old one into the new one.
+
+    Children with an id accepted by `key` are matched by id. Other children
+    are matched by tag in order and their id is updated if it differs. The
+    fewest children are moved by keeping the longest run of matched children
+    that are already in order in place. It takes O(n log n) in the number
+    of nodes.
+
+    If a node without an id differs or would need to be moved, added, or
+    removed, the children of the closest parent with an id are replaced
+    with a "refresh" event.
+
+    The changes are ordered so no two nodes ever have the same id on the
+    client (see `order_changes`). Generated ids are often reused by new
+    nodes, so if that cannot be done the children of the root are replaced
+    with a single "refresh" event instead.
+
+    Parameters
+    ----------
+    old: _Element
+        The tree as it was last sent.
+    new: _Element
+        The tree as it is now. It must have the same tag and id as the old.
+    key: Callable[[str], bool]
+        Check if an id should be used to match nodes.
+
+    Returns
+    -------
+    changes: list[dict]
+        The modified events in the order they must be applied.
+
+    """
+    if old.tag != new.tag or old.get("id") is None:
+        raise ValueError("The trees must have the same tag and an id")
+    changes: list[dict[str, Any]] = []
+    diff_node(old, new, key, changes)
+    ordered = order_changes(old, new, changes)
+    if ordered is None:
+        ordered = []
+        refresh_node(old, new, ordered)
+    return ordered
+
+
+#: Get the ids of a node and all of it's descendants
+tree_ids = XPath("descendant-or-self::*/@id", smart_strings=False)
+
+#: Get the ids of the descendants of a node
+descendant_ids = XPath("descendant::*/@id", smart_strings=False)
+
+
+def order_changes(
+    old: _Element, new: _Element, changes: list[dict[str, Any]]
+) -> Optional[list[dict[str, Any]]]:
+    """Order the changes generated by `diff_node` so they can be applied one
+    at a time without two nodes having the same id.
+
+    Removes are first, then the ids are renamed, then any other updates,
+    refreshes, adds, and moves. A node is only renamed once the node which
+    had the id it is renamed to was removed or renamed. Nodes renamed in a
+    cycle are first moved out of the way with a temporary id. A refreshed
+    node with an old descendant holding an id that is needed elsewhere is
+    emptied right after the removes. The value of "removed" and "added"
+    events is the node and of "refresh" events the old and new node until
+    they are ordered.
+
+    Returns
+    -------
+    changes: list[dict] or None
+        The ordered changes or None if an id would still be in use twice.
+
+    """
+    old_ids, new_list = tree_ids(old), tree_ids(new)
+    live, new_ids = set(old_ids), set(new_list)
+    if len(live) != len(old_ids) or len(new_ids) != len(new_list):
+        return None  # Duplicate ids
+
+    removes: list[dict[str, Any]] = []
+    renames: dict[str, dict[str, Any]] = {}
+    updates: list[dict[str, Any]] = []
+    refreshes: list[dict[str, Any]] = []
+    inserts: list[dict[str, Any]] = []
+    for change in changes:
+        kind = change["type"]
+        if kind == "removed":
+            node = change["value"]
+            live.difference_update(tree_ids(node))
+            removes.append({**change, "value": node.get("id")})
+        elif kind == "update" and change["name"] == "id":
+            renames[change["oldvalue"]] = change
+        elif kind == "update":
+            updates.append(change)
+        elif kind == "refresh":
+            refreshes.append(change)
+        else:
+            inserts.append(change)
+    ordered = removes
+
+    # The ids needed by the renamed, refreshed, and added nodes
+    needed = {c["value"] for c in renames.values()}
+    regions = []
+    for change in refreshes:
+        node_old, node_new = change["value"]
+        region = (set(descendant_ids(node_old)), descendant_ids(node_new))
+        needed.update(region[1])
+        regions.append(region)
+    for change in inserts:
+        if change["type"] == "added":
+            needed.update(tree_ids(change["value"]))
+
+    # Empty any refreshed node whose old descendants hold an id needed
+    # before it is refreshed
+    for change, (old_region, new_region) in zip(refreshes, regions):
+        own = set(new_region)
+        if any(id in needed and id not in own for id in old_region):
+            node_old = change["value"][0]
+            ordered.append({**change, "id": node_old.get("id"), "value": ""})
+            live.difference_update(old_region)
+
+    # Each node is renamed after the chain of nodes holding the id it is
+    # renamed to
+    done: set[str] = set()
+    temp = 0
+    for change in renames.values():
+        chain = []
+        c: Optional[dict[str, Any]] = change
+        while c is not None and c["oldvalue"] not in done:
+            done.add(c["oldvalue"])
+            chain.append(c)
+            c = renames.get(c["value"])
+        if not chain:
+            continue
+        if c is chain[0]:
+            # A cycle so the first is moved out of the way and renamed last
+            first = chain[0]
+            while (tmp := f"{first['oldvalue']}-{temp}") in live or tmp in new_ids:
+                temp += 1
+            ordered.append({**first, "value": tmp})
+            live.discard(first["oldvalue"])
+            live.add(tmp)
+            chain = [*reversed(chain[1:]), {**first, "id": tmp, "oldvalue": tmp}]
+        else:
+            chain.reverse()
+        for c in chain:
+            if c["value"] in live:
+                return None
+            live.discard(c["oldvalue"])
+            live.add(c["value"])
+            ordered.append(c)
+    ordered.extend(updates)
+
+    for change, (old_region, new_region) in zip(refreshes, regions):
+        live.difference_update(old_region)
+        for id in new_region:
+            if id in live:
+                return None
+            live.add(id)
+        ordered.append({**change, "value": inner_html(change["value"][1])})
+
+    for change in inserts:
+        if change["type"] == "added":
+            node = change["value"]
+            for id in tree_ids(node):
+                if id in live:
+                    return None
+                live.add(id)
+            value = tostring(node, method="html", encoding="unicode")
+            change = {**change, "value": value}
+        ordered.append(change)
+    return ordered
+
+
+def refresh_node(old: _Element, new: _Element, changes: list[dict[str, Any]]):
+    """Generate the changes which replace the children of a node."""
+    old_id, new_id = old.get("id"), new.get("id")
+    if old_id != new_id:
+        changes.append(
+            {
+                "id": old_id,
+                "type": "update",
+                "name": "id",
+                "value": new_id,
+                "oldvalue": old_id,
+            }
+        )
+    diff_attributes(old, new, new_id, changes)
+    tail, oldtail = new.tail or "", old.tail or ""
+    if tail != oldtail:
+        changes.append(
+            {
+                "id": new_id,
+                "type": "update",
+                "name": "tail",
+                "value": tail,
+                "oldvalue": oldtail,
+            }
+        )
+    changes.append(
+        {
+            "id": new_id,
+            "type": "refresh",
+            "name": "children",
+            "value": inner_html(new),
+        }
+    )
+
+
+def diff_attributes(
+    old: _Element, new: _Element, id: str, changes: list[dict[str, Any]]
+):
+    """Generate the changes to the attributes other than the id of a node."""
+    old_attrs, new_attrs = old.attrib, new.attrib
+    for name in dict.fromkeys((*old_attrs.keys(), *new_attrs.keys())):
+        if name == "id":
+            continue
+        value, oldvalue = new_attrs.get(name), old_attrs.get(name)
+        if value != oldvalue:
+            changes.append(
+                {
+                    "id": id,
+                    "type": "update",
+                    "name": ATTRIBUTE_NAMES.get(name, name),
+                    "value": value,
+                    "oldvalue": oldvalue,
+                }
+            )
+
+
+def diff_node(
+    old: _Element,
+    new: _Element,
+    key: Callable[[str], bool],
+    changes: list[dict[str, Any]],
+) -> bool:
+    """Generate the changes for a pair of matched nodes. Returns False if
+    the node has no id and differs so the parent must be refreshed.
+
+    """
+    old_id = old.get("id")
+    new_id = new.get("id")
+    if old_id is None or new_id is None:
+        if old_id is not None or new_id is not None:
+            return False
+        if len(old) or len(new):
+            return tostring(old) == tostring(new)
+        return (
+            old.tag == new.tag
+            and (old.text or "") == (new.text or "")
+            and (old.tail or "") == (new.tail or "")
+            and old.attrib == new.attrib
+        )
+
+    if old_id != new_id:
+        changes.append(
+            {
+                "id": old_id,
+                "type": "update",
+                "name": "id",
+                "value": new_id,
+                "oldvalue": old_id,
+            }
+        )
+
+    if old.attrib != new.attrib:
+        diff_attributes(old, new, new_id, changes)
+
+    # Children are compared first as the text is part of a refresh
+    refresh = False
+    children: list[dict[str, Any]] = []
+    if len(old) or len(new):
+        refresh = not diff_children(old, new, old_id, new_id, key, children)
+
+    for name in ("tail",) if refresh else ("text", "tail"):
+        value, oldvalue = getattr(new, name) or "", getattr(old, name) or ""
+        if value != oldvalue:
+            changes.append(
+                {
+                    "id": new_id,
+                    "type": "update",
+                    "name": name,
+                    "value": value,
+                    "oldvalue": oldvalue,
+                }
+            )
+
+    if refresh:
+        changes.append(
+            {
+                "id": new_id,
+                "type": "refresh",
+                "name": "children",
+                "value": (old, new),
+            }
+        )
+    else:
+        changes.extend(children)
+    return True
+
+
+def child_keys(
+    children: list[_Element], key: Callable[[str], bool]
+) -> list[tuple[Any, ...]]:
+    """Get the key used to match each child. Children without a key are
+    matched by their tag and occurrence.
+
+    """
+    keys: list[tuple[Any, ...]] = []
+    counts: dict[Any, int] = {}
+    for c in children:
+        id = c.get("id")
+        if id is not None and key(id):
+            keys.append((c.tag, id))
+        else:
+            tag = c.tag
+            n = counts.get(tag, 0)
+            counts[tag] = n + 1
+            keys.append((tag, None, n))
+    return keys
+
+
+def diff_children(
+    old: _Element,
+    new: _Element,
+    old_id: str,
+    id: str,
+    key: Callable[[str], bool],
+    changes: list[dict[str, Any]],
+) -> bool:
+    """Generate the changes to the children of a node. Returns False if
+    they cannot be expressed without a refresh.
+
+    """
+    if len(old) == len(new):
+        for o, n in zip(old, new):
+            if o.tag != n.tag or o.get("id") != n.get("id"):
+                break
+        else:
+            # Nothing was added, moved, or removed
+            for o, n in zip(old, new):
+                if not diff_node(o, n, key, changes):
+                    return False
+            return True
+
+    old_children, new_children = list(old), list(new)
+
+    # Ids in both are always used so a node is never renamed to the id of
+    # another node
+    both = {c.get("id") for c in old_children} & {c.get("id") for c in new_children}
+    both.discard(None)
+    if both:
+        is_key = key
+
+        def key(id: str) -> bool:
+            return id in both or is_key(id)
+
+    old_index = {k: i for i, k in enumerate(child_keys(old_children, key))}
+    new_keys = child_keys(new_children, key)
+    if len(old_index) != len(old_children) or len(set(new_keys)) != len(new_keys):
+        return False  # Duplicate ids
+
+    # Remove old children which were not matched
+    matched = [old_index.get(k) for k in new_keys]
+    kept = set(i for i in matched if i is not None)
+    if len(kept) < len(old_children):
+        for index, c in enumerate(old_children):
+            if index in kept:
+                continue
+            if c.get("id") is None:
+                return False
+            changes.append(
+                {"id": old_id, "type": "removed", "name": "children", "value": c}
+            )
+
+    # The kept children which stay in place
+    order = [i for i in matched if i is not None]
+    stable_order = longest_increasing(order)
+    stable = set(order[i] for i in stable_order)
+
+    # Moved and added children are inserted right after the child before it
+    # in the new order. The position of every slot a child can be in is
+    # known up front so the index of each change can be found by counting
+    # the filled slots before it.
+    kept_position = {i: p for p, i in enumerate(sorted(kept))}
+    chains: list[list[int]] = [[] for _ in range(len(kept) + 1)]
+    anchor = 0
+    for j, i in enumerate(matched):
+        if i in stable:
+            anchor = kept_position[i] + 1
+        else:
+            chains[anchor].append(j)
+
+    base_slot = [0] * len(kept)
+    new_slot: dict[int, int] = {}
+    slot = 0
+    for p, chain in enumerate(chains):
+        if p:
+            base_slot[p - 1] = slot
+            slot += 1
+        for j in chain:
+            new_slot[j] = slot
+            slot += 1
+
+    positions = Positions(slot)
+    for s in base_slot:
+        positions.add(s, 1)
+
+    for j, i in enumerate(matched):
+        if i in stable:
+            continue
+        c = new_children[j]
+        s = new_slot[j]
+        if i is None:
+            change = {"id": id, "type": "added", "name": "children", "value": c}
+        else:
+            # The child is moved after it is renamed
+            child_id = c.get("id")
+            if child_id is None or old_children[i].get("id") is None:
+                return False
+            positions.add(base_slot[kept_position[i]], -1)
+            change = {"id": id, "type": "moved", "name": "children", "value": child_id}
+        change["index"] = positions.index(s)
+        positions.add(s, 1)
+        changes.append(change)
+
+    # Then update the matched children
+    for j, i in enumerate(matched):
+        if i is not None and not diff_node(
+            old_children[i], new_children[j], key, changes
+        ):
+            return False
+    return True
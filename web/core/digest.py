@@ -0,0 +1,99 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from hashlib import blake2b
+from typing import Any
+from atom.api import Atom, Int, Typed
+
+#: Number of bytes of the blake2b digest kept for each node
+DIGEST_SIZE = 16
+
+#: Mask to keep the sum of the child digests the same size as a digest
+DIGEST_MASK = (1 << (DIGEST_SIZE * 8)) - 1
+
+
+def hash_digest(data: bytes) -> bytes:
+    """Hash the data and truncate it to the digest size. This is faster than
+    passing the digest size to blake2b for small inputs.
+
+    """
+    return blake2b(data).digest()[:DIGEST_SIZE]
+
+
+def digest_term(i: int, digest: bytes) -> int:
+    """Hash the digest of a child with it's position so the sum of the terms
+    changes if the children are reordered.
+
+    """
+    return int.from_bytes(hash_digest(digest + i.to_bytes(4, "little")), "little")
+
+
+class ChildDigests(Atom):
+    """The digests of the children of a node combined into a sum which can
+    be updated one child at a time.
+
+    A change to a child costs two hashes no matter how many siblings it has.
+    This is discarded whenever the children are added, moved, or removed.
+
+    """
+
+    #: The term of each child in order
+    terms = Typed(list)
+
+    #: Map of child to it's position in the terms
+    index = Typed(dict)
+
+    #: Sum of the terms
+    total = Int()
+
+    #: Children whose digest changed since the total was updated
+    changed = Typed(set, ())
+
+    def __init__(self, children: list[Any]):
+        """Compute the terms of the children.
+
+        Parameters
+        ----------
+        children: list
+            The child components. Each must have a `get_digest` method.
+
+        """
+        super().__init__()
+        self.index = {c: i for i, c in enumerate(children)}
+        self.terms = terms = [
+            digest_term(i, c.get_digest()) for i, c in enumerate(children)
+        ]
+        self.total = sum(terms) & DIGEST_MASK
+
+    def digest(self) -> bytes:
+        """Update the terms of any changed children and get the sum.
+
+        Returns
+        -------
+        digest: bytes
+            The combined digest of the children.
+
+        """
+        if changed := self.changed:
+            index, terms = self.index, self.terms
+            assert index is not None and terms is not None
+            total = self.total
+            for c in changed:
+                i = index[c]
+                term = digest_term(i, c.get_digest())
+                total += term - terms[i]
+                terms[i] = term
+            self.total = total & DIGEST_MASK
+            changed.clear()
+        return self.total.to_bytes(DIGEST_SIZE, "little")
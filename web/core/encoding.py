@@ -0,0 +1,365 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+import json
+from functools import partial
+from typing import Any, Callable, Optional, Union
+from atom.api import Atom, Bool, Int, Str, Typed
+
+#: Opcodes of the change types in the compact encoding
+(
+    UPDATE,
+    ADDED,
+    MOVED,
+    REMOVED,
+    BATCH,
+    REFRESH,
+    TRIGGER,
+    RESET,
+    SEQUENCE,
+    REORDERED,
+    REMOVED_MANY,
+) = range(11)
+
+OPCODES = {
+    "update": UPDATE,
+    "added": ADDED,
+    "moved": MOVED,
+    "removed": REMOVED,
+    "batch": BATCH,
+    "refresh": REFRESH,
+    "trigger": TRIGGER,
+    "reordered": REORDERED,
+    "removed_many": REMOVED_MANY,
+}
+
+TYPES = {op: name for name, op in OPCODES.items()}
+
+#: Functions to serialize the compact form of a change by format. Msgpack and
+#: cbor are only available if the msgpack or cbor2 packages are installed.
+SERIALIZERS: dict[str, Callable[[Any], Union[str, bytes]]] = {
+    "json": partial(json.dumps, separators=(",", ":"))
+}
+
+#: Functions to parse each serialized format
+DESERIALIZERS: dict[str, Callable[[Union[str, bytes]], Any]] = {"json": json.loads}
+
+try:
+    import msgpack
+
+    SERIALIZERS["msgpack"] = msgpack.packb
+    DESERIALIZERS["msgpack"] = msgpack.unpackb
+except ImportError:
+    pass
+
+try:
+    import cbor2
+
+    SERIALIZERS["cbor"] = cbor2.dumps
+    DESERIALIZERS["cbor"] = cbor2.loads
+except ImportError:
+    pass
+
+
+def get_serializer(name: str) -> Callable[[Any], Union[str, bytes]]:
+    """Get the function to serialize with the given format.
+
+    Parameters
+    ----------
+    name: str
+        The format (eg json, msgpack, or cbor).
+
+    Returns
+    -------
+    serializer: Callable
+        The serialization function.
+
+    """
+    try:
+        return SERIALIZERS[name]
+    except KeyError:
+        options = ", ".join(SERIALIZERS)
+        raise ValueError(
+            f"Unsupported format {name!r}. Available options are: {options}"
+        )
+
+
+class ChangeEncoder(Atom):
+    """Encodes the changes of `Html.modified` events to send to a client.
+    An encoder may keep state between changes so one should be created for
+    each connection.
+
+    """
+
+    def encode(
+        self, change: dict[str, Any], sequence: Optional[int] = None
+    ) -> Union[str, bytes]:
+        """Encode a change.
+
+        Parameters
+        ----------
+        change: dict
+            The value of the modified event.
+        sequence: Optional[int]
+            The sequence number of the last event included in the change
+            (see `Html.sequence`) so a client can resume after reconnecting.
+
+        Returns
+        -------
+        data: str or bytes
+            The message to send.
+
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget any state kept between changes so the next message can be
+        decoded by a new client.
+
+        """
+        pass
+
+
+class JsonEncoder(ChangeEncoder):
+    """Encodes each change as a json object. The sequence number is added as
+    the "sequence" key if given.
+
+    """
+
+    def encode(
+        self, change: dict[str, Any], sequence: Optional[int] = None
+    ) -> Union[str, bytes]:
+        if sequence is not None:
+            change = {**change, "sequence": sequence}
+        return json.dumps(change)
+
+
+class CompactEncoder(ChangeEncoder):
+    """Encodes each change as a list starting with an opcode for the type.
+    Ids and names are interned so each is only sent once.
+
+    The first time a string is sent it is included as is and both sides add
+    it to their table. After that the index in the table is sent instead.
+    When the table is full a reset is sent and it starts over.
+
+    The layout of each type is:
+
+    - update: [0, id, name, value] with the oldvalue appended if enabled
+    - added: [1, id, html, index]
+    - moved: [2, id, child id, index]
+    - removed: [3, id, child id]
+    - batch: [4, id, [changes...]]
+    - reset: [7, change] clears the table before the change is decoded
+    - sequence: [8, sequence, change] gives the sequence number of a change
+    - reordered: [9, id, [child ids...]]
+    - removed_many: [10, id, [child ids...]]
+
+    Other types are [opcode or type, id, name, value].
+
+    """
+
+    #: Format used to serialize the compact form
+    format = Str()
+
+    #: Include the oldvalue of updates
+    oldvalue = Bool()
+
+    #: Maximum number of interned strings before the table is reset
+    max_strings = Int(65536)
+
+    #: Interned strings and their index
+    strings = Typed(dict, ())
+
+    #: Whether the next message must start over with an empty table
+    _reset = Bool()
+
+    def _default_format(self):
+        return "msgpack" if "msgpack" in SERIALIZERS else "json"
+
+    def _observe_format(self, change):
+        get_serializer(self.format)
+
+    def intern(self, value: str) -> Union[int, str]:
+        """Get the index of an interned string or intern it.
+
+        Parameters
+        ----------
+        value: str
+            The string to intern.
+
+        Returns
+        -------
+        ref: int or str
+            The index if the string was already sent or the string itself.
+
+        """
+        strings = self.strings
+        ref = strings.get(value)
+        if ref is not None:
+            return ref
+        strings[value] = len(strings)
+        return value
+
+    def compact(self, change: dict[str, Any]) -> list:
+        """Convert a change to the compact form.
+
+        Parameters
+        ----------
+        change: dict
+            The value of the modified event.
+
+        Returns
+        -------
+        record: list
+            The compact form of the change.
+
+        """
+        intern = self.intern
+        kind = change["type"]
+        op = OPCODES.get(kind, kind)
+        ref = intern(change["id"])
+        if op == UPDATE:
+            record = [op, ref, intern(change["name"]), change["value"]]
+            if self.oldvalue:
+                record.append(change.get("oldvalue"))
+            return record
+        elif op == ADDED:
+            return [op, ref, change["value"], change.get("index")]
+        elif op == MOVED:
+            return [op, ref, intern(change["value"]), change.get("index")]
+        elif op == REMOVED:
+            return [op, ref, intern(change["value"])]
+        elif op == BATCH:
+            compact = self.compact
+            return [op, ref, [compact(c) for c in change["value"]]]
+        elif op == REORDERED or op == REMOVED_MANY:
+            return [op, ref, [intern(v) for v in change["value"]]]
+        return [op, ref, intern(change["name"]), change.get("value")]
+
+    def encode(
+        self, change: dict[str, Any], sequence: Optional[int] = None
+    ) -> Union[str, bytes]:
+        # Strings are only kept once the message is serialized so the table
+        # matches the client's if the change cannot be encoded
+        strings = self.strings
+        size = len(strings)
+        reset = self._reset or size >= self.max_strings
+        if reset:
+            self.strings = {}
+        try:
+            record = self.compact(change)
+            if reset:
+                record = [RESET, record]
+            if sequence is not None:
+                record = [SEQUENCE, sequence, record]
+            data = get_serializer(self.format)(record)
+        except Exception:
+            if reset:
+                self.strings = strings
+            else:
+                while len(strings) > size:
+                    strings.popitem()
+            raise
+        self._reset = False
+        return data
+
+    def reset(self):
+        self._reset = True
+
+
+class CompactDecoder(Atom):
+    """Decodes the output of a `CompactEncoder` back into changes."""
+
+    #: Format used to serialize the compact form
+    format = Str()
+
+    #: Interned strings
+    strings = Typed(list, ())
+
+    #: Sequence number of the last change decoded that included one
+    sequence = Int()
+
+    def _default_format(self):
+        return "msgpack" if "msgpack" in SERIALIZERS else "json"
+
+    def lookup(self, ref: Union[int, str]) -> str:
+        """Get an interned string or intern a new one."""
+        strings = self.strings
+        if isinstance(ref, int):
+            return strings[ref]
+        strings.append(ref)
+        return ref
+
+    def expand(self, record: list) -> dict[str, Any]:
+        """Convert the compact form back into a change.
+
+        Parameters
+        ----------
+        record: list
+            The compact form of the change.
+
+        Returns
+        -------
+        change: dict
+            The change.
+
+        """
+        lookup = self.lookup
+        op = record[0]
+        if op == RESET:
+            self.strings.clear()
+            return self.expand(record[1])
+        elif op == SEQUENCE:
+            self.sequence = record[1]
+            return self.expand(record[2])
+        change: dict[str, Any] = {"id": lookup(record[1]), "type": TYPES.get(op, op)}
+        if op == UPDATE:
+            change["name"] = lookup(record[2])
+            change["value"] = record[3]
+            if len(record) > 4:
+                change["oldvalue"] = record[4]
+        elif op == ADDED:
+            change.update(name="children", value=record[2], index=record[3])
+        elif op == MOVED:
+            change.update(name="children", value=lookup(record[2]), index=record[3])
+        elif op == REMOVED:
+            change.update(name="children", value=lookup(record[2]))
+        elif op == BATCH:
+            expand = self.expand
+            change.update(name="changes", value=[expand(r) for r in record[2]])
+        elif op == REORDERED or op == REMOVED_MANY:
+            change.update(name="children", value=[lookup(r) for r in record[2]])
+        else:
+            change.update(name=lookup(record[2]), value=record[3])
+        return change
+
+    def decode(self, data: Union[str, bytes]) -> dict[str, Any]:
+        """Decode a message from a `CompactEncoder`.
+
+        Parameters
+        ----------
+        data: str or bytes
+            The message.
+
+        Returns
+        -------
+        change: dict
+            The change.
+
+        """
+        try:
+            loads = DESERIALIZERS[self.format]
+        except KeyError:
+            raise ValueError(f"Unsupported format {self.format!r}")
+        return self.expand(loads(data))
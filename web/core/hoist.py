@@ -0,0 +1,170 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import Any
+from atom.api import Typed
+from enaml.core.compiler_nodes import CompilerNode, DeclarativeNode
+from enaml.core.standard_handlers import StandardReadHandler
+from lxml.etree import _Element, tostring
+from lxml.html import fragments_fromstring
+from web.components.html import Html, Tag, gen_id
+from web.components.static import Static
+
+
+class StaticNode(DeclarativeNode):
+    """A compiler node which creates a Static node in place of a subtree with
+    no dynamic bindings.
+
+    The subtree is built and rendered the first time the node is used and the
+    result is shared by every instance.
+
+    """
+
+    #: The compiler node of the subtree which was replaced
+    node = Typed(DeclarativeNode)
+
+    #: The element built from the subtree
+    source = Typed(_Element)
+
+    #: The utf-8 encoded html of the source
+    output = Typed(bytes)
+
+    def __call__(self, parent):
+        if self.source is None:
+            self.build()
+        return Static(parent, source=self.source, output=self.output)
+
+    def build(self):
+        """Build the subtree under a temporary root and render it. Any
+        generated ids are removed since they are only unique while the
+        temporary nodes exist. This is called while the scope of the parent
+        node is active.
+
+        """
+        node = self.node
+        assert node is not None
+        root = Html()
+        tag = node(root)
+        root.initialize()
+        root.activate_proxy()
+        generated = [
+            d for d in tag.traverse() if isinstance(d, Tag) and d.id == gen_id(d)
+        ]
+        widget = getattr(tag.proxy, "widget", None)
+        if isinstance(widget, _Element):
+            for d in generated:
+                d.proxy.widget.attrib.pop("id", None)
+            source = deepcopy(widget)
+            self.source = source
+            self.output = tostring(source, method="html", encoding="utf-8")
+        else:
+            # The string backend has no tree so remove the ids from the output
+            # and parse it in case a view using the lxml backend needs it
+            output = tag.render()
+            for d in generated:
+                output = output.replace(f' id="{d.id}"', "", 1)
+            self.source = fragments_fromstring(output)[0]
+            self.output = output.encode()
+        root.destroy()
+
+    def copy(self):
+        node = super().copy()
+        node.node = self.node
+        node.source = self.source
+        node.output = self.output
+        return node
+
+
+def is_static(node: CompilerNode) -> bool:
+    """Check if the node and all of it's children can be hoisted.
+
+    Only builtin tags with no identifier and no bindings other than `=`
+    with a constant expression can be hoisted. Patterns (such as a Looper or
+    Conditional), enamldefs, and any node with a `::`, `<<`, `>>`, or `:=`
+    binding cannot. Form controls without a name cannot either since the
+    default name is the id.
+
+    """
+    if type(node) is not DeclarativeNode:
+        return False
+    klass = node.klass
+    if not issubclass(klass, Tag) or issubclass(klass, (Html, Static)):
+        return False
+    if not klass.__module__.startswith("web.components."):
+        return False
+    if node.identifier or node.super_node is not None or node.child_intercept:
+        return False
+    if node.closure_keys:
+        return False
+    engine = node.engine
+    bindings = engine._handlers if engine else {}
+    # Form controls use the id as the default name
+    if hasattr(klass, "_default_name") and "name" not in bindings:
+        return False
+    for handlers in bindings.values():
+        for pair in handlers.all_pairs:
+            reader = pair.reader
+            if pair.writer is not None or type(reader) is not StandardReadHandler:
+                return False
+            code = reader.func.__code__
+            if code.co_names or code.co_freevars:
+                return False
+    return all(is_static(child) for child in node.children)
+
+
+def hoist_nodes(node: CompilerNode) -> int:
+    """Replace any static children of the node with a StaticNode.
+
+    Returns
+    -------
+    count: int
+        The number of subtrees that were hoisted.
+
+    """
+    count = 0
+    children = node.children
+    for i, child in enumerate(children):
+        if is_static(child):
+            children[i] = StaticNode(
+                node=child, klass=Static, scope_key=child.scope_key
+            )
+            count += 1
+        elif type(child) is DeclarativeNode:
+            count += hoist_nodes(child)
+    return count
+
+
+def hoist_static(cls: Any) -> int:
+    """Hoist the subtrees of an enamldef which have no dynamic bindings so
+    they are built and rendered once and shared by every instance.
+
+    Each hoisted subtree is replaced by a single `Static` node and the nodes
+    within it do not have an id, so they cannot be found with `find_by_id`
+    and xpath queries within them do not return a declaration. The subtrees
+    of any enamldef it extends are not hoisted unless this is also called on
+    that enamldef.
+
+    Parameters
+    ----------
+    cls: type
+        The enamldef to hoist the static subtrees of.
+
+    Returns
+    -------
+    count: int
+        The number of subtrees that were hoisted.
+
+    """
+    return hoist_nodes(cls.__node__)
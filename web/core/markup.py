@@ -0,0 +1,149 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from typing import Union
+from urllib.parse import quote
+
+#: Elements which have no end tag. Any text or children are dropped.
+VOID_ELEMENTS = frozenset(
+    (
+        "area",
+        "base",
+        "basefont",
+        "br",
+        "col",
+        "frame",
+        "hr",
+        "img",
+        "input",
+        "isindex",
+        "link",
+        "meta",
+        "param",
+    )
+)
+
+#: Elements where the text is written as is
+RAW_TEXT_ELEMENTS = frozenset(("script", "style"))
+
+#: Attributes which are written without a value
+BOOLEAN_ATTRIBUTES = frozenset(
+    (
+        "checked",
+        "compact",
+        "declare",
+        "defer",
+        "disabled",
+        "ismap",
+        "multiple",
+        "nohref",
+        "noresize",
+        "noshade",
+        "nowrap",
+        "readonly",
+        "selected",
+    )
+)
+
+#: Attributes which are uri escaped
+URI_ATTRIBUTES = frozenset(("href", "action", "src"))
+
+#: Characters which are not uri escaped
+URI_SAFE = "".join(chr(i) for i in range(33, 127))
+
+
+def escape_text(value: str) -> str:
+    """Escape text content the same way lxml does when using the html
+    method.
+
+    """
+    return (
+        value.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace("\r", "&#13;")
+    )
+
+
+def quote_attr(value: str) -> str:
+    """Escape and quote an attribute value. Single quotes are used if the
+    value contains a double quote but no single quote.
+
+    """
+    value = escape_text(value)
+    if '"' in value:
+        if "'" not in value:
+            return f"'{value}'"
+        value = value.replace('"', "&quot;")
+    return f'"{value}"'
+
+
+def escape_uri(value: str) -> str:
+    """Escape a uri attribute value. Leading whitespace is removed and
+    spaces and non-ascii characters are percent encoded.
+
+    """
+    if value.isascii() and value.isprintable() and " " not in value:
+        return value
+    return quote(value.lstrip(" \t\n\r"), safe=URI_SAFE)
+
+
+def is_uri_attr(tag: str, name: str) -> bool:
+    """Check if the attribute value is a uri which must be escaped."""
+    name = name.lower()
+    return name in URI_ATTRIBUTES or (name == "name" and tag.lower() == "a")
+
+
+def format_attr(tag: str, name: str, value: str) -> str:
+    """Format an attribute of a start tag.
+
+    Parameters
+    ----------
+    tag: str
+        The tag of the element.
+    name: str
+        The name of the attribute.
+    value: str
+        The value of the attribute.
+
+    Returns
+    -------
+    attr: str
+        The attribute including a leading space.
+
+    """
+    if name.lower() in BOOLEAN_ATTRIBUTES:
+        return f" {name}"
+    if is_uri_attr(tag, name):
+        value = escape_uri(value)
+    return f" {name}={quote_attr(value)}"
+
+
+def format_attrs(tag: str, attrs: dict[str, str]) -> str:
+    """Format all attributes of a start tag."""
+    return "".join(format_attr(tag, k, v) for k, v in attrs.items())
+
+
+def format_style(style: Union[dict, str]) -> str:
+    """Convert a style dict to a str"""
+    if isinstance(style, dict):
+        return ";".join(f"{k}:{v}" for k, v in style.items())
+    return style
+
+
+def format_cls(cls: Union[tuple[str], list[str], str]) -> str:
+    """Convert a list of classes to a str"""
+    if isinstance(cls, (tuple, list)):
+        return " ".join(cls)
+    return cls
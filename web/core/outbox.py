@@ -0,0 +1,191 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Optional
+from atom.api import Atom, ForwardTyped, Int, Typed
+from web.core.diff import inner_html
+
+#: Types of changes to the children of a node
+STRUCTURAL = {"added", "moved", "removed", "removed_many", "reordered", "refresh"}
+
+
+def html_factory():
+    from web.components.html import Html
+
+    return Html
+
+
+def change_size(change: dict[str, Any]) -> int:
+    """Estimate the number of bytes needed to send a change. Strings are
+    counted by their length and other values as a few bytes.
+
+    """
+    value = change.get("value")
+    size: int
+    if change["type"] == "batch":
+        size = sum(change_size(c) for c in value or ())
+    elif isinstance(value, str):
+        size = len(value)
+    else:
+        size = 8
+    return size + len(change["id"]) + len(change["name"])
+
+
+class ChangeQueue(Atom):
+    """A queue of the changes waiting to be sent to one client. This keeps the
+    memory used by a client which cannot keep up bounded.
+
+    When more than `max_changes` or `max_bytes` are queued, the changes are
+    dropped and replaced with a single "refresh" of the children of the
+    closest node containing every node they changed. Changes to the
+    attributes of the root node itself are kept as they are not part of any
+    refresh. Triggered JS events are kept in order after the refresh.
+
+    """
+
+    #: The view the changes are from
+    view = ForwardTyped(html_factory)
+
+    #: Maximum number of changes queued
+    max_changes = Int(1000)
+
+    #: Maximum estimated number of bytes queued
+    max_bytes = Int(1 << 20)
+
+    #: Sequence numbers and changes waiting to be sent
+    changes = Typed(deque, ())
+
+    #: Estimated number of bytes queued
+    size = Int()
+
+    #: Number of times the queue was replaced with a refresh
+    collapsed = Int()
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def put(self, change: dict[str, Any], sequence: int = 0):
+        """Add a change to the queue.
+
+        Parameters
+        ----------
+        change: dict
+            The value of the modified event.
+        sequence: int
+            The sequence number of the event (see `Html.sequence`).
+
+        """
+        self.changes.append((sequence, change))
+        self.size += change_size(change)
+        if len(self.changes) > self.max_changes or self.size > self.max_bytes:
+            self.collapse()
+
+    def pop(self) -> Optional[tuple[int, dict[str, Any]]]:
+        """Remove the next change to send from the queue.
+
+        Returns
+        -------
+        result: Optional[tuple[int, dict]]
+            The sequence number and change or None if the queue is empty.
+
+        """
+        if not self.changes:
+            return None
+        sequence, change = self.changes.popleft()
+        self.size -= change_size(change)
+        return sequence, change
+
+    def collapse(self):
+        """Replace the queued changes with a refresh of the closest node
+        which contains every node they changed.
+
+        """
+        view = self.view
+        proxy = view.proxy if view is not None else None
+        if proxy is None or not self.changes:
+            return
+        find_by_id = proxy.find_by_id
+        sequence = self.changes[-1][0]
+        kept: dict[str, dict[str, Any]] = {}
+        triggers: list[dict[str, Any]] = []
+        nodes = []
+
+        def add(change: dict[str, Any]):
+            kind = change["type"]
+            if kind == "batch":
+                for c in change["value"]:
+                    add(c)
+                return
+            node_proxy = find_by_id(change["id"])
+            if node_proxy is None:
+                return  # It was removed later
+            node = node_proxy.declaration
+            if kind == "trigger":
+                triggers.append(change)
+            elif kind in STRUCTURAL:
+                nodes.append(node)
+            elif node is view:
+                kept[change["name"]] = change
+            else:
+                nodes.append(node.parent)
+
+        for seq, change in self.changes:
+            add(change)
+
+        changes: deque = deque()
+        if nodes:
+            node = common_ancestor(nodes)
+            refresh = {
+                "id": node.id,
+                "type": "refresh",
+                "name": "children",
+                "value": inner_html(node.proxy.snapshot()),
+            }
+            changes.append((sequence, refresh))
+        changes.extend((sequence, c) for c in kept.values())
+        changes.extend((sequence, c) for c in triggers)
+        self.changes = changes
+        self.size = sum(change_size(c) for seq, c in changes)
+        self.collapsed += 1
+
+
+def common_ancestor(nodes: list[Any]) -> Any:
+    """Find the closest node which contains all of the given nodes.
+
+    Parameters
+    ----------
+    nodes: list[Tag]
+        The nodes which must be within the same tree.
+
+    Returns
+    -------
+    node: Tag
+        The closest common ancestor (which may be one of the nodes).
+
+    """
+    # The path from the first node to the root
+    path = []
+    node = nodes[0]
+    while node is not None:
+        path.append(node)
+        node = node.parent
+    depth = {n: i for i, n in enumerate(path)}
+    lowest = 0
+    for node in nodes[1:]:
+        while (i := depth.get(node)) is None:
+            node = node.parent
+        if i > lowest:
+            lowest = i
+    return path[lowest]
@@ -50,6 +50,12 @@ def raw_factory():
     return RawComponent
 
 
+def static_factory():
+    from .lxml_static import StaticComponent
+
+    return StaticComponent
+
+
 #: Create generic html factories
 FACTORIES = {
     name: generic_factory
@@ -65,5 +71,6 @@ FACTORIES.update(
         "Markdown": markdown_factory,
         "Notebook": notebook_factory,
         "Raw": raw_factory,
+        "Static": static_factory,
     }
 )
@@ -10,9 +10,10 @@ Created on Aug 2, 2017
 @author: jrm
 """
 
-from lxml.etree import HTML
+from lxml.etree import HTML, tostring
 from lxml.etree import _Element as Element
 from web.components.raw import ProxyRawNode, SourceType
+from web.core.digest import hash_digest
 from .lxml_toolkit_object import WebComponent
 
 
@@ -47,3 +48,9 @@ class RawComponent(WebComponent, ProxyRawNode):
 
         # Clear removes everything so it must be reinitialized
         super().init_widget()
+
+    def compute_digest(self) -> bytes:
+        """The source has no components so the whole subtree is hashed."""
+        w = self.widget
+        assert w is not None
+        return hash_digest(tostring(w, method="html", encoding="utf-8"))
@@ -0,0 +1,48 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from copy import copy
+from web.components.static import ProxyStatic
+from web.core.digest import hash_digest
+from .lxml_toolkit_object import WebComponent
+
+
+class StaticComponent(WebComponent, ProxyStatic):
+    """A component which copies a pre-built subtree and reuses it's output."""
+
+    def create_widget(self):
+        """Copy the source element into the parent. Nodes in the subtree do
+        not have an id so this is not added to the cache.
+
+        """
+        d = self.declaration
+        parent = d.parent.proxy
+        parent.wait_for_render()
+        self.root = parent.root
+        # Copying an lxml element always copies the whole subtree
+        self.widget = w = copy(d.source)
+        parent.widget.append(w)
+
+    def init_widget(self):
+        """Use the shared output and make the parent splice it in instead of
+        serializing the subtree again.
+
+        """
+        self.output = self.declaration.output
+        if parent := self.parent():
+            parent.mark_dirty()
+
+    def compute_digest(self) -> bytes:
+        """The subtree is shared so the digest is the hash of the output."""
+        d = self.declaration
+        assert d is not None and d.output is not None
+        return hash_digest(d.output)
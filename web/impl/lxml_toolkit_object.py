@@ -12,11 +12,60 @@ Created on Apr 12, 2017
 
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Any, Type, Union, Optional, Generator
-from atom.api import Atom, Bool, Member, Typed, Event, Dict
+import asyncio
+from copy import deepcopy
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from functools import lru_cache, partial
+from itertools import chain
+from typing import Any, BinaryIO, Callable, Type, Union, Optional, Generator
+from atom.api import Atom, Bool, Int, Member, Typed, Event, Dict
 from lxml.etree import _Element, Element, SubElement, tostring
-from web.components.html import ProxyTag
+from web.components.html import ProxyTag, Tag
+from web.core.compression import get_compressor
+from web.core.digest import ChildDigests, hash_digest
+
+#: Placeholder element used to split the markup of a node around it's children
+SPLICE_TAG = "enaml-web-splice"
+SPLICE_MARKUP = f"<{SPLICE_TAG}></{SPLICE_TAG}>".encode()
+
+
+@lru_cache(1)
+def default_executor() -> ThreadPoolExecutor:
+    """Get the thread pool used to render in the background when no executor
+    is given to `render_async`.
+
+    """
+    return ThreadPoolExecutor(thread_name_prefix="enaml-web-render")
+
+
+def is_utf8(encoding: Any) -> bool:
+    """Check if the encoding is the one used for the cached output."""
+    return isinstance(encoding, str) and encoding.lower() in ("utf-8", "utf8")
+
+
+def write_parts(
+    write: Callable[[bytes], Any],
+    parts: list[bytes],
+    start: int,
+    end: int,
+    batch: int = 256,
+) -> int:
+    """Write a range of parts a batch at a time. Joining many small parts at
+    once needs a temporary buffer much larger than the output.
+
+    Returns
+    -------
+    size: int
+        The number of bytes written.
+
+    """
+    size = 0
+    for i in range(start, end, batch):
+        j = min(i + batch, end)
+        chunk = b"".join(parts[i:j])
+        write(chunk)
+        size += len(chunk)
+    return size
 
 
 @lru_cache(1024)
@@ -53,6 +102,35 @@ class WebComponent(ProxyTag):
     #: A reference to the toolkit widget created by the proxy.
     widget = Typed(_Element)
 
+    #: The utf-8 encoded html output of this node (including the tail) from
+    #: the last render. This is only valid if the node is not dirty.
+    output = Typed(bytes)
+
+    #: Flag indicating that this node or one of it's descendants changed
+    #: since the output was last rendered.
+    dirty = Bool()
+
+    #: The output of the last render split into the start of the node, the
+    #: output of each child and the end of the node. This is only created for
+    #: nodes which were dirty when rendered and is discarded whenever the
+    #: children are added, moved, or removed. The start is emptied when only
+    #: the attributes or text of this node changed.
+    parts = Typed(list)
+
+    #: Map of child component to it's position in the parts
+    part_index = Typed(dict)
+
+    #: Children whose output changed since the parts were joined
+    dirty_children = Typed(set)
+
+    #: Hash of the content of this node and all children. This is cleared
+    #: when this node or any descendant changes.
+    digest = Typed(bytes)
+
+    #: The combined digest of the children. This is discarded whenever the
+    #: children are added, moved, or removed.
+    child_digests = Typed(ChildDigests)
+
     # -------------------------------------------------------------------------
     # Initialization API
     # -------------------------------------------------------------------------
@@ -66,6 +144,7 @@ class WebComponent(ProxyTag):
         """
         d = self.declaration
         parent = d.parent.proxy
+        parent.wait_for_render()
         self.root = parent.root
         self.root.cache[d.id] = self
         self.widget = SubElement(parent.widget, d.tag)
@@ -142,25 +221,41 @@ class WebComponent(ProxyTag):
         """A reimplemented destructor.
 
         This destructor will clear the reference to the toolkit widget
-        and set its parent to None.
+        and set its parent to None. The descendants of a destroyed node are
+        dropped along with its widget so they are not unlinked one by one.
 
         """
-        if self.root is not None:
-            if (root := self.root) and (cache := root.cache):
-                try:
-                    del cache[self.declaration.id]
-                except KeyError:
-                    pass
-
-            del self.root
-
-        if self.widget is not None:
-            parent = self.widget.getparent()
-            if parent is not None:
-                parent.remove(self.widget)
-            self.widget.clear()
+        self.wait_for_render()
+        if self.detached:
+            # The widget of an ancestor is removed and cleared
+            if (root := self.root) is not None:
+                if (cache := root.cache) and not root.declaration.is_destroyed:
+                    cache.pop(self.declaration.id, None)
+                del self.root
             del self.widget
-
+        else:
+            if self.root is not None:
+                if (root := self.root) and (cache := root.cache):
+                    try:
+                        del cache[self.declaration.id]
+                    except KeyError:
+                        pass
+
+                del self.root
+
+            if self.widget is not None:
+                parent = self.widget.getparent()
+                if parent is not None:
+                    parent.remove(self.widget)
+                self.widget.clear()
+                del self.widget
+
+        del self.output
+        del self.parts
+        del self.part_index
+        del self.dirty_children
+        del self.digest
+        del self.child_digests
         super().destroy()
 
     def child_added(self, child: WebComponent):
@@ -173,13 +268,47 @@ class WebComponent(ProxyTag):
         w = self.widget
         if w is None:
             return
+        if (pending := self.pending_children) is not None:
+            pending.append(child)
+            return
+
+        # Put it after the node before it
+        self.invalidate_children()
+        self.place_child(child)
 
-        # Use insert to put in the correct spot
+    def children_added(self, children: list[WebComponent]):
+        """Handle children added by an insert. The widgets of each run of
+        children next to each other are spliced in with one assignment.
+
+        """
+        w = self.widget
+        if w is None:
+            return
         d = self.declaration
         assert d is not None
-        assert child.declaration is not None
-        i = d._child_index(child.declaration)
-        w.insert(i, child.widget)
+        self.invalidate_children()
+        declarations: list[Tag] = []
+        for c in children:
+            assert c.declaration is not None
+            declarations.append(c.declaration)
+        for index, run in d._child_runs(declarations):
+            widgets = []
+            for tag in run:
+                assert tag.proxy is not None
+                widgets.append(tag.proxy.widget)
+            first = widgets[0]
+            before = d._child_before(run[0])
+            previous = None
+            if before is not None:
+                assert before.proxy is not None
+                previous = before.proxy.widget
+            if (
+                first.getparent() is w
+                and first.getprevious() is previous
+                and all(a.getnext() is b for a, b in zip(widgets, widgets[1:]))
+            ):
+                continue  # Already in place
+            w[index:index] = widgets
 
     def child_moved(self, child: WebComponent) -> bool:
         """Handle the child moved event from the declaration.
@@ -191,17 +320,41 @@ class WebComponent(ProxyTag):
         w = self.widget
         if w is None:
             return False
-        # Determine the new index
+        self.invalidate_children()
+        return self.place_child(child)
+
+    def place_child(self, child: WebComponent) -> bool:
+        """Move the widget of the child after the widget of the node before
+        it in the declaration. This does not depend on the number of
+        children.
+
+        Returns
+        -------
+        moved: bool
+            Whether the widget was moved.
+
+        """
         d = self.declaration
         assert d is not None
         assert child.declaration is not None
-        i = d._child_index(child.declaration)
-        j = w.index(child.widget)
-        if j == i:
-            return False  # Already in the correct spot
-        # Delete and re-insert at correct position
-        del w[j]
-        w.insert(i, child.widget)
+        w = self.widget
+        widget = child.widget
+        assert w is not None and widget is not None
+        before = d._child_before(child.declaration)
+        if before is None:
+            if widget.getprevious() is None and widget.getparent() is w:
+                return False
+            w.insert(0, widget)
+            return True
+        assert before.proxy is not None
+        before_widget = before.proxy.widget
+        assert before_widget is not None
+        if widget.getprevious() is before_widget:
+            return False
+        if before_widget.getparent() is w:
+            before_widget.addnext(widget)
+        else:
+            w.insert(d._child_index(child.declaration), widget)
         return True
 
     def child_removed(self, child: WebComponent):
@@ -213,17 +366,540 @@ class WebComponent(ProxyTag):
         """
         w = self.widget
         if w is not None:
+            if (pending := self.pending_removed) is not None:
+                pending.append(child)
+                return
+            self.invalidate_children()
             w.remove(child.widget)
 
+    def children_removed(self, children: list[WebComponent]):
+        """Handle children removed at once. The tree is only invalidated
+        once for all of them.
+
+        """
+        w = self.widget
+        if w is None:
+            return
+        self.invalidate_children()
+        for child in children:
+            widget = child.widget
+            if widget is not None and widget.getparent() is w:
+                w.remove(widget)
+
     # -------------------------------------------------------------------------
     # Public API
     # -------------------------------------------------------------------------
     def render(
+        self,
+        method: str = "html",
+        encoding: str = "unicode",
+        compress: Optional[str] = None,
+        **kwargs,
+    ) -> Union[str, bytes]:
+        """Render the widget tree into a string.
+
+        Html rendered as unicode or utf-8 reuses the output of any subtrees
+        that did not change since the last render. Any other options
+        serialize the whole tree. If compress is given the output is
+        compressed with that content encoding and returned as bytes.
+
+        """
+        self.wait_for_render()
+        if compress is not None:
+            return self.render_compressed(compress, method, encoding, **kwargs)
+        return self.serialize(method, encoding, **kwargs)
+
+    def render_compressed(
+        self,
+        compress: str,
+        method: str = "html",
+        encoding: str = "utf-8",
+        **kwargs,
+    ) -> bytes:
+        """Render the widget tree and compress the output.
+
+        Parameters
+        ----------
+        compress: str
+            The content encoding to compress with (eg gzip, br, or zstd).
+        method: str
+            The serialization method.
+        encoding: str
+            The output encoding. Unicode is rendered as utf-8.
+
+        Returns
+        -------
+        output: bytes
+            The compressed output.
+
+        """
+        compressor = get_compressor(compress)
+        if encoding == "unicode" or encoding is str:
+            encoding = "utf-8"
+        output = self.serialize(method, encoding, **kwargs)
+        assert isinstance(output, bytes)
+        return compressor(output)
+
+    def serialize(
         self, method: str = "html", encoding: str = "unicode", **kwargs
     ) -> Union[str, bytes]:
-        """Render the widget tree into a string"""
+        """Render the widget tree into a string without waiting for any render
+        in progress in a worker thread.
+
+        """
+        if method == "html" and not kwargs:
+            if encoding == "unicode" or encoding is str:
+                return self.render_output().decode()
+            if is_utf8(encoding):
+                return self.render_output()
         return tostring(self.widget, method=method, encoding=encoding, **kwargs)
 
+    async def render_async(
+        self,
+        method: str = "html",
+        encoding: str = "unicode",
+        executor: Optional[Executor] = None,
+        compress: Optional[str] = None,
+        **kwargs,
+    ) -> Union[str, bytes]:
+        """Render the widget tree into a string in a worker thread so the
+        event loop is not blocked.
+
+        lxml releases the GIL while serializing. The tree must not change
+        while it is serialized so any change to it from the event loop blocks
+        until the render is complete. Output that is already cached is
+        returned without using a worker.
+
+        Parameters
+        ----------
+        method: str
+            The serialization method.
+        encoding: str
+            The output encoding.
+        executor: Executor
+            The executor to render in. A shared thread pool is used if not
+            given.
+        compress: str
+            The content encoding to compress the output with, if any.
+
+        Returns
+        -------
+        html: str or bytes
+            The rendered output.
+
+        """
+        root = self.root
+        assert root is not None
+        while (task := root.render_task) is not None and not task.done():
+            await asyncio.wait([asyncio.wrap_future(task)])
+        render: Callable[..., Union[str, bytes]]
+        if compress is not None:
+            render = partial(self.render_compressed, compress)
+        else:
+            if self.output is not None and not self.dirty and method == "html":
+                if not kwargs and (encoding in ("unicode", str) or is_utf8(encoding)):
+                    return self.serialize(method, encoding)
+            render = self.serialize
+        if executor is None:
+            executor = default_executor()
+        task = root.render_task = executor.submit(render, method, encoding, **kwargs)
+        try:
+            return await asyncio.wrap_future(task)
+        finally:
+            if root.render_task is task:
+                root.render_task = None
+
+    def wait_for_render(self):
+        """Block until any render of the tree in a worker thread is complete.
+        This must be called before the tree is modified.
+
+        """
+        if (root := self.root) is not None:
+            if (task := root.render_task) is not None and not task.done():
+                wait((task,))
+
+    def render_output(self) -> bytes:
+        """Render the widget tree to utf-8 encoded html reusing the cached
+        output of any clean subtrees.
+
+        Only the start and end tags of dirty nodes are serialized again, so
+        the cost of a render is proportional to the amount of markup that
+        changed.
+
+        Returns
+        -------
+        output: bytes
+            The utf-8 encoded html of this node, including it's tail.
+
+        """
+        output = self.output
+        if output is not None and not self.dirty:
+            return output
+        if (parts := self.update_parts()) is not None:
+            output = b"".join(parts)
+        else:
+            # Nothing changed below this node since it was last rendered so
+            # the whole subtree can be serialized in one pass
+            output = tostring(self.widget, method="html", encoding="utf-8")
+        self.output = output
+        return output
+
+    def render_bytes(self) -> bytes:
+        """Render the widget tree to utf-8 encoded html.
+
+        Returns
+        -------
+        output: bytes
+            The utf-8 encoded html of this node, including it's tail.
+
+        """
+        self.wait_for_render()
+        return self.render_output()
+
+    def render_into(self, writable: Union[bytearray, BinaryIO]) -> int:
+        """Write the widget tree as utf-8 encoded html into a buffer or file
+        like object.
+
+        The output of a changed node is written in parts instead of being
+        joined first. Unchanged output is written as is.
+
+        Parameters
+        ----------
+        writable: bytearray or BinaryIO
+            A bytearray to extend or an object with a `write` method that
+            accepts bytes.
+
+        Returns
+        -------
+        size: int
+            The number of bytes written.
+
+        """
+        self.wait_for_render()
+        if isinstance(writable, bytearray):
+            return self.write_output(writable.extend)
+        return self.write_output(writable.write)
+
+    def write_output(self, write: Callable[[bytes], Any]) -> int:
+        """Write the utf-8 encoded html of the widget tree in parts reusing
+        the cached output of any clean subtrees.
+
+        Changed nodes are written without joining their output. Their parent
+        joins it the next time the parent's output is needed.
+
+        Parameters
+        ----------
+        write: Callable[[bytes], Any]
+            The function to write each part with.
+
+        Returns
+        -------
+        size: int
+            The number of bytes written.
+
+        """
+        output = self.output
+        if output is not None and not self.dirty:
+            write(output)
+            return len(output)
+        parts = self.update_parts(children=False)
+        changed = self.dirty_children
+        if parts is None or not changed:
+            if parts is None:
+                output = tostring(self.widget, method="html", encoding="utf-8")
+            else:
+                output = b"".join(parts)
+            self.output = output
+            write(output)
+            return len(output)
+
+        # Write the runs of unchanged parts between the changed children
+        self.output = None
+        index = self.part_index
+        assert index is not None
+        size = start = 0
+        for c in sorted(changed, key=index.__getitem__):
+            i = index[c]
+            size += write_parts(write, parts, start, i)
+            size += c.write_output(write)
+            start = i + 1
+        return size + write_parts(write, parts, start, len(parts))
+
+    def update_parts(self, children: bool = True) -> Optional[list[bytes]]:
+        """Update the parts of this node which changed since it was last
+        rendered.
+
+        Parameters
+        ----------
+        children: bool
+            Whether to also update the output of any changed children.
+
+        Returns
+        -------
+        parts: list or None
+            The parts of this node or None if it must be serialized in one
+            pass.
+
+        """
+        parts = self.parts
+        if self.dirty:
+            self.dirty = False
+            if parts is not None and not parts[0]:
+                if shell := self.render_shell():
+                    parts[0], parts[-1] = shell
+                else:
+                    parts = None
+            if parts is None:
+                parts = self.render_parts()
+        if children and parts is not None:
+            if changed := self.dirty_children:
+                index = self.part_index
+                assert index is not None
+                for c in changed:
+                    parts[index[c]] = c.render_output()
+                changed.clear()
+        return parts
+
+    def render_iter(self, chunk_size: int = 65536) -> Generator[bytes, None, None]:
+        """Render the widget tree into chunks of utf-8 encoded html.
+
+        Parameters
+        ----------
+        chunk_size: int
+            The minimum size of each chunk (except the last).
+
+        Yields
+        ------
+        chunk: bytes
+            The next chunk of the output.
+
+        """
+        self.wait_for_render()
+        chunk: list[bytes] = []
+        size = 0
+        for part in self.iter_output():
+            chunk.append(part)
+            size += len(part)
+            if size >= chunk_size:
+                yield b"".join(chunk)
+                chunk.clear()
+                size = 0
+        if chunk:
+            yield b"".join(chunk)
+
+    def iter_output(self) -> Generator[bytes, None, None]:
+        """Generate the utf-8 encoded html of the widget tree in parts
+        without building the whole output in memory.
+
+        The cached output of clean nodes is used as is. Any nodes without any
+        grandchildren are serialized in one pass.
+
+        """
+        output = self.output
+        if not self.dirty:
+            if output is not None:
+                yield output
+                return
+            if (parts := self.update_parts()) is not None:
+                yield from parts
+                return
+        w = self.widget
+        assert w is not None
+        if any(len(e) for e in w):
+            children = [c for c in self.children() if isinstance(c, WebComponent)]
+            if len(children) == len(w) and (shell := self.render_shell()):
+                head, foot = shell
+                yield head
+                for c in children:
+                    yield from c.iter_output()
+                yield foot
+                return
+        yield tostring(w, method="html", encoding="utf-8")
+
+    def render_parts(self) -> Optional[list[bytes]]:
+        """Create the parts used to render this node by splicing the output
+        of the children between the start and end of this node.
+
+        Returns
+        -------
+        parts: list or None
+            The parts or None if the children cannot be spliced, in which
+            case the dirty state of the children is discarded.
+
+        """
+        w = self.widget
+        assert w is not None
+        children = [c for c in self.children() if isinstance(c, WebComponent)]
+        if self.dirty_children:
+            self.dirty_children.clear()
+        shell = self.render_shell() if children and len(children) == len(w) else None
+        if shell is None:
+            self.parts = None
+            for c in children:
+                if c.dirty:
+                    c.reset_output()
+            return None
+        head, foot = shell
+        parts: list[bytes] = [head]
+        parts.extend(c.render_output() for c in children)
+        parts.append(foot)
+        self.part_index = {c: i for i, c in enumerate(children, 1)}
+        self.parts = parts
+        return parts
+
+    def render_shell(self) -> Optional[tuple[bytes, bytes]]:
+        """Render this node without any children.
+
+        Returns
+        -------
+        shell: tuple[bytes, bytes] or None
+            The utf-8 encoded html before and after the children of this
+            node or None if this node cannot contain children.
+
+        """
+        w = self.widget
+        assert w is not None
+        shell = Element(w.tag, w.attrib)
+        shell.text = w.text
+        shell.tail = w.tail
+        SubElement(shell, SPLICE_TAG)
+        output = tostring(shell, method="html", encoding="utf-8")
+        head, sep, foot = output.rpartition(SPLICE_MARKUP)
+        if not sep:
+            return None
+        return (head, foot)
+
+    def reset_output(self):
+        """Discard the output and dirty state of this node and any dirty
+        descendants.
+
+        """
+        dirty = self.dirty
+        self.dirty = False
+        self.output = None
+        self.parts = None
+        if dirty:
+            for c in self.children():
+                if isinstance(c, WebComponent) and c.dirty:
+                    c.reset_output()
+
+    def invalidate(self):
+        """Mark this node as changed so the next render serializes it again.
+        The output of the children is reused if possible.
+
+        """
+        self.wait_for_render()
+        if parts := self.parts:
+            parts[0] = b""
+        self.mark_dirty()
+
+    def invalidate_children(self):
+        """Mark the children of this node as changed so the next render
+        splices the output of the children again.
+
+        """
+        self.wait_for_render()
+        self.parts = None
+        self.child_digests = None
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """Mark this node and all of it's ancestors as dirty, clear their
+        digests, and increment the version of the tree.
+
+        """
+        if (root := self.root) is not None:
+            root.version += 1
+        if self.digest is not None:
+            self.clear_digest()
+        proxy = self
+        while not proxy.dirty:
+            proxy.dirty = True
+            d = proxy.declaration
+            if d is None:
+                break
+            parent = d.parent
+            if not isinstance(parent, Tag) or (parent_proxy := parent.proxy) is None:
+                break
+            if parent_proxy.parts is not None:
+                if (changed := parent_proxy.dirty_children) is None:
+                    changed = parent_proxy.dirty_children = set()
+                changed.add(proxy)
+            proxy = parent_proxy
+
+    def clear_digest(self):
+        """Clear the digest of this node and all of it's ancestors. The
+        digest of a node is only set if the digest of every descendant is so
+        this stops at the first one which is clear.
+
+        """
+        proxy = self
+        while proxy.digest is not None:
+            proxy.digest = None
+            d = proxy.declaration
+            if d is None:
+                break
+            parent = d.parent
+            if not isinstance(parent, Tag) or (parent_proxy := parent.proxy) is None:
+                break
+            if (child_digests := parent_proxy.child_digests) is not None:
+                child_digests.changed.add(proxy)
+            proxy = parent_proxy
+
+    def etag(self) -> str:
+        """Get an entity tag for the content of this node and all children.
+
+        Only the digests of nodes which changed since the last call are
+        computed again and nothing is serialized unless the node contains
+        elements that have no component (eg raw html).
+
+        Returns
+        -------
+        etag: str
+            The quoted hex digest of the content.
+
+        """
+        return f'"{self.get_digest().hex()}"'
+
+    def snapshot(self) -> _Element:
+        """Copy the element tree of this node."""
+        w = self.widget
+        assert w is not None
+        return deepcopy(w)
+
+    def get_digest(self) -> bytes:
+        """Get the digest of this node, computing it if it changed."""
+        digest = self.digest
+        if digest is None:
+            digest = self.digest = self.compute_digest()
+        return digest
+
+    def compute_digest(self) -> bytes:
+        """Hash the tag, attributes, text, and tail of this node and the
+        combined digest of the children.
+
+        Returns
+        -------
+        digest: bytes
+            The digest of this node and all children.
+
+        """
+        w = self.widget
+        assert w is not None
+        # Null characters are not allowed in xml so they separate the values
+        state = "\0".join(
+            (w.tag, w.text or "", w.tail or "", *chain.from_iterable(w.attrib.items()))
+        ).encode()
+        child_digests = self.child_digests
+        if child_digests is None:
+            children = [c for c in self.children() if isinstance(c, WebComponent)]
+            if len(children) != len(w):
+                # Some elements have no component so the subtree is hashed
+                self.child_digests = None
+                return hash_digest(tostring(w, method="html", encoding="utf-8"))
+            child_digests = self.child_digests = ChildDigests(children)
+        return hash_digest(state + child_digests.digest())
+
     def xpath(self, query: str, **kwargs) -> Generator[WebComponent, None, None]:
         """Get the node(s) matching the query"""
         w = self.widget
@@ -238,6 +914,12 @@ class WebComponent(ProxyTag):
                 if obj := lookup(node.get("id")):
                     yield obj
 
+    def find_by_id(self, id: str) -> Optional[WebComponent]:
+        """Find the node in the tree with the given id from the cache."""
+        if root := self.root:
+            return root.cache.get(id)
+        return None
+
     def parent_widget(self) -> Optional[_Element]:
         """Get the parent toolkit widget for this object.
 
@@ -320,6 +1002,15 @@ class WebComponent(ProxyTag):
         assert w is not None
         w.set("style", style)
 
+    def set_id(self, id: str, oldid: str):
+        """Set the id and move the node to it in the cache"""
+        if (root := self.root) is not None:
+            cache = root.cache
+            if cache.get(oldid) is self:
+                del cache[oldid]
+            cache[id] = self
+        self.set_attribute("id", id)
+
     def set_attribute(self, name: str, value: Any):
         """Default handler for those not explicitly defined"""
         w = self.widget
@@ -354,6 +1045,16 @@ class RootWebComponent(WebComponent):
     #: declaration to avoid creating unnecessary modified events.
     rendered = Bool()
 
+    #: The render in progress in a worker thread, if any
+    render_task = Typed(Future)
+
+    #: Incremented whenever any node in the tree changes
+    version = Int()
+
+    #: Compressed output by render options. Each is saved with the version
+    #: of the tree it was rendered from and is reused until it changes.
+    compressed = Dict()
+
     def create_widget(self):
         d = self.declaration
         self.root = self.cache[d.id] = self
@@ -363,7 +1064,47 @@ class RootWebComponent(WebComponent):
         self.rendered = True
         return super().render(*args, **kwargs)
 
+    def render_iter(self, *args, **kwargs):
+        self.rendered = True
+        return super().render_iter(*args, **kwargs)
+
+    async def render_async(self, *args, **kwargs):
+        self.rendered = True
+        return await super().render_async(*args, **kwargs)
+
+    def render_bytes(self):
+        self.rendered = True
+        return super().render_bytes()
+
+    def render_into(self, writable):
+        self.rendered = True
+        return super().render_into(writable)
+
+    def render_compressed(
+        self,
+        compress: str,
+        method: str = "html",
+        encoding: str = "utf-8",
+        **kwargs,
+    ) -> bytes:
+        """Render the widget tree and compress the output. The result is
+        reused until the tree changes.
+
+        """
+        self.rendered = True
+        if kwargs:
+            return super().render_compressed(compress, method, encoding, **kwargs)
+        key = (compress, method, encoding)
+        version = self.version
+        cached = self.compressed.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        output = super().render_compressed(compress, method, encoding)
+        self.compressed[key] = (version, output)
+        return output
+
     def destroy(self):
         del self.root
         del self.cache
+        del self.compressed
         super().destroy()
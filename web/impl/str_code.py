@@ -0,0 +1,46 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from atom.api import Instance
+from pygments import lexers, highlight
+from pygments.lexer import Lexer
+from pygments.formatters import HtmlFormatter
+from web.components.code import ProxyCode
+from .str_raw import StrRawComponent, SourceType
+
+
+class StrCodeComponent(StrRawComponent, ProxyCode):
+    #: Lexer used
+    lexer = Instance(Lexer)
+
+    #: HTML Formatter
+    formatter = Instance(HtmlFormatter)
+
+    def _default_formatter(self):
+        return HtmlFormatter(style=self.declaration.highlight_style)
+
+    def _default_lexer(self):
+        d = self.declaration
+        if d.language:
+            return lexers.find_lexer_class_by_name(d.language)()
+        return lexers.guess_lexer(d.source)
+
+    def render_source(self, source: SourceType) -> str:
+        if isinstance(source, str):
+            return highlight(source, lexer=self.lexer, formatter=self.formatter)
+        return super().render_source(source)
+
+    def set_language(self, language: str):
+        self.lexer = self._default_lexer()
+
+    def set_highlight_style(self, style: str):
+        self.formatter = self._default_formatter()
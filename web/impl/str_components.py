@@ -0,0 +1,76 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+import inspect
+from web.components import html
+
+
+def generic_factory():
+    from .str_toolkit_object import StrComponent
+
+    return StrComponent
+
+
+def html_factory():
+    from .str_toolkit_object import RootStrComponent
+
+    return RootStrComponent
+
+
+def code_factory():
+    from .str_code import StrCodeComponent
+
+    return StrCodeComponent
+
+
+def markdown_factory():
+    from .str_md import StrMarkdownComponent
+
+    return StrMarkdownComponent
+
+
+def notebook_factory():
+    from .str_ipynb import StrNotebookComponent
+
+    return StrNotebookComponent
+
+
+def raw_factory():
+    from .str_raw import StrRawComponent
+
+    return StrRawComponent
+
+
+def static_factory():
+    from .str_static import StrStaticComponent
+
+    return StrStaticComponent
+
+
+#: Create generic html factories
+FACTORIES = {
+    name: generic_factory
+    for name, obj in inspect.getmembers(html)
+    if inspect.isclass(obj)
+}
+
+#: Create special widgets
+FACTORIES.update(
+    {
+        "Code": code_factory,
+        "Html": html_factory,
+        "Markdown": markdown_factory,
+        "Notebook": notebook_factory,
+        "Raw": raw_factory,
+        "Static": static_factory,
+    }
+)
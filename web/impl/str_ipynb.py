@@ -0,0 +1,40 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+import nbformat
+from atom.api import Instance, Value
+from nbconvert import HTMLExporter
+from web.components.ipynb import ProxyNotebook
+from .str_raw import StrRawComponent, SourceType
+
+
+class StrNotebookComponent(StrRawComponent, ProxyNotebook):
+    """A component for rendering Jupyter Notebooks."""
+
+    #: Exporter
+    exporter = Instance(HTMLExporter, ())
+
+    #: Resources from the node
+    resources = Value()
+
+    def render_source(self, source: SourceType) -> str:
+        d = self.declaration
+        assert d is not None
+        if isinstance(source, str):
+            source, self.resources = self.exporter.from_notebook_node(
+                nbformat.reads(source, as_version=d.version)
+            )
+            return f"<div>{source}</div>"
+        return super().render_source(source)
+
+    def set_version(self, version: int):
+        pass
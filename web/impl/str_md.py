@@ -0,0 +1,50 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+import markdown
+from web.components.md import ProxyMarkdown
+from .str_raw import StrRawComponent, SourceType
+
+
+class StrMarkdownComponent(StrRawComponent, ProxyMarkdown):
+    """A block for rendering Markdown source."""
+
+    def render_source(self, source: SourceType) -> str:
+        d = self.declaration
+        assert d is not None
+        if isinstance(source, str):
+            return markdown.markdown(
+                source,
+                tab_length=d.tab_length,
+                safe_mode=d.safe_mode,
+                output_format=d.output_format,
+                extensions=d.extensions,
+                extension_configs=d.extension_configs,
+            )
+        return super().render_source(source)
+
+    def set_safe_mode(self, mode: bool):
+        pass
+
+    def set_output_format(self, format: str):
+        pass
+
+    def set_tab_length(self, length: int):
+        pass
+
+    def set_extensions(self, extensions: list[str]):
+        pass
+
+    def set_extension_configs(self, config: dict[str, dict]):
+        pass
@@ -0,0 +1,46 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from lxml.etree import tostring
+from lxml.etree import _Element as Element
+from web.components.raw import ProxyRawNode, SourceType
+from .str_toolkit_object import StrComponent
+
+
+class StrRawComponent(StrComponent, ProxyRawNode):
+    """A block for rendering raw html source.
+
+    Unlike the lxml backend, source given as a str is inserted as is without
+    being parsed so it must be valid html.
+
+    """
+
+    def render_content(self) -> str:
+        d = self.declaration
+        assert d is not None
+        return self.render_source(d.source)
+
+    def render_source(self, source: SourceType) -> str:
+        """Convert the source to html."""
+        if isinstance(source, str):
+            return source
+        elif isinstance(source, Element):
+            return tostring(source, method="html", encoding="unicode")
+        elif isinstance(source, list):
+            return "".join(
+                tostring(e, method="html", encoding="unicode") for e in source
+            )
+        return ""
+
+    def set_source(self, source: SourceType):
+        """The source is read from the declaration when rendered"""
+        pass
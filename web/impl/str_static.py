@@ -0,0 +1,26 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.text, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from web.components.static import ProxyStatic
+from .str_toolkit_object import StrComponent
+
+
+class StrStaticComponent(StrComponent, ProxyStatic):
+    """A component which reuses the shared output of a static subtree."""
+
+    def render_shell(self) -> tuple[str, str]:
+        d = self.declaration
+        assert d is not None
+        output = d.output
+        self.start = start = output.decode() if output else ""
+        self.end = end = ""
+        return (start, end)
@@ -0,0 +1,538 @@
+"""
+Copyright (c) 2017, Jairus Martin.
+
+Distributed under the terms of the MIT License.
+
+The full license is in the file LICENSE.txt, distributed with this software.
+
+Created on Oct 18, 2026
+
+@author: jrm
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Executor
+from typing import Any, BinaryIO, Type, Union, Optional, Generator
+from atom.api import Atom, Bool, Dict, Int, Typed
+from web.components.html import ProxyTag, Tag
+from web.core.compression import get_compressor
+from web.core.digest import ChildDigests, hash_digest
+from web.core.markup import (
+    RAW_TEXT_ELEMENTS,
+    VOID_ELEMENTS,
+    escape_text,
+    format_attrs,
+    format_cls,
+    format_style,
+)
+from .lxml_toolkit_object import get_fields
+
+
+class StrComponent(ProxyTag):
+    """A toolkit object which renders html directly from the state of the
+    declaration without creating an lxml element.
+
+    """
+
+    #: The start tag and text of this node from the last render. This is
+    #: cleared when the node changes.
+    start = Typed(str)
+
+    #: The end tag and tail of this node from the last render
+    end = Typed(str)
+
+    #: The child components in order. This is cleared when children change.
+    nodes = Typed(list)
+
+    #: The html output of this node and all children from the last render.
+    #: This is cleared when the node or any descendant changes.
+    output = Typed(str)
+
+    #: Hash of the content of this node and all children. This is cleared
+    #: when this node or any descendant changes.
+    digest = Typed(bytes)
+
+    #: The combined digest of the children. This is cleared when children
+    #: change.
+    child_digests = Typed(ChildDigests)
+
+    # -------------------------------------------------------------------------
+    # Initialization API
+    # -------------------------------------------------------------------------
+    def create_widget(self):
+        """There is no toolkit widget so this only sets the root and adds
+        this to the cache.
+
+        """
+        d = self.declaration
+        self.root = root = d.parent.proxy.root
+        root.cache[d.id] = self
+
+    def init_widget(self):
+        pass
+
+    # -------------------------------------------------------------------------
+    # ProxyToolkitObject API
+    # -------------------------------------------------------------------------
+    def activate_top_down(self):
+        """Activate the proxy for the top-down pass."""
+        try:
+            self.create_widget()
+            self.init_widget()
+        except Exception as e:
+            nodes = getattr(e, "_d_nodes", None)
+            if not isinstance(nodes, list):
+                nodes = e._d_nodes = []
+            nodes.append(self.declaration)
+            raise e
+
+    def destroy(self):
+        """A reimplemented destructor that clears the rendered output of the
+        ancestors. The output is only cleared once for a destroyed subtree.
+
+        """
+        if not self.detached:
+            self.invalidate_children()
+        if (root := self.root) is not None:
+            if (
+                (cache := root.cache)
+                and not (self.detached and root.declaration.is_destroyed)
+                and cache.get(self.declaration.id) is self
+            ):
+                del cache[self.declaration.id]
+            del self.root
+        del self.start
+        del self.end
+        del self.output
+        del self.nodes
+        del self.digest
+        del self.child_digests
+        super().destroy()
+
+    def child_added(self, child: StrComponent):
+        if (pending := self.pending_children) is not None:
+            pending.append(child)
+            return
+        del self.nodes
+        del self.child_digests
+        self.invalidate_children()
+
+    def children_added(self, children: list[StrComponent]):
+        del self.nodes
+        del self.child_digests
+        self.invalidate_children()
+
+    def child_moved(self, child: StrComponent) -> bool:
+        del self.nodes
+        del self.child_digests
+        self.invalidate_children()
+        return True
+
+    def child_removed(self, child: StrComponent):
+        if (pending := self.pending_removed) is not None:
+            pending.append(child)
+            return
+        del self.nodes
+        del self.child_digests
+        self.invalidate_children()
+
+    def children_removed(self, children: list[StrComponent]):
+        del self.nodes
+        del self.child_digests
+        self.invalidate_children()
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+    def render(
+        self,
+        method: str = "html",
+        encoding: str = "unicode",
+        compress: Optional[str] = None,
+        **kwargs,
+    ) -> Union[str, bytes]:
+        """Render the node and all children into a string.
+
+        Only html can be rendered and no other options are supported. If
+        compress is given the output is compressed with that content encoding
+        and returned as bytes.
+
+        """
+        if compress is not None:
+            return self.render_compressed(compress, method, encoding, **kwargs)
+        if method != "html":
+            raise ValueError(f"Only html can be rendered, got {method!r}")
+        if kwargs:
+            raise TypeError(f"Unsupported render options: {', '.join(kwargs)}")
+        output = self.render_output()
+        if encoding in ("unicode", str):
+            return output
+        return output.encode(encoding)
+
+    def render_compressed(
+        self,
+        compress: str,
+        method: str = "html",
+        encoding: str = "utf-8",
+        **kwargs,
+    ) -> bytes:
+        """Render the node and all children and compress the output.
+
+        Parameters
+        ----------
+        compress: str
+            The content encoding to compress with (eg gzip, br, or zstd).
+        method: str
+            The serialization method.
+        encoding: str
+            The output encoding. Unicode is rendered as utf-8.
+
+        Returns
+        -------
+        output: bytes
+            The compressed output.
+
+        """
+        compressor = get_compressor(compress)
+        if encoding == "unicode" or encoding is str:
+            encoding = "utf-8"
+        output = self.render(method, encoding, **kwargs)
+        assert isinstance(output, bytes)
+        return compressor(output)
+
+    async def render_async(
+        self,
+        method: str = "html",
+        encoding: str = "unicode",
+        executor: Optional[Executor] = None,
+        compress: Optional[str] = None,
+        **kwargs,
+    ) -> Union[str, bytes]:
+        """Render the node and all children. Rendering holds the GIL so this
+        is done in the calling thread and the executor is not used.
+
+        """
+        return self.render(method, encoding, compress, **kwargs)
+
+    def render_bytes(self) -> bytes:
+        return self.render_output().encode()
+
+    def render_into(self, writable: Union[bytearray, BinaryIO]) -> int:
+        data = self.render_bytes()
+        if isinstance(writable, bytearray):
+            writable.extend(data)
+        else:
+            writable.write(data)
+        return len(data)
+
+    def render_iter(self, chunk_size: int = 65536) -> Generator[bytes, None, None]:
+        """Render the node and all children in chunks of the given size."""
+        data = self.render_bytes()
+        for i in range(0, len(data), chunk_size):
+            end = i + chunk_size
+            yield data[i:end]
+
+    def render_output(self) -> str:
+        """Render the node and all children. The output is saved until this
+        node or any descendant changes so only the changed branch is
+        rendered again.
+
+        """
+        output = self.output
+        if output is None:
+            start, end = self.start, self.end
+            if start is None or end is None:
+                start, end = self.render_shell()
+            nodes = self.nodes
+            if nodes is None:
+                nodes = self.nodes = self.get_nodes()
+            content = "".join([n.output or n.render_output() for n in nodes])
+            output = self.output = f"{start}{content}{end}"
+        return output
+
+    def get_nodes(self) -> list[StrComponent]:
+        """Get the child components which are rendered. The children of
+        void elements are dropped.
+
+        """
+        d = self.declaration
+        assert d is not None
+        if d.tag.lower() in VOID_ELEMENTS:
+            return []
+        return [c.proxy for c in d.children if isinstance(c, Tag) and c.proxy]
+
+    def render_shell(self) -> tuple[str, str]:
+        """Render the start tag and text and the end tag and tail of this
+        node and save them until the node changes.
+
+        Returns
+        -------
+        result: tuple[str, str]
+            The markup before and after the children.
+
+        """
+        d = self.declaration
+        assert d is not None
+        tag = d.tag
+        start = f"<{tag}{format_attrs(tag, self.get_attrs())}>"
+        if tag.lower() in VOID_ELEMENTS:
+            end = ""
+        else:
+            if text := d.text:
+                raw = tag.lower() in RAW_TEXT_ELEMENTS
+                start += text if raw else escape_text(text)
+            start += self.render_content()
+            end = f"</{tag}>"
+        if tail := d.tail:
+            end += escape_text(tail)
+        self.start = start
+        self.end = end
+        return (start, end)
+
+    def render_content(self) -> str:
+        """Render any markup between the text and the children. Subclasses
+        which render raw html should reimplement this.
+
+        """
+        return ""
+
+    def get_attrs(self) -> dict[str, str]:
+        """Get the attributes of the node in the same order as the lxml
+        backend. Any in `attrs` replace the others.
+
+        """
+        d = self.declaration
+        assert d is not None
+        attrs = {"id": d.id}
+        if v := d.alt:
+            attrs["alt"] = v
+        if v := d.style:
+            attrs["style"] = format_style(v)
+        if v := d.cls:
+            attrs["class"] = format_cls(v)
+        if d.clickable:
+            attrs["clickable"] = "true"
+        if d.draggable:
+            attrs["draggable"] = "true"
+        if v := d.onclick:
+            attrs["onclick"] = v
+        if v := d.ondragstart:
+            attrs["ondragstart"] = v
+        if v := d.ondragover:
+            attrs["ondragover"] = v
+        if v := d.ondragend:
+            attrs["ondragend"] = v
+        if v := d.ondragenter:
+            attrs["ondragenter"] = v
+        if v := d.ondragleave:
+            attrs["ondragleave"] = v
+        if v := d.ondrop:
+            attrs["ondrop"] = v
+        if v := d.attrs:
+            attrs.update(v)
+        cls: Type[Atom] = d.__class__
+        for m in get_fields(cls):
+            name = m.name
+            value = getattr(d, name)
+            if value is True:
+                attrs[name] = name
+            elif value:
+                attrs[name] = f"{value}"
+        return attrs
+
+    def invalidate(self):
+        """Clear the output of this node and the ancestors so the next render
+        includes the change.
+
+        """
+        del self.start
+        del self.end
+        self.invalidate_children()
+
+    def invalidate_children(self):
+        """Clear the output and digest of this node and the ancestors since
+        the children changed and increment the version of the tree. These are
+        only set on an ancestor if they are set on every descendant so this
+        stops at the first node where both are clear.
+
+        """
+        if (root := self.root) is not None:
+            root.version += 1
+        node = self
+        while isinstance(node, StrComponent) and (
+            node.output is not None or node.digest is not None
+        ):
+            node.output = None
+            node.digest = None
+            parent = node.parent()
+            if isinstance(parent, StrComponent) and parent.child_digests is not None:
+                parent.child_digests.changed.add(node)
+            node = parent
+
+    def etag(self) -> str:
+        """Get an entity tag for the content of this node and all children.
+
+        Only the digests of nodes which changed since the last call are
+        computed again.
+
+        Returns
+        -------
+        etag: str
+            The quoted hex digest of the content.
+
+        """
+        return f'"{self.get_digest().hex()}"'
+
+    def get_digest(self) -> bytes:
+        """Get the digest of this node, computing it if it changed."""
+        digest = self.digest
+        if digest is None:
+            digest = self.digest = self.compute_digest()
+        return digest
+
+    def compute_digest(self) -> bytes:
+        """Hash the start and end of this node and the combined digest of the
+        children.
+
+        Returns
+        -------
+        digest: bytes
+            The digest of this node and all children.
+
+        """
+        start, end = self.start, self.end
+        if start is None or end is None:
+            start, end = self.render_shell()
+        child_digests = self.child_digests
+        if child_digests is None:
+            nodes = self.nodes
+            if nodes is None:
+                nodes = self.nodes = self.get_nodes()
+            child_digests = self.child_digests = ChildDigests(nodes)
+        state = f"{start}\0{end}".encode()
+        return hash_digest(state + child_digests.digest())
+
+    def xpath(self, query: str, **kwargs) -> Generator[StrComponent, None, None]:
+        """Get the node(s) matching the query. There is no tree to query so
+        the rendered output is parsed by lxml.
+
+        """
+        from lxml.html import fromstring
+
+        root = self.root
+        if root is None:
+            return None
+        nodes = fromstring(self.render_output()).xpath(query, **kwargs)
+        if not nodes:
+            return None
+        lookup = root.cache.get
+        for node in nodes:
+            if obj := lookup(node.get("id")):
+                yield obj
+
+    def snapshot(self):
+        """Parse the rendered output of this node with lxml."""
+        from lxml.html import document_fromstring, fragment_fromstring
+
+        output = self.render_output()
+        d = self.declaration
+        if d is not None and d.tag == "html":
+            return document_fromstring(output)
+        return fragment_fromstring(output, create_parent="div")[0]
+
+    def find_by_id(self, id: str) -> Optional[StrComponent]:
+        """Find the node in the tree with the given id from the cache."""
+        if root := self.root:
+            return root.cache.get(id)
+        return None
+
+    # -------------------------------------------------------------------------
+    # Change handlers
+    # -------------------------------------------------------------------------
+    def set_attrs(
+        self, attrs: Optional[dict[str, str]], oldattrs: Optional[dict[str, str]]
+    ):
+        """The attributes are read from the declaration when rendered"""
+        pass
+
+    def set_id(self, id: str, oldid: str):
+        """Move the node to the new id in the cache"""
+        if (root := self.root) is not None:
+            cache = root.cache
+            if cache.get(oldid) is self:
+                del cache[oldid]
+            cache[id] = self
+
+    def set_attribute(self, name: str, value: Any):
+        """The attributes are read from the declaration when rendered"""
+        pass
+
+
+class RootStrComponent(StrComponent):
+    """A root component which tracks whether it was rendered"""
+
+    #: Components are cached for lookup by id
+    cache = Dict()
+
+    #: Flag to indicate whether this node was rendered. This is used by the
+    #: declaration to avoid creating unnecessary modified events.
+    rendered = Bool()
+
+    #: Incremented whenever any node in the tree changes
+    version = Int()
+
+    #: Compressed output by render options. Each is saved with the version
+    #: of the tree it was rendered from and is reused until it changes.
+    compressed = Dict()
+
+    def create_widget(self):
+        self.root = self.cache[self.declaration.id] = self
+
+    def render(self, *args, **kwargs):
+        self.rendered = True
+        return super().render(*args, **kwargs)
+
+    def render_iter(self, *args, **kwargs):
+        self.rendered = True
+        return super().render_iter(*args, **kwargs)
+
+    async def render_async(self, *args, **kwargs):
+        self.rendered = True
+        return await super().render_async(*args, **kwargs)
+
+    def render_bytes(self):
+        self.rendered = True
+        return super().render_bytes()
+
+    def render_into(self, writable):
+        self.rendered = True
+        return super().render_into(writable)
+
+    def render_compressed(
+        self,
+        compress: str,
+        method: str = "html",
+        encoding: str = "utf-8",
+        **kwargs,
+    ) -> bytes:
+        """Render the node and all children and compress the output. The
+        result is reused until the tree changes.
+
+        """
+        self.rendered = True
+        if kwargs:
+            return super().render_compressed(compress, method, encoding, **kwargs)
+        key = (compress, method, encoding)
+        version = self.version
+        cached = self.compressed.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        output = super().render_compressed(compress, method, encoding)
+        self.compressed[key] = (version, output)
+        return output
+
+    def destroy(self):
+        del self.compressed
+        super().destroy()
+        del self.cache